@@ -15,7 +15,6 @@
 
 import os
 import sys
-import time
 
 path = os.getcwd()
 sys.path.append(path)
@@ -24,6 +23,8 @@ import logging
 import requests
 import traceback
 
+from fuel_health.common import cleaner
+from fuel_health.common import waiter
 from fuel_health import exceptions
 import fuel_health.nmanager
 
@@ -39,21 +40,21 @@ class CleanUpClientManager(fuel_health.nmanager.OfficialClientManager):
 
     def wait_for_server_termination(self, server, ignore_error=False):
         """Waits for server to reach termination."""
-        start_time = int(time.time())
-        while True:
+        def is_terminated():
             try:
-                self._get_compute_client().servers.get(server)
-            except exceptions.NotFound:
-                return
+                current = self.compute_client.servers.get(server.id)
+            except Exception as exc:
+                if waiter.is_not_found(exc):
+                    return True
+                raise
 
-            server_status = server.status
-            if server_status == 'ERROR' and not ignore_error:
+            if current.status == 'ERROR' and not ignore_error:
                 raise exceptions.BuildErrorException(server_id=server.id)
 
-            if int(time.time()) - start_time >= self.build_timeout:
-                raise exceptions.TimeoutException
-
-            time.sleep(self.build_interval)
+        conf = self.config.compute
+        if not waiter.wait_until(is_terminated, conf.build_timeout,
+                                 max_interval=conf.build_interval):
+            raise exceptions.TimeoutException
 
 
 def cleanup(cluster_deployment_info):
@@ -64,169 +65,186 @@ def cleanup(cluster_deployment_info):
     function uses cluster_deployment_info argument which
     contains list of deployment tags of needed cluster.
 
-    This approach that consists in using one cleanup function
-    for all possible testsets is not so good because of
-    constant checking of component presence in deployment info.
-
-    More better way is to create separate functions for each
-    set of tests so refactoring of this chunk of code is higly
-    appreciated.
+    Resources of independent kinds are deleted concurrently
+    by clients created once, see _steps for their dependencies.
+    Returns summary of deleted and failed resources and time
+    taken by deletion of each kind.
     '''
     manager = CleanUpClientManager()
+    steps = _steps(manager, cluster_deployment_info)
+    return cleaner.Cleaner(steps,
+                           timeout=manager.config.compute.build_timeout).run()
 
-    if 'sahara' in cluster_deployment_info:
-        try:
-            sahara_client = manager._get_sahara_client()
-            if sahara_client is not None:
-                _delete_it(client=sahara_client.clusters,
-                           log_message='Start sahara cluster deletion',
-                           name='ostf-test-', delete_type='id')
-                _delete_it(client=sahara_client.cluster_templates,
-                           log_message='Start sahara cluster'
-                                       ' template deletion',
-                           delete_type='id')
-                _delete_it(client=sahara_client.node_group_templates,
-                           log_message='Start sahara node'
-                                       ' group template deletion',
-                           delete_type='id')
-        except Exception:
-            LOG.warning(traceback.format_exc())
 
-    if 'murano' in cluster_deployment_info:
-        try:
-            murano_client = manager._get_murano_client()
-            compute_client = manager._get_compute_client()
-
-            if murano_client is not None:
-                endpoint = manager.config.murano.api_url + '/v1/'
-                headers = {'X-Auth-Token': murano_client.auth_token,
-                           'content-type': 'application/json'}
-                environments = requests.get(endpoint + 'environments',
-                                            headers=headers).json()
-                for e in environments["environments"]:
-                    if e['name'].startswith('ostf_test-'):
-                        try:
-                            LOG.info('Start environment deletion.')
-                            requests.delete('{0}environments/{1}'.format(
-                                endpoint, e['id']), headers=headers)
-                        except Exception:
-                            LOG.warning('Failed to delete murano environment')
-                            LOG.debug(traceback.format_exc())
-
-            if compute_client is not None:
-                flavors = compute_client.flavors.list()
-                for flavor in flavors:
-                    if 'ostf_test_Murano' in flavor.name:
-                        try:
-                            LOG.info('Start flavor deletion.')
-                            compute_client.flavors.delete(flavor.id)
-                        except:
-                            LOG.warning('Failed to delete flavor')
-                            LOG.debug(traceback.format_exc())
+def _named(prefix, attr='name'):
+    """
+    Matches resources with names starting with prefix. Resources
+    without attr (e.g. cinder v1 volumes) are matched by their
+    display_name.
+    """
+    def match(item):
+        name = getattr(item, attr, None) or \
+            getattr(item, 'display_name', None) or ''
+        return name.startswith(prefix)
+    return match
 
-        except Exception:
-            LOG.warning(traceback.format_exc())
 
-    if 'ceilometer' in cluster_deployment_info:
-        try:
-            ceilometer_client = manager._get_ceilometer_client()
-            if ceilometer_client is not None:
-                alarms = ceilometer_client.alarms.list()
-                for a in alarms:
-                    if a.name.startswith('ost1_test-'):
-                        try:
-                            LOG.info('Start alarms deletion.')
-                            ceilometer_client.alarms.delete(a.id)
-                        except Exception as exc:
-                            LOG.debug(exc)
-        except Exception as exc:
-            LOG.warning(
-                'Something wrong with ceilometer client. Esception: %s', exc
-            )
-
-    if 'heat' in cluster_deployment_info:
+def _manager_step(name, manager, prefix='ost1_test-', delete_type='name',
+                  depends=(), wait=False, match=None):
+    """Step deleting resources of client manager with names with prefix."""
+    match = match or _named(prefix)
+
+    def list_items():
+        return [item for item in manager.list() if match(item)]
+
+    def delete_item(item):
+        if delete_type == 'name':
+            manager.delete(item)
+        else:
+            manager.delete(item.id)
+
+    step = cleaner.Step(name, list_items, delete_item, depends)
+    if wait:
+        step.fetch = fuel_health.nmanager.list_fetcher(manager)
+        step.check = fuel_health.nmanager.is_deleted
+    return step
+
+
+def _murano_environments_step(manager, murano_client):
+    endpoint = manager.config.murano.api_url + '/v1/'
+    headers = {'X-Auth-Token': murano_client.auth_token,
+               'content-type': 'application/json'}
+
+    def list_items():
+        environments = requests.get(endpoint + 'environments',
+                                    headers=headers).json()
+        return [e for e in environments['environments']
+                if e['name'].startswith('ostf_test-')]
+
+    def delete_item(environment):
+        requests.delete('{0}environments/{1}'.format(
+            endpoint, environment['id']), headers=headers)
+
+    return cleaner.Step('murano_environments', list_items, delete_item)
+
+
+def _floating_ips_step(compute_client):
+    def list_items():
+        instances_id = set(s.id for s in compute_client.servers.list()
+                           if s.name.startswith('ost1_test-'))
+        return [f for f in compute_client.floating_ips.list()
+                if f.instance_id in instances_id]
+
+    return cleaner.Step('floating_ips', list_items,
+                        lambda f: compute_client.floating_ips.delete(f.id))
+
+
+def _clients(manager, names):
+    '''
+    Clients of manager by their names, made before steps are
+    run in threads (all of them reuse token of manager session,
+    so threads sharing them do not authenticate). Client which
+    can not be made is None, so only its steps are skipped.
+    '''
+    clients = {}
+    for name in names:
         try:
-            heat_client = manager._get_heat_client()
-            if heat_client is not None:
-                stacks = heat_client.stacks.list()
-                for s in stacks:
-                    if s.stack_name.startswith('ost1_test-'):
-                        try:
-                            LOG.info('Start stacks deletion.')
-                            heat_client.stacks.delete(s.id)
-                        except Exception:
-                            LOG.debug(traceback.format_exc())
+            client = getattr(manager, name)
         except Exception:
-            LOG.warning(traceback.format_exc())
-
-    instances_id = []
-    servers = manager._get_compute_client().servers.list()
-    floating_ips = manager._get_compute_client().floating_ips.list()
-
-    if servers:
-        for s in servers:
-            if s.name.startswith('ost1_test-'):
-                instances_id.append(s.id)
-                for f in floating_ips:
-                    if f.instance_id in instances_id:
-                        try:
-                            LOG.info('Delete floating ip %s' % f.ip)
-                            manager._get_compute_client().floating_ips.delete(
-                                f.id)
-                        except Exception:
-                            LOG.debug(traceback.format_exc())
-                try:
-                    LOG.info('Delete server with name %s' % s.name)
-                    manager._get_compute_client().servers.delete(s.id)
-                except Exception:
-                    LOG.debug(traceback.format_exc())
-    else:
-        LOG.info('No servers found')
-
-        for s in servers:
-            try:
-                LOG.info('Wait for server terminations')
-                manager.wait_for_server_termination(s)
-            except Exception:
-                LOG.debug(traceback.format_exc())
-
-    _delete_it(manager._get_compute_client().keypairs,
-               'Start keypair deletion')
-    _delete_it(manager._get_identity_client().users, 'Start deletion of users')
-    _delete_it(manager._get_identity_client().tenants, 'Start tenant deletion')
-    roles = manager._get_identity_client().roles.list()
-    if roles:
-        _delete_it(manager._get_identity_client().roles,
-                   'Start roles deletion')
-    else:
-        LOG.info('no roles')
-    _delete_it(manager._get_compute_client().images, 'Start images deletion')
-    _delete_it(manager._get_volume_client().volumes, 'Start volumes deletion')
-    _delete_it(manager._get_compute_client().flavors, 'start flavors deletion')
-    _delete_it(manager._get_volume_client().volume_types,
-               'start deletion of volume types')
-    _delete_it(manager._get_compute_client().security_groups,
-               'Start deletion of security groups', delete_type='id')
-
-
-def _delete_it(client, log_message, name='ost1_test-', delete_type='name'):
-    try:
-        for item in client.list():
-            try:
-                if item.name.startswith(name):
-                    try:
-                        LOG.info(log_message)
-                        if delete_type == 'name':
-                            client.delete(item)
-                        else:
-                            client.delete(item.id)
-                    except Exception:
-                        LOG.debug(traceback.format_exc())
-            except AttributeError:
-                if item.display_name.startswith(name):
-                    client.delete(item)
-    except Exception:
-        LOG.warning(traceback.format_exc())
+            LOG.debug(traceback.format_exc())
+            LOG.warning('Can not initialize %s, its resources '
+                        'are not cleaned up', name)
+            client = None
+        clients[name] = client
+    return clients
+
+
+def _steps(manager, cluster_deployment_info):
+    '''
+    Deletion steps of resources created by tests. Step is run
+    after steps it depends on are finished: servers are deleted
+    after their floating ips and before resources they use,
+    sahara templates after clusters using them, etc.
+    '''
+    steps = []
+
+    names = ['compute_client', 'identity_client', 'volume_client']
+    for service in ('sahara', 'murano', 'ceilometer', 'heat'):
+        if service in cluster_deployment_info:
+            names.append(service + '_client')
+    clients = _clients(manager, names)
+
+    sahara_client = clients.get('sahara_client')
+    if sahara_client is not None:
+        steps.extend([
+            _manager_step('sahara_clusters', sahara_client.clusters,
+                          prefix='ostf-test-', delete_type='id', wait=True),
+            _manager_step('sahara_cluster_templates',
+                          sahara_client.cluster_templates, delete_type='id',
+                          depends=['sahara_clusters']),
+            _manager_step('sahara_node_group_templates',
+                          sahara_client.node_group_templates,
+                          delete_type='id',
+                          depends=['sahara_cluster_templates']),
+        ])
+
+    compute_client = clients['compute_client']
+    identity_client = clients['identity_client']
+    volume_client = clients['volume_client']
+
+    murano_client = clients.get('murano_client')
+    if murano_client is not None:
+        steps.append(_murano_environments_step(manager, murano_client))
+    if 'murano' in cluster_deployment_info and compute_client is not None:
+        steps.append(_manager_step(
+            'murano_flavors', compute_client.flavors,
+            delete_type='id', depends=['murano_environments'],
+            match=lambda flavor: 'ostf_test_Murano' in flavor.name))
+
+    ceilometer_client = clients.get('ceilometer_client')
+    if ceilometer_client is not None:
+        steps.append(_manager_step('alarms', ceilometer_client.alarms,
+                                   delete_type='id'))
+
+    heat_client = clients.get('heat_client')
+    if heat_client is not None:
+        steps.append(_manager_step(
+            'stacks', heat_client.stacks, delete_type='id', wait=True,
+            match=_named('ost1_test-', 'stack_name')))
+
+    if compute_client is not None:
+        steps.extend([
+            _floating_ips_step(compute_client),
+            _manager_step('servers', compute_client.servers,
+                          delete_type='id',
+                          depends=['floating_ips', 'stacks'], wait=True),
+            _manager_step('keypairs', compute_client.keypairs,
+                          depends=['servers']),
+            _manager_step('images', compute_client.images,
+                          depends=['servers']),
+            _manager_step('flavors', compute_client.flavors,
+                          depends=['servers']),
+            _manager_step('security_groups', compute_client.security_groups,
+                          delete_type='id', depends=['servers', 'stacks']),
+        ])
+
+    if identity_client is not None:
+        steps.extend([
+            _manager_step('users', identity_client.users),
+            _manager_step('tenants', identity_client.tenants,
+                          depends=['users', 'servers', 'volumes']),
+            _manager_step('roles', identity_client.roles),
+        ])
+
+    if volume_client is not None:
+        steps.extend([
+            _manager_step('volumes', volume_client.volumes,
+                          depends=['servers'], wait=True),
+            _manager_step('volume_types', volume_client.volume_types,
+                          depends=['volumes']),
+        ])
+
+    return steps
 
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import threading
+import time
+import traceback
+
+from fuel_health.common import waiter
+from fuel_health import exceptions
+
+
+LOG = logging.getLogger(__name__)
+
+
+def item_name(item):
+    for attr in ('name', 'display_name', 'stack_name'):
+        name = getattr(item, attr, None)
+        if name:
+            return name
+    if isinstance(item, dict):
+        return item.get('name', item.get('id'))
+    return getattr(item, 'id', repr(item))
+
+
+class Step(object):
+    """
+    Deletion of resources of single kind.
+
+    list_items() returns resources to delete, delete_item(item)
+    requests deletion of one of them. If fetch is given (see
+    ResourcesWaiter.add), step is finished only when check
+    confirms that all deleted resources are gone, so steps
+    depending on it do not stumble over them.
+    """
+
+    def __init__(self, name, list_items, delete_item, depends=(),
+                 fetch=None, check=None):
+        self.name = name
+        self.list_items = list_items
+        self.delete_item = delete_item
+        self.depends = tuple(depends)
+        self.fetch = fetch
+        self.check = check
+
+
+class StepResult(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.deleted = []
+        self.failed = {}
+        self.duration = 0.0
+
+    def to_dict(self):
+        return {'deleted': self.deleted,
+                'failed': self.failed,
+                'duration': round(self.duration, 3)}
+
+
+class Cleaner(object):
+    """
+    Runs deletion steps, each of them in separate thread as soon
+    as steps it depends on are finished, so independent kinds of
+    resources are deleted concurrently. Steps depending on unknown
+    steps (e.g. of services not deployed) do not wait for them.
+
+    Deleted resources of step are waited for together with single
+    fetch per poll, for timeout seconds at most.
+    """
+
+    def __init__(self, steps, timeout=60, waiter_factory=waiter.Waiter):
+        self.steps = steps
+        self.timeout = timeout
+        self.waiter_factory = waiter_factory
+        self._finished = dict((step.name, threading.Event())
+                              for step in steps)
+        self.results = dict((step.name, StepResult(step.name))
+                            for step in steps)
+
+    def run(self):
+        """Returns summary: results of steps by their names."""
+        started = time.time()
+        threads = [threading.Thread(target=self._run_step, args=(step,),
+                                    name='cleanup-' + step.name)
+                   for step in self.steps]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        summary = dict((name, result.to_dict())
+                       for name, result in self.results.iteritems())
+        LOG.info('Cleanup finished in %.1f s: %s',
+                 time.time() - started, summary)
+        return summary
+
+    def _run_step(self, step):
+        try:
+            for name in step.depends:
+                if name in self._finished:
+                    self._finished[name].wait()
+
+            result = self.results[step.name]
+            started = time.time()
+            try:
+                self._delete(step, result)
+            except Exception as exc:
+                LOG.debug(traceback.format_exc())
+                result.failed['*'] = str(exc)
+            result.duration = time.time() - started
+        finally:
+            self._finished[step.name].set()
+
+    def _delete(self, step, result):
+        resources = waiter.ResourcesWaiter(self.waiter_factory())
+        names = {}
+
+        for item in step.list_items():
+            name = item_name(item)
+            try:
+                LOG.info('Delete %s %s', step.name, name)
+                step.delete_item(item)
+            except Exception as exc:
+                if not waiter.is_not_found(exc):
+                    LOG.debug(traceback.format_exc())
+                    result.failed[name] = str(exc)
+                    continue
+            result.deleted.append(name)
+
+            if step.fetch is not None:
+                names[item.id] = name
+                resources.add(step.name, item.id, step.fetch, step.check)
+
+        try:
+            resources.wait(self.timeout)
+        except exceptions.ResourcesWaitError as exc:
+            for kind, resource_id, error in exc.failures:
+                name = names[resource_id]
+                result.deleted.remove(name)
+                result.failed[name] = str(error)
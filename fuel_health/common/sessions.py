@@ -0,0 +1,91 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import threading
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+REFRESH_MARGIN = 300
+
+
+class Session(object):
+    """
+    Authentication made with single credential set and clients
+    made with it. authenticate() returns (auth, expires_at) where
+    expires_at is timestamp (or None if auth does not expire).
+
+    Authentication is made on the first use and repeated when it
+    expires in less than refresh_margin seconds; clients made with
+    previous authentication are dropped then and made again on
+    their next use.
+    """
+
+    def __init__(self, authenticate, refresh_margin=REFRESH_MARGIN,
+                 clock=time.time):
+        self._authenticate = authenticate
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self.auth = None
+        self.expires_at = None
+        self.clients = {}
+        self._lock = threading.RLock()
+
+    def _is_fresh(self):
+        if self.auth is None:
+            return False
+        return self.expires_at is None or \
+            self.expires_at - self.refresh_margin > self.clock()
+
+    def get_auth(self):
+        with self._lock:
+            if not self._is_fresh():
+                if self.auth is not None:
+                    LOG.debug('Authentication expires at %s, refreshing',
+                              self.expires_at)
+                self.auth, self.expires_at = self._authenticate()
+                self.clients.clear()
+            return self.auth
+
+    def client(self, name, factory):
+        """Client name made by factory() once per authentication."""
+        with self._lock:
+            self.get_auth()
+            if name not in self.clients:
+                self.clients[name] = factory()
+            return self.clients[name]
+
+
+class SessionCache(object):
+    """Sessions of process by keys of their credential sets."""
+
+    def __init__(self, refresh_margin=REFRESH_MARGIN, clock=time.time):
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, authenticate):
+        with self._lock:
+            if key not in self._sessions:
+                self._sessions[key] = Session(authenticate,
+                                              self.refresh_margin,
+                                              self.clock)
+            return self._sessions[key]
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
@@ -15,9 +15,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import atexit
+import collections
 import logging
 import os
-import select
 import socket
 import time
 import traceback
@@ -25,6 +26,10 @@ import warnings
 
 LOG = logging.getLogger(__name__)
 
+from fuel_health.common import ssh_multi
+from fuel_health.common import ssh_pool
+from fuel_health.common import ssh_stream
+from fuel_health import config
 from fuel_health import exceptions
 
 with warnings.catch_warnings():
@@ -32,6 +37,37 @@ with warnings.catch_warnings():
     import paramiko
 
 
+ERROR_OUTPUT_LIMIT = 65536
+
+POOL = ssh_pool.ConnectionPool()
+atexit.register(POOL.close_all)
+config.RESET_HOOKS.append(POOL.close_all)
+
+# transports to instances tunneled through connections to controllers,
+# keyed by instance address first, see Client.exec_command_on_vm
+VM_POOL = ssh_pool.ConnectionPool()
+atexit.register(VM_POOL.close_all)
+config.RESET_HOOKS.append(VM_POOL.close_all)
+
+
+def forget_vm(address):
+    """Closes cached transports to deleted instance with address."""
+    VM_POOL.discard_host(address)
+
+
+class _NestedConnection(object):
+    """Transport to instance, for VM_POOL."""
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.transport.close()
+
+
 class Client(object):
 
     def __init__(self, host, username, password=None, timeout=300, pkey=None,
@@ -50,7 +86,7 @@ class Client(object):
         self.key_filename = key_filename
         self.timeout = int(timeout)
         self.channel_timeout = float(channel_timeout)
-        self.buf_size = 1024
+        self.buf_size = ssh_stream.BUF_SIZE
 
     def _get_key_from_file(self, path):
         f_path = os.popen('ls %s' % path, 'r').read().strip('\n')
@@ -87,6 +123,52 @@ class Client(object):
                                         key_filename=self.key_filename)
         return ssh
 
+    def _pool_key(self):
+        pkey = self.pkey.get_fingerprint() if self.pkey else None
+        return (self.host, self.username, self.password, pkey,
+                self.key_filename, self.look_for_keys)
+
+    def _open_pooled_channel(self, pool, key, connect, kind, *args):
+        """
+        Opens new channel on pooled connection, connection found
+        to be broken is replaced once.
+        """
+        ssh = pool.get(key, connect)
+        try:
+            return ssh.get_transport().open_channel(kind, *args)
+        except (paramiko.SSHException, EOFError, socket.error):
+            LOG.debug(traceback.format_exc())
+            pool.discard(key, ssh)
+        ssh = pool.get(key, connect)
+        return ssh.get_transport().open_channel(kind, *args)
+
+    def _open_channel(self, kind='session', *args):
+        """Opens new channel on pooled connection to the server."""
+        return self._open_pooled_channel(POOL, self._pool_key(),
+                                         self._get_ssh_connection,
+                                         kind, *args)
+
+    def _connect_to_vm(self, vm, user, password):
+        channel = self._open_channel('direct-tcpip', (vm, 22), (self.host, 0))
+        transport = paramiko.Transport(channel)
+        try:
+            transport.start_client()
+            transport.auth_password(user, password)
+        except Exception:
+            transport.close()
+            raise
+        return _NestedConnection(transport)
+
+    def _open_vm_channel(self, vm, user, password):
+        """
+        Opens new channel on transport to instance, which is
+        authenticated once and kept in VM_POOL for next commands.
+        """
+        key = (vm, self.host, self.username, user, password)
+        return self._open_pooled_channel(
+            VM_POOL, key, lambda: self._connect_to_vm(vm, user, password),
+            'session')
+
     def exec_longrun_command(self, cmd):
         """
         Execute the specified command on the server.
@@ -97,11 +179,13 @@ class Client(object):
 
         :returns: data read from standard output of the command.
         """
-        s = self._get_ssh_connection()
-        _, stdout, stderr = s.exec_command(cmd)
-        res = stdout.read()
-        err_res = stderr.read()
-        s.close()
+        channel = self._open_channel()
+        try:
+            channel.exec_command(cmd)
+            res = channel.makefile('rb').read()
+            err_res = channel.makefile_stderr('rb').read()
+        finally:
+            channel.close()
         return res, err_res
 
     def _is_timed_out(self, timeout, start_time):
@@ -122,51 +206,88 @@ class Client(object):
             LOG.debug(traceback.format_exc())
             return
 
-    def exec_command(self, cmd):
+    def _stdout_chunks(self, channel, command, output, errors):
+        message = "Command: '{0}' executed on host '{1}'.".format(
+            command, self.host)
+        for stream, data in ssh_stream.read_channel(
+                channel, self.channel_timeout, message, self.buf_size):
+            if stream == 'stderr':
+                errors.write(data)
+            else:
+                output.write(data)
+                yield data
+
+    def _read_output(self, channel, command, lines=False, max_line=None):
+        """
+        Generator of standard output of command started on channel.
+        Only the beginning and the end of outputs are kept for
+        error message, so memory used does not depend on output size.
+        """
+        output = ssh_stream.HeadTailBuffer(ERROR_OUTPUT_LIMIT)
+        errors = ssh_stream.HeadTailBuffer(ERROR_OUTPUT_LIMIT)
+        chunks = self._stdout_chunks(channel, command, output, errors)
+        if lines:
+            chunks = ssh_stream.iter_lines(chunks, max_line)
+        for data in chunks:
+            yield data
+
+        exit_status = channel.recv_exit_status()
+        if 0 != exit_status:
+            raise exceptions.SSHExecCommandFailed(
+                command=command, exit_status=exit_status,
+                strerror=errors.getvalue() + output.getvalue())
+
+    def stream_command(self, cmd, lines=False, max_line=None):
+        """
+        Execute the specified command on the server and iterate
+        over its standard output as it arrives, by chunks or by
+        lines (if lines is true). Lines longer than max_line bytes
+        are yielded in parts of max_line bytes.
+
+        Closing iterator before the end of output (e.g. breaking
+        loop over it) closes the channel, exit status of the command
+        is not checked then.
+
+        :raises: SSHExecCommandFailed after the whole output is read
+                 if command returns nonzero status.
+        """
+        channel = self._open_channel()
+        try:
+            channel.get_pty()
+            channel.fileno()  # Register event pipe
+            channel.exec_command(cmd)
+            channel.shutdown_write()
+            for data in self._read_output(channel, cmd, lines, max_line):
+                yield data
+        finally:
+            channel.close()
+
+    def exec_command(self, cmd, max_output=None, until=None):
         """
         Execute the specified command on the server.
 
-        Note that this method is reading whole command outputs to memory, thus
-        shouldn't be used for large outputs.
+        Output is read to memory, for large outputs max_output
+        limits it to its first and last max_output / 2 bytes.
+        If until is given, it is called with each line of output
+        and reading is stopped as soon as it returns true value
+        (exit status of the command is not checked then). Lines
+        longer than max_output are passed to until in parts.
 
         :returns: data read from standard output of the command.
         :raises: SSHExecCommandFailed if command returns nonzero
                  status. The exception contains command status stderr content.
         """
-        ssh = self._get_ssh_connection()
-        transport = ssh.get_transport()
-        channel = transport.open_session()
-        channel.get_pty()
-        channel.fileno()  # Register event pipe
-        channel.exec_command(cmd)
-        channel.shutdown_write()
-        out_data = []
-        err_data = []
-
-        select_params = [channel], [], [], self.channel_timeout
-        while True:
-            ready = select.select(*select_params)
-            if not any(ready):
-                raise exceptions.TimeoutException(
-                    "Command: '{0}' executed on host '{1}'.".format(
-                        cmd, self.host))
-            if not ready[0]:        # If there is nothing to read.
-                continue
-            out_chunk = err_chunk = None
-            if channel.recv_ready():
-                out_chunk = channel.recv(self.buf_size)
-                out_data += out_chunk,
-            if channel.recv_stderr_ready():
-                err_chunk = channel.recv_stderr(self.buf_size)
-                err_data += err_chunk,
-            if channel.closed and not err_chunk and not out_chunk:
-                break
-        exit_status = channel.recv_exit_status()
-        if 0 != exit_status:
-            raise exceptions.SSHExecCommandFailed(
-                command=cmd, exit_status=exit_status,
-                strerror=''.join(err_data).join(out_data))
-        return ''.join(out_data)
+        output = ssh_stream.HeadTailBuffer(max_output)
+        stream = self.stream_command(cmd, lines=until is not None,
+                                     max_line=max_output)
+        try:
+            for data in stream:
+                output.write(data)
+                if until is not None and until(data):
+                    break
+        finally:
+            stream.close()
+        return output.getvalue()
 
     def test_connection_auth(self):
         """Returns true if ssh can connect to server."""
@@ -188,45 +309,40 @@ class Client(object):
         :returns: data read from standard output of the command.
         :raises: SSHExecCommandFailed if command returns nonzero
             status. The exception contains command status stderr content."""
-        ssh = self._get_ssh_connection()
-        _intermediate_transport = ssh.get_transport()
-        _intermediate_channel = \
-            _intermediate_transport.open_channel('direct-tcpip',
-                                                 (vm, 22),
-                                                 (self.host, 0))
-        transport = paramiko.Transport(_intermediate_channel)
-        transport.start_client()
-        transport.auth_password(user, password)
-        channel = transport.open_session()
-        channel.exec_command(command)
-        exit_status = channel.recv_exit_status()
-        channel.shutdown_write()
-        out_data = []
-        err_data = []
-
-        select_params = [channel], [], [], self.channel_timeout
-        while True:
-            ready = select.select(*select_params)
-            if not any(ready):
-                raise exceptions.TimeoutException(
-                    "Command: '{0}' executed on host '{1}'.".format(
-                        command, self.host))
-            if not ready[0]:        # If there is nothing to read.
-                continue
-            out_chunk = err_chunk = None
-            if channel.recv_ready():
-                out_chunk = channel.recv(self.buf_size)
-                out_data += out_chunk,
-            if channel.recv_stderr_ready():
-                err_chunk = channel.recv_stderr(self.buf_size)
-                err_data += err_chunk,
-            if channel.closed and not err_chunk and not out_chunk:
-                break
-        if 0 != exit_status:
-            raise exceptions.SSHExecCommandFailed(
-                command=command, exit_status=exit_status,
-                strerror=''.join(err_data).join(out_data))
-        return ''.join(out_data)
+        channel = self._open_vm_channel(vm, user, password)
+        try:
+            channel.exec_command(command)
+            channel.shutdown_write()
+            output = ''.join(self._read_output(channel, command))
+        finally:
+            channel.close()
+        return output
 
     def close_ssh_connection(self, connection):
         connection.close()
+
+
+class MultiClient(object):
+    """
+    Runs the same command on several hosts concurrently, with
+    Client per host made with the same arguments, e.g.
+
+        results = MultiClient(controllers, 'root',
+                              key_filename=key).exec_command(cmd, 20)
+        if results.failed: ...
+    """
+
+    def __init__(self, hosts, username, **kwargs):
+        self.clients = collections.OrderedDict(
+            (host, Client(host, username, **kwargs)) for host in hosts)
+
+    def exec_command(self, cmd, timeout=None, **kwargs):
+        """
+        Executes cmd (see Client.exec_command for kwargs) on all
+        hosts, waiting for each of them timeout seconds at most.
+
+        :returns: ssh_multi.Results of hosts.
+        """
+        return ssh_multi.run_on_hosts(
+            lambda client: client.exec_command(cmd, **kwargs),
+            self.clients, timeout)
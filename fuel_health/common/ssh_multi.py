@@ -0,0 +1,113 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import logging
+import threading
+import time
+import traceback
+
+from fuel_health import exceptions
+
+
+LOG = logging.getLogger(__name__)
+
+
+class HostResult(object):
+    """Outcome of command on single host."""
+
+    def __init__(self, host, exit_code=None, output=None, duration=None,
+                 error=None):
+        self.host = host
+        self.exit_code = exit_code
+        self.output = output
+        self.duration = duration
+        self.error = error
+
+    @property
+    def succeeded(self):
+        return self.error is None and self.exit_code == 0
+
+    def __repr__(self):
+        return ('<HostResult host={0} exit_code={1} duration={2} '
+                'error={3!r}>'.format(self.host, self.exit_code,
+                                      self.duration, self.error))
+
+
+class Results(collections.OrderedDict):
+    """HostResults by hosts, in order of hosts."""
+
+    @property
+    def succeeded(self):
+        return [result for result in self.itervalues() if result.succeeded]
+
+    @property
+    def failed(self):
+        return [result for result in self.itervalues()
+                if not result.succeeded]
+
+    def outputs(self):
+        return collections.OrderedDict(
+            (host, result.output) for host, result in self.iteritems())
+
+
+def run_on_hosts(func, targets, timeout=None):
+    """
+    Calls func(target) for targets (dict of them by hosts)
+    concurrently, each in its own thread. Returns Results; output
+    is what func returned, exit code is 0 then or exit_status of
+    exception raised by func. Hosts which did not finish in
+    timeout seconds get TimeoutException as error, their threads
+    are left to finish in background.
+    """
+    finished = {}
+
+    def run(host, target):
+        result = HostResult(host)
+        started = time.time()
+        try:
+            result.output = func(target)
+            result.exit_code = 0
+        except Exception as exc:
+            LOG.debug(traceback.format_exc())
+            result.error = exc
+            result.exit_code = getattr(exc, 'exit_status', None)
+        result.duration = time.time() - started
+        finished[host] = result
+
+    threads = []
+    for host, target in targets.iteritems():
+        thread = threading.Thread(target=run, args=(host, target),
+                                  name='ssh-' + str(host))
+        thread.daemon = True
+        thread.start()
+        threads.append((host, thread))
+
+    results = Results()
+    deadline = None if timeout is None else time.time() + timeout
+    for host, thread in threads:
+        if deadline is None:
+            thread.join()
+        else:
+            thread.join(max(deadline - time.time(), 0))
+        if host in finished:
+            results[host] = finished[host]
+        else:
+            results[host] = HostResult(
+                host, duration=timeout,
+                error=exceptions.TimeoutException(
+                    'No result from {0} in {1} s'.format(host, timeout)))
+
+    LOG.debug('Results of hosts: %s', results.values())
+    return results
@@ -0,0 +1,149 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import threading
+import time
+import traceback
+
+
+LOG = logging.getLogger(__name__)
+
+MAX_PER_HOST = 4
+IDLE_TIMEOUT = 300
+KEEPALIVE = 30
+
+
+def is_alive(ssh):
+    transport = ssh.get_transport()
+    return transport is not None and transport.is_active()
+
+
+def close_quietly(ssh):
+    try:
+        ssh.close()
+    except Exception:
+        LOG.debug(traceback.format_exc())
+
+
+class _Connection(object):
+
+    def __init__(self, ssh, last_used):
+        self.ssh = ssh
+        self.last_used = last_used
+
+
+class ConnectionPool(object):
+    """
+    Pool of ssh connections (paramiko.SSHClient) of process, one
+    per key: host, user and credentials. Every command opens its
+    own channel on transport of pooled connection, so handshake
+    and authentication are done once per key, not per command.
+
+    Transports send keepalives every keepalive seconds, so dead
+    connections are detected and replaced on the next get.
+    Connections not used for idle_timeout seconds are closed, and
+    no more than max_per_host connections are kept per host: the
+    least recently used one is closed to make room for new one.
+    """
+
+    def __init__(self, max_per_host=MAX_PER_HOST, idle_timeout=IDLE_TIMEOUT,
+                 keepalive=KEEPALIVE, clock=time.time):
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self.clock = clock
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def _pop_idle(self):
+        now = self.clock()
+        idle = [key for key, conn in self._connections.iteritems()
+                if now - conn.last_used > self.idle_timeout or
+                not is_alive(conn.ssh)]
+        return [self._connections.pop(key).ssh for key in idle]
+
+    def _pop_least_recently_used(self, host):
+        on_host = sorted((conn.last_used, key)
+                         for key, conn in self._connections.iteritems()
+                         if key[0] == host)
+        excess = len(on_host) - self.max_per_host + 1
+        return [self._connections.pop(key).ssh
+                for _, key in on_host[:max(excess, 0)]]
+
+    def get(self, key, connect):
+        """
+        Returns live connection of key (its first item is host),
+        connect() is called to make new one when there is none.
+        Connecting is done without lock, so connections to
+        different hosts are made concurrently.
+        """
+        with self._lock:
+            stale = self._pop_idle()
+            conn = self._connections.get(key)
+            if conn is not None:
+                conn.last_used = self.clock()
+        for ssh in stale:
+            close_quietly(ssh)
+        if conn is not None:
+            return conn.ssh
+
+        ssh = connect()
+        if self.keepalive:
+            ssh.get_transport().set_keepalive(self.keepalive)
+
+        with self._lock:
+            conn = self._connections.get(key)
+            if conn is not None:
+                # made by another thread meanwhile
+                stale = [ssh]
+            else:
+                stale = self._pop_least_recently_used(key[0])
+                conn = self._connections[key] = _Connection(ssh, 0)
+            conn.last_used = self.clock()
+        for extra in stale:
+            close_quietly(extra)
+        return conn.ssh
+
+    def discard(self, key, ssh):
+        """Closes connection of key found to be broken."""
+        with self._lock:
+            conn = self._connections.get(key)
+            if conn is not None and conn.ssh is ssh:
+                del self._connections[key]
+        close_quietly(ssh)
+
+    def discard_host(self, host):
+        """Closes all connections of host (e.g. deleted one)."""
+        with self._lock:
+            keys = [key for key in self._connections if key[0] == host]
+            stale = [self._connections.pop(key).ssh for key in keys]
+        for ssh in stale:
+            close_quietly(ssh)
+
+    def close_idle(self):
+        with self._lock:
+            stale = self._pop_idle()
+        for ssh in stale:
+            close_quietly(ssh)
+
+    def close_all(self):
+        with self._lock:
+            stale = [conn.ssh for conn in self._connections.itervalues()]
+            self._connections.clear()
+        for ssh in stale:
+            close_quietly(ssh)
+
+    def __len__(self):
+        return len(self._connections)
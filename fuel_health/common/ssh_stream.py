@@ -0,0 +1,139 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import select
+
+from fuel_health import exceptions
+
+
+BUF_SIZE = 4096
+MAX_BUF_SIZE = 65536
+
+
+class HeadTailBuffer(object):
+    """
+    Keeps output of command. When limit (bytes) is given, only
+    the first and the last limit / 2 bytes are kept, so memory
+    used for output does not depend on its size and both the
+    beginning and the end of output (where errors usually are)
+    are kept.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.head = []
+        self.head_size = 0
+        self.tail = ''
+        self.skipped = 0
+
+    def write(self, data):
+        if self.limit is None:
+            self.head.append(data)
+            return
+
+        head_limit = self.limit // 2
+        if self.head_size < head_limit:
+            part = data[:head_limit - self.head_size]
+            self.head.append(part)
+            self.head_size += len(part)
+            data = data[len(part):]
+
+        tail_limit = self.limit - head_limit
+        tail = self.tail + data
+        self.skipped += max(len(tail) - tail_limit, 0)
+        self.tail = tail[-tail_limit:] if tail_limit else ''
+
+    def getvalue(self):
+        head = ''.join(self.head)
+        if not self.skipped:
+            return head + self.tail
+        return '{0}\n... {1} bytes skipped ...\n{2}'.format(
+            head, self.skipped, self.tail)
+
+
+def iter_lines(chunks, max_line=None):
+    """
+    Regroups chunks of output into lines (with line ends).
+
+    Unfinished line is kept as list of its parts, so it is joined
+    once. When max_line (bytes) is given, unfinished line reaching
+    it is yielded in parts of max_line bytes, so output without
+    line ends (progress bars, binary data) does not pile up.
+    """
+    pending = []
+    pending_size = 0
+    for chunk in chunks:
+        # "\r" ending unfinished line may be followed by "\n"
+        if pending and pending[-1].endswith('\r'):
+            pending_size -= len(pending[-1])
+            chunk = pending.pop() + chunk
+
+        parts = chunk.splitlines(True)
+        if parts and not parts[-1].endswith('\n'):
+            tail = parts.pop()
+        else:
+            tail = ''
+
+        for part in parts:
+            pending.append(part)
+            yield ''.join(pending)
+            pending = []
+            pending_size = 0
+
+        if not tail:
+            continue
+        pending.append(tail)
+        pending_size += len(tail)
+
+        if max_line and pending_size >= max_line:
+            line = ''.join(pending)
+            while len(line) >= max_line:
+                yield line[:max_line]
+                line = line[max_line:]
+            pending = [line] if line else []
+            pending_size = len(line)
+
+    if pending:
+        yield ''.join(pending)
+
+
+def read_channel(channel, timeout, message='', buf_size=BUF_SIZE,
+                 max_buf_size=MAX_BUF_SIZE, select=select.select):
+    """
+    Generator of ('stdout' or 'stderr', data) pairs read from
+    paramiko channel until it is closed. Reads are made with
+    buffer of buf_size bytes, which is doubled (up to
+    max_buf_size) whenever it is filled up, so large outputs
+    are read with few large reads.
+
+    Raises TimeoutException with message when nothing is read
+    for timeout seconds.
+    """
+    while True:
+        ready = select([channel], [], [], timeout)
+        if not any(ready):
+            raise exceptions.TimeoutException(message)
+        if not ready[0]:        # If there is nothing to read.
+            continue
+        out_chunk = err_chunk = None
+        if channel.recv_ready():
+            out_chunk = channel.recv(buf_size)
+            yield 'stdout', out_chunk
+        if channel.recv_stderr_ready():
+            err_chunk = channel.recv_stderr(buf_size)
+            yield 'stderr', err_chunk
+        if channel.closed and not err_chunk and not out_chunk:
+            break
+        if buf_size in (len(out_chunk or ''), len(err_chunk or '')):
+            buf_size = min(buf_size * 2, max_buf_size)
@@ -0,0 +1,205 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import logging
+import random
+import time
+
+from fuel_health import exceptions
+
+
+LOG = logging.getLogger(__name__)
+
+
+def is_not_found(exc):
+    # Clients are expected to return an exception
+    # called 'NotFound' if retrieval fails.
+    return exc.__class__.__name__ == 'NotFound'
+
+
+class WaitResult(object):
+    """Outcome of single wait, true if condition was met."""
+
+    def __init__(self, succeeded, polls, waited):
+        self.succeeded = succeeded
+        self.polls = polls
+        self.waited = waited
+
+    def __nonzero__(self):
+        return self.succeeded
+
+    def __repr__(self):
+        return '<WaitResult succeeded={0} polls={1} waited={2:.1f}s>'.format(
+            self.succeeded, self.polls, self.waited)
+
+
+class Waiter(object):
+    """
+    Polls condition with exponentially growing intervals: the
+    first poll is made at once, the next one after first_interval
+    seconds, then interval is multiplied by backoff until it
+    reaches max_interval. Each interval is randomly changed by
+    up to jitter fraction of it, so tests waiting for resources
+    of the same cloud do not poll its API in lockstep.
+
+    Sleep before deadline is shortened so the last poll is made
+    right at the deadline instead of giving up before it.
+    Clock and sleep functions can be replaced (e.g. with
+    simulated ones in tests).
+    """
+
+    def __init__(self, first_interval=1.0, max_interval=10.0, backoff=2.0,
+                 jitter=0.1, clock=time.time, sleep=time.sleep,
+                 rand=random.random):
+        self.first_interval = first_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.clock = clock
+        self.sleep = sleep
+        self.rand = rand
+
+    def intervals(self):
+        interval = min(self.first_interval, self.max_interval)
+        while True:
+            yield interval * (1 + self.jitter * (2 * self.rand() - 1))
+            interval = min(interval * self.backoff, self.max_interval)
+
+    def wait(self, func, timeout, *args):
+        """
+        Calls func with given args until it returns true value
+        or timeout (seconds, None for no timeout) expires.
+        Returns WaitResult.
+        """
+        started = self.clock()
+        deadline = None if timeout is None else started + timeout
+        polls = 0
+
+        for interval in self.intervals():
+            polls += 1
+            if func(*args):
+                succeeded = True
+                break
+
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    succeeded = False
+                    break
+                interval = min(interval, remaining)
+
+            self.sleep(interval)
+
+        result = WaitResult(succeeded, polls, self.clock() - started)
+        LOG.debug('Waiting for %s: %r',
+                  getattr(func, '__name__', func), result)
+        return result
+
+
+class ResourcesWaiter(object):
+    """
+    Waits for several resources, possibly of different kinds, at
+    once. Resources of the same kind are fetched together by single
+    call of fetch(ids) of the kind per poll, which returns dict of
+    fetched resources by their ids (missing resource is absent).
+
+    Each resource is resolved as soon as check(resource) returns
+    true value (resource is None for missing one) and is not polled
+    anymore; check raises to fail the resource. Errors of fetch are
+    considered transient. So waiting takes as long as waiting for
+    the slowest resource and only resources which failed or timed
+    out are reported.
+    """
+
+    def __init__(self, waiter=None):
+        self.waiter = waiter or Waiter()
+        self.fetchers = {}
+        self.pending = collections.OrderedDict()
+        self.resources = collections.OrderedDict()
+        self.failures = []
+
+    def add(self, kind, resource_id, fetch, check, resource=None):
+        """
+        Adds resource to wait for, resource (if known) is checked
+        before the first fetch.
+        """
+        self.fetchers.setdefault(kind, fetch)
+        self.pending[(kind, resource_id)] = check
+        self.resources[(kind, resource_id)] = resource
+
+    def _check(self, key, resource):
+        if resource is not None:
+            self.resources[key] = resource
+        try:
+            done = self.pending[key](resource)
+        except Exception as exc:
+            LOG.debug('Waiting for %s %s failed: %s', key[0], key[1], exc)
+            self.failures.append((_kind_name(key[0]), key[1], exc))
+            done = True
+        if done:
+            del self.pending[key]
+
+    def poll(self):
+        by_kind = collections.OrderedDict()
+        for kind, resource_id in self.pending:
+            by_kind.setdefault(kind, []).append(resource_id)
+
+        for kind, ids in by_kind.iteritems():
+            try:
+                fetched = self.fetchers[kind](ids)
+            except Exception as exc:
+                LOG.debug('Fetching of %s failed: %s', kind, exc)
+                continue
+            for resource_id in ids:
+                self._check((kind, resource_id), fetched.get(resource_id))
+
+        return not self.pending
+
+    def wait(self, timeout, raise_on_failure=True):
+        """
+        Polls pending resources until all of them are resolved or
+        timeout expires. Raises ResourcesWaitError for resources
+        which failed or timed out unless raise_on_failure is false.
+        Returns the last fetched resources in order of adding.
+        """
+        for key, resource in self.resources.items():
+            if key in self.pending and resource is not None:
+                self._check(key, resource)
+
+        if self.pending:
+            self.waiter.wait(self.poll, timeout)
+
+        for kind, resource_id in self.pending:
+            self.failures.append((_kind_name(kind), resource_id,
+                                  exceptions.TimeoutException()))
+        self.pending.clear()
+
+        if self.failures and raise_on_failure:
+            raise exceptions.ResourcesWaitError(self.failures)
+        return self.resources.values()
+
+
+def _kind_name(kind):
+    if isinstance(kind, basestring):
+        return kind
+    return kind.__class__.__name__
+
+
+def wait_until(func, timeout, *args, **kwargs):
+    """
+    Shortcut for Waiter(**kwargs).wait(func, timeout, *args),
+    e.g. wait_until(is_active, 300, max_interval=10).
+    """
+    return Waiter(**kwargs).wait(func, timeout, *args)
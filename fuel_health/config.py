@@ -374,6 +374,22 @@ def register_heat_opts(conf):
         conf.register_opt(opt, group='heat')
 
 
+# functions dropping state which process keeps between test runs,
+# see reset_process_state
+RESET_HOOKS = []
+
+
+def reset_process_state():
+    """Drops configs, keystone sessions and ssh connections of process.
+
+    Worker processes of adapter run tests of many test runs, possibly
+    for other clusters and with other credentials, so this is called
+    before each run to make tests read them from environment again.
+    """
+    for hook in RESET_HOOKS:
+        hook()
+
+
 def process_singleton(cls):
     """Wrapper for classes... To be instantiated only one time per process"""
     instances = {}
@@ -385,6 +401,7 @@ def process_singleton(cls):
             instances[pid] = cls(*args, **kwargs)
         return instances[pid]
 
+    RESET_HOOKS.append(instances.clear)
     return wrapper
 
 
@@ -152,6 +152,11 @@ class SSHExecCommandFailed(FuelException):
     message = ("Command '%(command)s', exit status: %(exit_status)d, "
                "Error:\n%(strerror)s")
 
+    def __init__(self, *args, **kwargs):
+        super(SSHExecCommandFailed, self).__init__(*args, **kwargs)
+        self.exit_status = kwargs.get('exit_status')
+        self.strerror = kwargs.get('strerror')
+
 
 class ServerUnreachable(FuelException):
     message = "The server is not reachable via the configured network"
@@ -165,6 +170,17 @@ class TearDownException(FuelException):
     message = "%(num)d cleanUp operation failed"
 
 
+class ResourcesWaitError(FuelException):
+    """Raised when some of resources waited for together failed."""
+    message = "%(num)d of resources failed to reach expected state"
+
+    def __init__(self, failures, *args, **kwargs):
+        kwargs.setdefault('num', len(failures))
+        args = args + tuple('%s %s: %s' % failure for failure in failures)
+        super(ResourcesWaitError, self).__init__(*args, **kwargs)
+        self.failures = failures
+
+
 class RFCViolation(RestClientException):
     message = "RFC Violation"
 
@@ -21,6 +21,7 @@ import os
 
 from fuel_health.common.utils.data_utils import rand_name
 import fuel_health.common.ssh
+from fuel_health.common import waiter
 import fuel_health.nmanager
 import fuel_health.test
 
@@ -116,9 +117,8 @@ class HeatBaseTest(fuel_health.nmanager.NovaNetworkScenarioTest):
                       "Currently in %s status",
                       stack, expected_status, new_status)
 
-        if not fuel_health.test.call_until_true(check_status,
-                                                timeout,
-                                                interval):
+        if not waiter.wait_until(check_status, timeout,
+                                 max_interval=interval):
             self.fail("Timed out waiting to become %s"
                       % expected_status)
 
@@ -16,11 +16,11 @@
 import json
 import logging
 import requests
-import time
 import traceback
 
 import muranoclient.common.exceptions as exceptions
 from fuel_health.common.utils.data_utils import rand_name
+from fuel_health.common import waiter
 import fuel_health.nmanager
 
 LOG = logging.getLogger(__name__)
@@ -287,10 +287,11 @@ class MuranoTest(fuel_health.nmanager.PlatformServicesBaseClass):
             Returns environment.
         """
 
-        environment = self.get_environment(environment_id)
-        while environment['status'] != 'ready':
-            time.sleep(5)
+        environments = []
+
+        def is_ready():
             environment = self.get_environment(environment_id)
+            environments.append(environment)
             if environment['status'] == 'deploy failure':
                 LOG.error(
                     'Environment has incorrect status'
@@ -298,7 +299,11 @@ class MuranoTest(fuel_health.nmanager.PlatformServicesBaseClass):
                 self.fail(
                     'Environment has incorrect status'
                     ' %s .' % environment['status'])
-        return environment
+            return environment['status'] == 'ready'
+
+        # deployment is limited by timeout of test itself
+        waiter.wait_until(is_ready, None, max_interval=5)
+        return environments[-1]
 
     def deployments_status_check(self, environment_id):
         """
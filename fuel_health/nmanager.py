@@ -16,6 +16,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import calendar
 import logging
 import time
 import traceback
@@ -50,32 +51,115 @@ import cinderclient.client
 import keystoneclient
 import novaclient.client
 
+import fuel_health.common.ssh
+from fuel_health.common import sessions
 from fuel_health.common.ssh import Client as SSHClient
+from fuel_health.common import waiter
 from fuel_health.common.utils.data_utils import rand_name
 from fuel_health.common.utils.data_utils import rand_int_id
+import fuel_health.config
 from fuel_health import exceptions
 import fuel_health.manager
 import fuel_health.test
 
 
+DELETED_STATUSES = ('deleted', 'delete_complete')
+DELETION_TIMEOUT = 60
+
+
+def list_fetcher(manager):
+    """
+    Fetches resources of manager for ResourcesWaiter with single
+    list call, managers without list fetch them one by one.
+    """
+    def fetch_listed(ids):
+        ids = set(ids)
+        return dict((resource.id, resource) for resource in manager.list()
+                    if resource.id in ids)
+
+    def fetch_each(ids):
+        fetched = {}
+        for resource_id in ids:
+            try:
+                fetched[resource_id] = manager.get(resource_id)
+            except Exception as exc:
+                if not waiter.is_not_found(exc):
+                    raise
+        return fetched
+
+    if hasattr(manager, 'list'):
+        return fetch_listed
+    return fetch_each
+
+
+def is_deleted(resource):
+    return resource is None or \
+        str(getattr(resource, 'status', '')).lower() in DELETED_STATUSES
+
+
+def forget_server_connections(server):
+    """Closes cached ssh transports to addresses of deleted server."""
+    for addresses in (getattr(server, 'addresses', None) or {}).values():
+        for address in addresses:
+            fuel_health.common.ssh.forget_vm(address['addr'])
+
+
+# keystone authentications (and clients made with them) of worker
+# process by credential sets, shared by managers of all test classes
+SESSIONS = sessions.SessionCache()
+fuel_health.config.RESET_HOOKS.append(SESSIONS.clear)
+
+
+def _session_client(name, factory):
+    """
+    Client of manager made on first access by factory(manager),
+    once per authentication of admin session.
+    """
+    def get(self):
+        return self.session.client(name, lambda: factory(self))
+    return property(get)
+
+
 class OfficialClientManager(fuel_health.manager.Manager):
     """
     Manager that provides access to the official python clients for
     calling various OpenStack APIs.
+
+    Keystone is authenticated once per credential set in process,
+    clients are made on first access and shared by all managers.
     """
 
     NOVACLIENT_VERSION = '2'
     CINDERCLIENT_VERSION = '1'
 
+    compute_client = _session_client(
+        'compute_client', lambda self: self._get_compute_client())
+    identity_client = _session_client(
+        'identity_client', lambda self: self._get_identity_client())
+    identity_v3_client = _session_client(
+        'identity_v3_client',
+        lambda self: self._get_identity_client(version=3))
+    volume_client = _session_client(
+        'volume_client', lambda self: self._get_volume_client())
+    heat_client = _session_client(
+        'heat_client', lambda self: self._get_heat_client())
+    murano_client = _session_client(
+        'murano_client', lambda self: self._get_murano_client())
+    sahara_client = _session_client(
+        'sahara_client', lambda self: self._get_sahara_client())
+    ceilometer_client = _session_client(
+        'ceilometer_client', lambda self: self._get_ceilometer_client())
+    neutron_client = _session_client(
+        'neutron_client', lambda self: self._get_neutron_client())
+
     def __init__(self):
         super(OfficialClientManager, self).__init__()
         self.clients_initialized = False
         self.traceback = ''
         self.keystone_error_message = None
-        self.compute_client = self._get_compute_client()
+        self.session = self._get_session()
         try:
-            self.identity_client = self._get_identity_client()
-            self.identity_v3_client = self._get_identity_client(version=3)
+            self.session.get_auth()
             self.clients_initialized = True
         except Exception as e:
             if e.__class__.__name__ == 'Unauthorized':
@@ -92,12 +176,6 @@ class OfficialClientManager(fuel_health.manager.Manager):
             self.traceback = traceback.format_exc()
 
         if self.clients_initialized:
-            self.volume_client = self._get_volume_client()
-            self.heat_client = self._get_heat_client()
-            self.murano_client = self._get_murano_client()
-            self.sahara_client = self._get_sahara_client()
-            self.ceilometer_client = self._get_ceilometer_client()
-            self.neutron_client = self._get_neutron_client()
             self.client_attr_names = [
                 'compute_client',
                 'identity_client',
@@ -110,6 +188,33 @@ class OfficialClientManager(fuel_health.manager.Manager):
                 'neutron_client'
             ]
 
+    def _get_credentials(self, username=None, password=None,
+                         tenant_name=None):
+        return (username or self.config.identity.admin_username,
+                password or self.config.identity.admin_password,
+                tenant_name or self.config.identity.admin_tenant_name)
+
+    def _authenticate(self, username, password, tenant_name):
+        """Returns keystone v2 auth_ref and its expiration timestamp."""
+        dscv = self.config.identity.disable_ssl_certificate_validation
+        auth_ref = keystoneclient.v2_0.client.Client(
+            username=username, password=password, tenant_name=tenant_name,
+            auth_url=self.config.identity.uri, insecure=dscv).auth_ref
+        expires_at = None
+        if getattr(auth_ref, 'expires', None):
+            expires_at = calendar.timegm(auth_ref.expires.utctimetuple())
+        return auth_ref, expires_at
+
+    def _get_session(self, username=None, password=None, tenant_name=None):
+        credentials = self._get_credentials(username, password, tenant_name)
+        key = credentials + (self.config.identity.uri,)
+        return SESSIONS.get(key, lambda: self._authenticate(*credentials))
+
+    @staticmethod
+    def _endpoint(auth_ref, service_type):
+        return auth_ref.service_catalog.url_for(service_type=service_type,
+                                                endpoint_type='publicURL')
+
     def _get_compute_client(self, username=None, password=None,
                             tenant_name=None):
         if not username:
@@ -130,13 +235,19 @@ class OfficialClientManager(fuel_health.manager.Manager):
 
         client_args = (username, password, tenant_name, auth_url)
 
-        # Create our default Nova client to use in testing
+        # token and endpoint of session are reused, client authenticates
+        # with credentials only if keystone rejects the token
+        auth_ref = self._get_session(username, password,
+                                     tenant_name).get_auth()
         service_type = self.config.compute.catalog_type
-        return novaclient.client.Client(self.NOVACLIENT_VERSION,
-                                        *client_args,
-                                        service_type=service_type,
-                                        no_cache=True,
-                                        insecure=dscv)
+        return novaclient.client.Client(
+            self.NOVACLIENT_VERSION,
+            *client_args,
+            auth_token=auth_ref.auth_token,
+            bypass_url=self._endpoint(auth_ref, service_type),
+            service_type=service_type,
+            no_cache=True,
+            insecure=dscv)
 
     def _get_volume_client(self, username=None, password=None,
                            tenant_name=None):
@@ -148,11 +259,21 @@ class OfficialClientManager(fuel_health.manager.Manager):
             tenant_name = self.config.identity.admin_tenant_name
 
         auth_url = self.config.identity.uri
-        return cinderclient.client.Client(self.CINDERCLIENT_VERSION,
-                                          username,
-                                          password,
-                                          tenant_name,
-                                          auth_url)
+        client = cinderclient.client.Client(self.CINDERCLIENT_VERSION,
+                                            username,
+                                            password,
+                                            tenant_name,
+                                            auth_url)
+
+        # cinderclient takes no token, so token and endpoint of
+        # session are set on its http client, which authenticates
+        # with credentials only if keystone rejects the token
+        auth_ref = self._get_session(username, password,
+                                     tenant_name).get_auth()
+        client.client.auth_token = auth_ref.auth_token
+        client.client.management_url = self._endpoint(
+            auth_ref, self.config.volume.catalog_type)
+        return client
 
     def _get_identity_client(self, username=None, password=None,
                              tenant_name=None, version=None):
@@ -172,22 +293,27 @@ class OfficialClientManager(fuel_health.manager.Manager):
         auth_url = self.config.identity.uri
         dscv = self.config.identity.disable_ssl_certificate_validation
 
+        # token of session is reused, no authentication is made
+        auth_ref = self._get_session(username, password,
+                                     tenant_name).get_auth()
+
         if not version or version == 2:
             return keystoneclient.v2_0.client.Client(username=username,
                                                      password=password,
                                                      tenant_name=tenant_name,
                                                      auth_url=auth_url,
-                                                     insecure=dscv)
+                                                     insecure=dscv,
+                                                     auth_ref=auth_ref)
         elif version == 3:
             helper_list = auth_url.rstrip("/").split("/")
             helper_list[-1] = "v3/"
             auth_url = "/".join(helper_list)
 
-            return keystoneclient.v3.client.Client(username=username,
-                                                   password=password,
-                                                   project_name=tenant_name,
-                                                   auth_url=auth_url,
-                                                   insecure=dscv)
+            # keystone accepts v2 token of default domain in v3 API
+            return keystoneclient.v3.client.Client(
+                token=auth_ref.auth_token,
+                endpoint=auth_url,
+                insecure=dscv)
         else:
             LOG.warning("Version:{0} for keystoneclient is not "
                         "supported with OSTF".format(version))
@@ -219,10 +345,7 @@ class OfficialClientManager(fuel_health.manager.Manager):
         This method returns Murano API client
         """
         # Get xAuth token from Keystone
-        self.token_id = self._get_identity_client(
-            self.config.identity.admin_username,
-            self.config.identity.admin_password,
-            self.config.identity.admin_tenant_name).auth_token
+        self.token_id = self.session.get_auth().auth_token
 
         try:
             return muranoclient.v1.client.Client(
@@ -242,16 +365,19 @@ class OfficialClientManager(fuel_health.manager.Manager):
             username = self.config.identity.admin_username
         if not password:
             password = self.config.identity.admin_password
-        tenant_id = [
-            tenant.id for tenant in self.identity_client.tenants.list()
-            if tenant.name == tenant_name][0]
+
+        # with token given client does not authenticate itself
+        auth_ref = self._get_session(username, password,
+                                     tenant_name).get_auth()
         return saharaclient.client.Client(self.config.sahara.api_version,
                                           username=username,
                                           api_key=password,
                                           project_name=tenant_name,
                                           auth_url=auth_url,
+                                          input_auth_token=auth_ref.auth_token,
                                           sahara_url="{url}/{id}".format(
-                                              url=sahara_url, id=tenant_id))
+                                              url=sahara_url,
+                                              id=auth_ref.tenant_id))
 
     def _get_ceilometer_client(self):
         keystone = self._get_identity_client()
@@ -328,21 +454,45 @@ class OfficialClientTest(fuel_health.test.TestCase):
             raise exceptions.ImageFault
         return image_id
 
-    def _delete_server(self, server):
-        LOG.debug("Deleting server.")
-        self.compute_client.servers.delete(server)
-
-        def is_deletion_complete():
-            try:
-                server.get()
-            except Exception as e:
-                if e.__class__.__name__ == 'NotFound':
-                    return True
-                LOG.debug(traceback.format_exc())
-                return False
+    def _wait_for_servers(self, client, servers, status='ACTIVE'):
+        """
+        Waits for servers to get to status, all of them are polled
+        with single list call. Raises ResourcesWaitError for servers
+        which got to ERROR status or timed out.
+        """
+        def check(server):
+            if server is None:
+                raise exceptions.NotFound()
+            if server.status.lower() == 'error':
+                raise exceptions.BuildErrorException(server_id=server.id)
+            return server.status.lower() == status.lower()
+
+        conf = self.config.compute
+        resources = waiter.ResourcesWaiter(
+            waiter.Waiter(max_interval=conf.build_interval))
+        fetch = list_fetcher(client.servers)
+        for server in servers:
+            resources.add(client.servers, server.id, fetch, check)
+        return resources.wait(conf.build_timeout)
+
+    def _delete_servers(self, servers, timeout=DELETION_TIMEOUT):
+        LOG.debug("Deleting servers.")
+        resources = waiter.ResourcesWaiter()
+        fetch = list_fetcher(self.compute_client.servers)
+        for server in servers:
+            self.compute_client.servers.delete(server)
+            forget_server_connections(server)
+            resources.add(self.compute_client.servers, server.id,
+                          fetch, is_deleted)
+
+        # servers still being deleted are retried by tearDownClass
+        try:
+            resources.wait(timeout)
+        except exceptions.ResourcesWaitError:
+            LOG.debug(traceback.format_exc())
 
-        fuel_health.test.call_until_true(
-            is_deletion_complete, 20, 10)
+    def _delete_server(self, server):
+        self._delete_servers([server])
 
     def retry_command(self, retries, timeout, method, *args, **kwargs):
         for i in range(retries):
@@ -394,42 +544,57 @@ class OfficialClientTest(fuel_health.test.TestCase):
                     LOG.debug(traceback.format_exc())
 
     @classmethod
-    def tearDownClass(cls):
-        cls.error_msg = []
-        while cls.os_resources:
-            thing = cls.os_resources.pop()
+    def _delete_resources(cls, things):
+        """
+        Deletes things and waits for all of them at once. Returns
+        things which could not be deleted yet (e.g. security group
+        still used by server being deleted) with their errors.
+        """
+        resources = waiter.ResourcesWaiter()
+        failed = []
+        for thing in things:
             LOG.debug("Deleting %r from shared resources of %s" %
                       (thing, cls.__name__))
-
             try:
                 # OpenStack resources are assumed to have a delete()
                 # method which destroys the resource...
                 thing.delete()
             except Exception as e:
                 # If the resource is already missing, mission accomplished.
-                if e.__class__.__name__ == 'NotFound':
-                    continue
-                cls.error_msg.append(e)
-                LOG.debug(traceback.format_exc())
-
-            def is_deletion_complete():
-                # Deletion testing is only required for objects whose
-                # existence cannot be checked via retrieval.
-                if isinstance(thing, dict):
-                    return True
-                try:
-                    thing.get()
-                except Exception as e:
-                    # Clients are expected to return an exception
-                    # called 'NotFound' if retrieval fails.
-                    if e.__class__.__name__ == 'NotFound':
-                        return True
-                    cls.error_msg.append(e)
+                if not waiter.is_not_found(e):
                     LOG.debug(traceback.format_exc())
-                return False
+                    failed.append((thing, e))
+                continue
 
-            # Block until resource deletion has completed or timed-out
-            fuel_health.test.call_until_true(is_deletion_complete, 20, 10)
+            # Deletion testing is only required for objects whose
+            # existence cannot be checked via retrieval.
+            if not isinstance(thing, dict):
+                forget_server_connections(thing)
+                resources.add(thing.manager, thing.id,
+                              list_fetcher(thing.manager), is_deleted)
+
+        # Block until deletion of all resources has completed or timed-out
+        try:
+            resources.wait(DELETION_TIMEOUT)
+        except exceptions.ResourcesWaitError as e:
+            LOG.debug(traceback.format_exc())
+            cls.error_msg.append(e)
+        return failed
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.error_msg = []
+        things = list(reversed(cls.os_resources))
+        del cls.os_resources[:]
+
+        # Resources which failed to be deleted are retried after
+        # deletion of others is completed, while it makes progress.
+        while things:
+            failed = cls._delete_resources(things)
+            if len(failed) == len(things):
+                cls.error_msg.extend(e for thing, e in failed)
+                break
+            things = [thing for thing, e in failed]
 
 
 class NovaNetworkScenarioTest(OfficialClientTest):
@@ -594,11 +759,12 @@ class NovaNetworkScenarioTest(OfficialClientTest):
                                           name,
                                           "Instance creation failed")
         self.set_resource(name, server)
-        self.status_timeout(client.servers, server.id, 'ACTIVE')
         # The instance retrieved on creation is missing network
-        # details, necessitating retrieval after it becomes active to
-        # ensure correct details.
-        server = client.servers.get(server.id)
+        # details, the one listed after it becomes active has them.
+        try:
+            server, = self._wait_for_servers(client, [server], 'ACTIVE')
+        except exceptions.ResourcesWaitError as exc:
+            self.fail("Failed to get to expected status: %s" % exc)
         self.set_resource(name, server)
         return server
 
@@ -627,6 +793,7 @@ class NovaNetworkScenarioTest(OfficialClientTest):
                     cls.floating_ips))
                 try:
                     cls.compute_client.floating_ips.delete(ip)
+                    fuel_health.common.ssh.forget_vm(getattr(ip, 'ip', ip))
                 except Exception as exc:
                     cls.error_msg.append(exc)
                     LOG.debug(traceback.format_exc())
@@ -963,16 +1130,31 @@ class SmokeChecksTest(OfficialClientTest):
         self.set_resource(name, server)
         return server
 
+    def _wait_servers_param(self, client, servers, param_name,
+                            tries=1, timeout=1, expected_value=None):
+        """
+        Waits up to tries polls made each timeout seconds until
+        param of servers is set (to expected_value if given). All
+        servers are polled with single list call. Returns the last
+        fetched servers whether they got param or not.
+        """
+        def check(server):
+            val = getattr(server, param_name, None)
+            return bool(val) and \
+                ((not expected_value) or (expected_value == val))
+
+        resources = waiter.ResourcesWaiter(
+            waiter.Waiter(first_interval=timeout, max_interval=timeout,
+                          jitter=0))
+        fetch = list_fetcher(client.servers)
+        for server in servers:
+            resources.add(client.servers, server.id, fetch, check, server)
+        return resources.wait(tries * timeout, raise_on_failure=False)
+
     def _wait_server_param(self, client, server, param_name,
                            tries=1, timeout=1, expected_value=None):
-        while tries:
-            val = getattr(server, param_name, None)
-            if val:
-                if (not expected_value) or (expected_value == val):
-                    return server
-            time.sleep(timeout)
-            server = client.servers.get(server.id)
-            tries -= 1
+        server, = self._wait_servers_param(client, [server], param_name,
+                                           tries, timeout, expected_value)
         return server
 
     def _attach_volume_to_instance(self, volume, instance):
@@ -23,6 +23,7 @@ from novaclient import exceptions as nova_exceptions
 from saharaclient.api import base as sab
 
 from fuel_health.common.utils.data_utils import rand_name
+from fuel_health.common import waiter
 import fuel_health.nmanager as nmanager
 
 
@@ -209,27 +210,30 @@ class SaharaTest(nmanager.PlatformServicesBaseClass):
 
     def _check_cluster_state(self, cluster_id):
 
-        data = self.sahara_client.clusters.get(cluster_id)
-        i = 1
+        started = time.time()
+        clusters = []
 
-        while str(data.status) != 'Active':
-            LOG.debug('CLUSTER STATUS:' + str(i * 10) +
+        def is_active():
+            data = self.sahara_client.clusters.get(cluster_id)
+            clusters.append(data)
+            passed = int(time.time() - started)
+            LOG.debug('CLUSTER STATUS:' + str(passed) +
                       ' sec:' + str(data.status))
-            print('CLUSTER STATUS:' + str(i * 10) + ' sec:' + str(data.status))
+            print('CLUSTER STATUS:' + str(passed) + ' sec:' + str(data.status))
 
             if str(data.status) == 'Error':
-                LOG.debug('\n' + str(i * 10) + ' sec:' + str(data) + '\n')
+                LOG.debug('\n' + str(passed) + ' sec:' + str(data) + '\n')
                 self.fail("Cluster state == 'Error'")
-
-            if i > self.CLUSTER_CREATION_TIMEOUT * 6:
-                LOG.debug('\n' + str(i * 10) + ' sec:' + str(data) + '\n')
-                self.fail(
-                    'Cluster state != \'Active\', passed {timeout} '
-                    'minutes'.format(timeout=self.CLUSTER_CREATION_TIMEOUT))
-
-            data = self.sahara_client.clusters.get(cluster_id)
-            time.sleep(10)
-            i += 1
+            return str(data.status) == 'Active'
+
+        if not waiter.wait_until(is_active,
+                                 self.CLUSTER_CREATION_TIMEOUT * 60,
+                                 max_interval=10):
+            LOG.debug('\n' + str(int(time.time() - started)) +
+                      ' sec:' + str(clusters[-1]) + '\n')
+            self.fail(
+                'Cluster state != \'Active\', passed {timeout} '
+                'minutes'.format(timeout=self.CLUSTER_CREATION_TIMEOUT))
 
     @classmethod
     def _get_cluster_node_ip_list_with_node_processes(
@@ -16,14 +16,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import time
-
 import testresources
 import unittest2
 
 from fuel_health import config
 from fuel_health.common import log as logging
 from fuel_health.common.test_mixins import FuelTestAssertMixin
+from fuel_health.common import waiter
 
 
 LOG = logging.getLogger(__name__)
@@ -52,21 +51,27 @@ def call_until_true(func, duration, sleep_for, arg=None):
     :param func: A zero argument callable that returns True on success.
     :param duration: The number of seconds for which to attempt a
         successful call of the function.
-    :param sleep_for: The number of seconds to sleep after an unsuccessful
-                      invocation of the function.
+    :param sleep_for: The max number of seconds to sleep after an
+                      unsuccessful invocation of the function, first
+                      invocations are followed by shorter sleeps
+                      (see waiter.Waiter).
+    """
+    args = (arg,) if arg else ()
+    return bool(waiter.wait_until(func, duration, *args,
+                                  max_interval=sleep_for))
+
+
+class ManagerAttribute(object):
     """
-    now = time.time()
-    timeout = now + duration
-    while now < timeout:
-        if arg:
-            if func(arg):
-                return True
-        elif func():
-            return True
-        LOG.debug("Sleeping for %d seconds", sleep_for)
-        time.sleep(sleep_for)
-        now = time.time()
-    return False
+    Attribute of test class resolved to attribute of its manager
+    on access, so clients of manager are made only when used.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, obj, owner):
+        return getattr(owner.manager, self.name)
 
 
 class TestCase(BaseTestCase):
@@ -83,10 +88,12 @@ class TestCase(BaseTestCase):
         cls.manager = cls.manager_class()
         for attr_name in cls.manager.client_attr_names:
             # Ensure that pre-existing class attributes won't be
-            # accidentally overriden.
-            assert not hasattr(cls, attr_name)
-            client = getattr(cls.manager, attr_name)
-            setattr(cls, attr_name, client)
+            # accidentally overriden. Ones set by earlier run of
+            # the class in the same process are replaced.
+            if not isinstance(cls.__dict__.get(attr_name),
+                              ManagerAttribute):
+                assert not hasattr(cls, attr_name)
+            setattr(cls, attr_name, ManagerAttribute(attr_name))
         cls.resource_keys = {}
         cls.os_resources = []
 
@@ -126,8 +133,8 @@ class TestCase(BaseTestCase):
                       "Currently in %s status",
                       thing, expected_status, new_status)
         conf = config.FuelConfig()
-        if not call_until_true(check_status,
-                               conf.compute.build_timeout,
-                               conf.compute.build_interval):
+        if not waiter.wait_until(check_status,
+                                 conf.compute.build_timeout,
+                                 max_interval=conf.compute.build_interval):
             self.fail("Timed out waiting to become %s"
                       % expected_status)
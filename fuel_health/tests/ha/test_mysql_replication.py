@@ -18,6 +18,7 @@ import logging
 import traceback
 
 from fuel_health.common.ssh import Client as SSHClient
+from fuel_health.common.ssh import MultiClient
 from fuel_health.common.utils import data_utils
 import fuel_health.test
 
@@ -55,6 +56,25 @@ class TestMysqlReplication(fuel_health.test.BaseTestCase):
             except Exception:
                 LOG.debug(traceback.format_exc())
 
+    def _exec_on_nodes(self, nodes, secs, step, msg, action, cmd,
+                       timeout=100):
+        """
+        Executes cmd on nodes concurrently, fails step if it failed
+        on any of them. Returns outputs of cmd by nodes.
+        """
+        client = MultiClient(nodes, self.controller_user,
+                             key_filename=self.controller_key,
+                             timeout=timeout)
+        results = self.verify(secs, client.exec_command, step, msg, action,
+                              cmd, secs)
+        if results.failed:
+            LOG.debug('Failed results: %s', results.failed)
+            self.fail('Step %s failed: %s on %s. Please refer to OpenStack '
+                      'logs for more details.' %
+                      (step, msg,
+                       ', '.join(result.host for result in results.failed)))
+        return results.outputs()
+
     def test_mysql_replication(self):
         """Check data replication over mysql
         Target Service: HA mysql
@@ -73,13 +93,10 @@ class TestMysqlReplication(fuel_health.test.BaseTestCase):
         master_node_ip = []
         cmd = 'mysql -e "SHOW SLAVE STATUS\G"'
         LOG.info("Controllers nodes are %s" % self.controllers)
-        for controller_ip in self.controllers:
-            ssh_client = SSHClient(
-                controller_ip, self.controller_user,
-                key_filename=self.controller_key, timeout=100)
-            output = self.verify(
-                20, ssh_client.exec_command, 1, 'Mysql node detection failed',
-                'detect mysql node', cmd)
+        outputs = self._exec_on_nodes(
+            self.controllers, 20, 1, 'Mysql node detection failed',
+            'detect mysql node', cmd)
+        for controller_ip, output in outputs.iteritems():
             LOG.info('output is %s' % output)
             if not output:
                 self.master_ip.append(controller_ip)
@@ -126,20 +143,15 @@ class TestMysqlReplication(fuel_health.test.BaseTestCase):
         LOG.info('create data')
 
         # Verify that data is replicated on other controllers
-        for controller in self.controllers:
-            if controller not in master_node_ip:
-                client = SSHClient(controller,
-                                   self.controller_user,
-                                   key_filename=self.controller_key)
-
-                output = self.verify(
-                    20, client.exec_command, 5,
-                    'Can not get data from controller %s' % controller,
-                    'get_record', get_record)
-
-                self.verify_response_body(output, record_data,
-                                          msg='Expected data missing',
-                                          failed_step='6')
+        slaves = [controller for controller in self.controllers
+                  if controller not in master_node_ip]
+        outputs = self._exec_on_nodes(
+            slaves, 20, 5, 'Can not get data from controller',
+            'get_record', get_record, timeout=300)
+        for output in outputs.itervalues():
+            self.verify_response_body(output, record_data,
+                                      msg='Expected data missing',
+                                      failed_step='6')
 
         # Drop created db
         cmd = "mysql -e 'DROP DATABASE %s'" % self.database
@@ -165,18 +177,14 @@ class TestMysqlReplication(fuel_health.test.BaseTestCase):
         for database in dbs:
             LOG.info('Current database name is %s' % database)
             temp_set = set()
-            for node in self.config.compute.online_controllers:
+            cmd1 = cmd % {'database': database}
+            LOG.info('Try to execute command %s' % cmd1)
+            outputs = self._exec_on_nodes(
+                self.config.compute.online_controllers, 40, 1,
+                'Can list tables', 'get amount of tables for each database',
+                cmd1, timeout=self.config.compute.ssh_timeout)
+            for node, output in outputs.iteritems():
                 LOG.info('Current controller node is %s' % node)
-                cmd1 = cmd % {'database': database}
-                LOG.info('Try to execute command %s' % cmd1)
-                tables = SSHClient(
-                    node, self.controller_user,
-                    key_filename=self.controller_key,
-                    timeout=self.config.compute.ssh_timeout)
-                output = self.verify(40, tables.exec_command, 1,
-                                     'Can list tables',
-                                     'get amount of tables for each database',
-                                     cmd1)
                 tables = set(output.splitlines())
                 if len(temp_set) == 0:
                     temp_set = tables
@@ -208,13 +216,10 @@ class TestMysqlReplication(fuel_health.test.BaseTestCase):
             master_node_ip = []
             cmd = 'mysql -e "SHOW SLAVE STATUS\G"'
             LOG.info("Controllers nodes are %s" % self.controllers)
-            for controller_ip in self.controllers:
-                ssh_client = SSHClient(controller_ip, self.controller_user,
-                                       key_filename=self.controller_key,
-                                       timeout=100)
-                output = self.verify(20, ssh_client.exec_command, 1,
-                                     'Can not define master node',
-                                     'master mode detection', cmd)
+            outputs = self._exec_on_nodes(
+                self.controllers, 20, 1, 'Can not define master node',
+                'master mode detection', cmd)
+            for controller_ip, output in outputs.iteritems():
                 LOG.info('output is %s' % output)
                 if not output:
                     self.master_ip.append(controller_ip)
@@ -284,41 +289,38 @@ class TestMysqlReplication(fuel_health.test.BaseTestCase):
         Deployment tags: CENTOS
         """
         if 'CentOS' in self.config.compute.deployment_os:
-            for controller in self.controllers:
-                    command = "mysql -e \"SHOW STATUS LIKE 'wsrep_%'\""
-                    ssh_client = SSHClient(controller, self.controller_user,
-                                           key_filename=self.controller_key,
-                                           timeout=100)
-                    output = self.verify(
-                        20, ssh_client.exec_command, 1,
-                        "Verification of galera cluster node status failed",
-                        'get status from galera node',
-                        command).splitlines()[3:-2]
-
-                    LOG.debug('output is %s' % output)
-
-                    result = {}
-                    for i in output:
-                        key, value = i.split('|')[0:-2]
-                        result.update({key: value})
-                        return result
-
-                    self.verify_response_body_content(
-                        result.get('wsrep_cluster_size', 0),
-                        str(len(self.controllers)),
-                        msg='Cluster size on %s less '
-                            'than controllers count' % controller,
-                        failed_step='2')
-
-                    self.verify_response_body_content(
-                        result.get(('wsrep_ready', 'OFF')), 'ON',
-                        msg='wsrep_ready on %s is not ON' % controller,
-                        failed_step='3')
-
-                    self.verify_response_body_content(
-                        result.get(('wsrep_connected', 'OFF')), 'ON',
-                        msg='wsrep_connected on %s is not ON' % controller,
-                        failed_step='3')
+            command = "mysql -e \"SHOW STATUS LIKE 'wsrep_%'\""
+            outputs = self._exec_on_nodes(
+                self.controllers, 20, 1,
+                "Verification of galera cluster node status failed",
+                'get status from galera node', command)
+            for controller, output in outputs.iteritems():
+                output = output.splitlines()[3:-2]
+
+                LOG.debug('output is %s' % output)
+
+                result = {}
+                for i in output:
+                    key, value = i.split('|')[0:-2]
+                    result.update({key: value})
+                    return result
+
+                self.verify_response_body_content(
+                    result.get('wsrep_cluster_size', 0),
+                    str(len(self.controllers)),
+                    msg='Cluster size on %s less '
+                        'than controllers count' % controller,
+                    failed_step='2')
+
+                self.verify_response_body_content(
+                    result.get(('wsrep_ready', 'OFF')), 'ON',
+                    msg='wsrep_ready on %s is not ON' % controller,
+                    failed_step='3')
+
+                self.verify_response_body_content(
+                    result.get(('wsrep_connected', 'OFF')), 'ON',
+                    msg='wsrep_connected on %s is not ON' % controller,
+                    failed_step='3')
         else:
             self.skipTest('There is no CentOs deployment')
 
@@ -336,40 +338,37 @@ class TestMysqlReplication(fuel_health.test.BaseTestCase):
         Deployment tags: Ubuntu
         """
         if 'Ubuntu' in self.config.compute.deployment_os:
-            for controller in self.controllers:
-                    command = "mysql -e \"SHOW STATUS LIKE 'wsrep_%'\""
-                    ssh_client = SSHClient(controller, self.controller_user,
-                                           key_filename=self.controller_key,
-                                           timeout=100)
-                    output = self.verify(
-                        20, ssh_client.exec_command, 1,
-                        "Verification of galera cluster node status failed",
-                        'get status from galera node',
-                        command).splitlines()[3:-2]
-
-                    LOG.debug('output is %s' % output)
-
-                    result = {}
-                    for i in output:
-                        key, value = i.split('|')[0:-2]
-                        result.update({key: value})
-                        return result
-
-                    self.verify_response_body_content(
-                        result.get('wsrep_cluster_size', 0),
-                        str(len(self.controllers)),
-                        msg='Cluster size on %s less '
-                            'than controllers count' % controller,
-                        failed_step='2')
-
-                    self.verify_response_body_content(
-                        result.get(('wsrep_ready', 'OFF')), 'ON',
-                        msg='wsrep_ready on %s is not ON' % controller,
-                        failed_step='3')
-
-                    self.verify_response_body_content(
-                        result.get(('wsrep_connected', 'OFF')), 'ON',
-                        msg='wsrep_connected on %s is not ON' % controller,
-                        failed_step='3')
+            command = "mysql -e \"SHOW STATUS LIKE 'wsrep_%'\""
+            outputs = self._exec_on_nodes(
+                self.controllers, 20, 1,
+                "Verification of galera cluster node status failed",
+                'get status from galera node', command)
+            for controller, output in outputs.iteritems():
+                output = output.splitlines()[3:-2]
+
+                LOG.debug('output is %s' % output)
+
+                result = {}
+                for i in output:
+                    key, value = i.split('|')[0:-2]
+                    result.update({key: value})
+                    return result
+
+                self.verify_response_body_content(
+                    result.get('wsrep_cluster_size', 0),
+                    str(len(self.controllers)),
+                    msg='Cluster size on %s less '
+                        'than controllers count' % controller,
+                    failed_step='2')
+
+                self.verify_response_body_content(
+                    result.get(('wsrep_ready', 'OFF')), 'ON',
+                    msg='wsrep_ready on %s is not ON' % controller,
+                    failed_step='3')
+
+                self.verify_response_body_content(
+                    result.get(('wsrep_connected', 'OFF')), 'ON',
+                    msg='wsrep_connected on %s is not ON' % controller,
+                    failed_step='3')
         else:
             self.skipTest('There is no Ubuntu deployment')
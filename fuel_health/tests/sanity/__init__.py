@@ -27,5 +27,6 @@ __profile__ = {
     "test_path": "fuel_health/tests/sanity",
     "cleanup_path": "fuel_health.cleanup",
     "description": "Sanity tests. Duration 30 sec - 2 min",
-    "exclusive_testsets": []
+    "exclusive_testsets": [],
+    "parallel": True
 }
@@ -64,10 +64,12 @@ class SanityInfrastructureTest(nmanager.SanityChecksTest):
                                self.usr, self.pwd,
                                key_filename=self.key,
                                timeout=self.timeout)
+        # reading is stopped at the first failed service
         output = self.verify(50, ssh_client.exec_command,
                              1, "'nova-manage' command execution failed. ",
                              "nova-manage command execution",
-                             cmd)
+                             cmd, max_output=65536,
+                             until=lambda line: u'XXX' in line)
         LOG.debug(output)
         try:
             self.verify_response_true(
@@ -0,0 +1,42 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sys
+import logging
+
+from oslo.config import cfg
+
+from fuel_plugin.ostf_adapter import config as ostf_config
+from fuel_plugin.ostf_adapter import logger
+from fuel_plugin.ostf_adapter.storage import retention
+
+
+CONF = cfg.CONF
+
+
+def main():
+    '''
+    Applies retention policy from config to stored test runs
+    and deduplicates their tracebacks once.
+    '''
+    ostf_config.init_config(sys.argv[1:])
+
+    logger.setup(log_file=CONF.adapter.log_file)
+
+    log = logging.getLogger(__name__)
+    log.info('Starting compaction of test runs')
+
+    stats = retention.compact(CONF.adapter.dbpath)
+    for key in sorted(stats):
+        print('{0}: {1}'.format(key, stats[key]))
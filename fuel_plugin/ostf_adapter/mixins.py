@@ -13,9 +13,10 @@
 #    under the License.
 
 
+import collections
 import requests
-from sqlalchemy.orm import joinedload
 import logging
+import time
 
 from oslo.config import cfg
 
@@ -28,6 +29,17 @@ LOG = logging.getLogger(__name__)
 
 TEST_REPOSITORY = []
 
+# cluster_id -> (expiration time, deployment tags)
+DEPL_TAGS_CACHE = {}
+
+# url -> etag, last_modified and data of last nailgun response
+NAILGUN_RESPONSES = {}
+
+NAILGUN_SESSION = None
+
+# fingerprint of cluster deployment tags -> testing patterns
+TESTING_PATTERNS_INDEX = {}
+
 
 def clean_db(session):
     LOG.info('Starting clean db action.')
@@ -39,9 +51,19 @@ def clean_db(session):
 
 
 def cache_test_repository(session):
-    test_repository = session.query(models.TestSet)\
-        .options(joinedload('tests'))\
-        .all()
+    # testing patterns are computed from cached repository
+    TESTING_PATTERNS_INDEX.clear()
+    del TEST_REPOSITORY[:]
+
+    test_repository = session.query(models.TestSet).all()
+
+    # only templates of tests are taken since tests of test runs
+    # are kept in db across restarts of adapter
+    templates = collections.defaultdict(list)
+    for test in session.query(models.Test)\
+            .filter(models.Test.test_run_id.is_(None))\
+            .order_by(models.Test.name):
+        templates[test.test_set_id].append(test)
 
     crucial_tests_attrs = ['name', 'deployment_tags']
     for test_set in test_repository:
@@ -49,17 +71,29 @@ def cache_test_repository(session):
 
         data_elem['test_set_id'] = test_set.id
         data_elem['deployment_tags'] = test_set.deployment_tags
+        data_elem['compiled_depl_tags'] = \
+            nose_utils.compile_deployment_tags(test_set.deployment_tags)
         data_elem['tests'] = []
 
-        for test in test_set.tests:
+        for test in templates[test_set.id]:
             test_dict = dict([(attr_name, getattr(test, attr_name))
                               for attr_name in crucial_tests_attrs])
+            test_dict['compiled_depl_tags'] = \
+                nose_utils.compile_deployment_tags(test.deployment_tags)
             data_elem['tests'].append(test_dict)
 
         TEST_REPOSITORY.append(data_elem)
 
 
-def discovery_check(session, cluster, token=None):
+def discovery_check(session, cluster, token=None, refresh=False):
+    '''
+    Brings state and testing patterns of cluster in line with its
+    deployment tags. Cached tags are dropped first if refresh is
+    set, so changes of cluster (e.g. redeployment) are picked up.
+    '''
+    if refresh:
+        invalidate_cluster_depl_tags(cluster)
+
     cluster_deployment_args = _get_cluster_depl_tags(cluster, token=token)
 
     cluster_data = {
@@ -101,13 +135,119 @@ def discovery_check(session, cluster, token=None):
         session.merge(cluster_state)
 
 
-def _get_cluster_depl_tags(cluster_id, token=None):
-    REQ_SES = requests.Session()
-    REQ_SES.trust_env = False
+def refresh_cluster_testing_patterns(session):
+    '''
+    Brings testing patterns of all known clusters in line with
+    cached test repository. Used after test repository was
+    changed without cleaning up the db.
+    '''
+    for cluster_state in session.query(models.ClusterState):
+        testing_patterns = dict(
+            _get_testing_patterns(cluster_state.deployment_tags)
+        )
 
+        existing_patterns = session.query(models.ClusterTestingPattern)\
+            .filter_by(cluster_id=cluster_state.id)
+
+        for pattern in existing_patterns:
+            tests = testing_patterns.pop(pattern.test_set_id, None)
+            if tests is None:
+                session.delete(pattern)
+            elif list(pattern.tests) != tests:
+                pattern.tests = list(tests)
+
+        if testing_patterns:
+            session.execute(
+                models.ClusterTestingPattern.__table__.insert(),
+                [
+                    {
+                        'cluster_id': cluster_state.id,
+                        'test_set_id': test_set_id,
+                        'tests': list(tests_names)
+                    }
+                    for test_set_id, tests_names
+                    in testing_patterns.iteritems()
+                ]
+            )
+
+    LOG.info('Testing patterns of clusters are refreshed.')
+
+
+def invalidate_cluster_depl_tags(cluster_id=None):
+    '''
+    Drops cached deployment tags of given cluster
+    or of all clusters if cluster_id is not given.
+    '''
+    if cluster_id is None:
+        DEPL_TAGS_CACHE.clear()
+    else:
+        DEPL_TAGS_CACHE.pop(str(cluster_id), None)
+
+
+def _get_cluster_depl_tags(cluster_id, token=None):
+    '''
+    Returns deployment tags of cluster. Tags are requested
+    from nailgun at most once per nailgun_cache_ttl seconds
+    for each cluster.
+    '''
+    cached = DEPL_TAGS_CACHE.get(str(cluster_id))
+    if cached and cached[0] > time.time():
+        return set(cached[1])
+
+    deployment_tags = _request_cluster_depl_tags(cluster_id, token=token)
+
+    ttl = cfg.CONF.adapter.nailgun_cache_ttl
+    if ttl > 0:
+        DEPL_TAGS_CACHE[str(cluster_id)] = (time.time() + ttl,
+                                            frozenset(deployment_tags))
+    return deployment_tags
+
+
+def _get_nailgun_session():
+    global NAILGUN_SESSION
+
+    if NAILGUN_SESSION is None:
+        NAILGUN_SESSION = requests.Session()
+        NAILGUN_SESSION.trust_env = False
+    return NAILGUN_SESSION
+
+
+def _get_nailgun_data(url, token=None):
+    '''
+    Performs GET request to nailgun and returns decoded response.
+    When previous response for the same url had ETag or
+    Last-Modified headers request is made conditional and
+    cached data is returned if nailgun answers with 304.
+    '''
+    headers = {}
     if token is not None:
-        REQ_SES.headers.update({'X-Auth-Token': token})
+        headers['X-Auth-Token'] = token
+
+    cached = NAILGUN_RESPONSES.get(url)
+    if cached:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
 
+    response = _get_nailgun_session().get(url, headers=headers)
+    if response.status_code == 304 and cached:
+        return cached['data']
+
+    data = response.json()
+
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if etag or last_modified:
+        NAILGUN_RESPONSES[url] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'data': data
+        }
+    return data
+
+
+def _request_cluster_depl_tags(cluster_id, token=None):
     URL = 'http://{0}:{1}/{2}'
     NAILGUN_API_URL = 'api/clusters/{0}'
 
@@ -116,7 +256,7 @@ def _get_cluster_depl_tags(cluster_id, token=None):
                              cfg.CONF.adapter.nailgun_port,
                              cluster_url)
 
-    response = REQ_SES.get(request_url).json()
+    response = _get_nailgun_data(request_url, token=token)
     release_id = response.get('release_id', 'failed to get id')
 
     release_url = URL.format(
@@ -129,7 +269,7 @@ def _get_cluster_depl_tags(cluster_id, token=None):
     if fuel_version:
         deployment_tags.add(fuel_version)
 
-    release_data = REQ_SES.get(release_url).json()
+    release_data = _get_nailgun_data(release_url, token=token)
 
     # info about deployment type and operating system
     mode = 'ha' if 'ha' in response['mode'].lower() else response['mode']
@@ -144,7 +284,7 @@ def _get_cluster_depl_tags(cluster_id, token=None):
 
     # info about murano/sahara clients installation
     request_url += '/' + 'attributes'
-    response = REQ_SES.get(request_url).json()
+    response = _get_nailgun_data(request_url, token=token)
 
     public_assignment = response['editable'].get('public_network_assignment')
     if not public_assignment or \
@@ -179,36 +319,57 @@ def _get_cluster_depl_tags(cluster_id, token=None):
     return set([tag.lower() for tag in deployment_tags])
 
 
-def _add_cluster_testing_pattern(session, cluster_data):
-    to_database = []
-
-    global TEST_REPOSITORY
+def _get_testing_patterns(deployment_tags):
+    '''
+    Returns list of (test_set_id, tests_names) pairs appropriate
+    for clusters with given deployment tags. Result is computed
+    once per distinct set of tags and is shared by all clusters
+    having it until test repository is cached again.
+    '''
+    fingerprint = frozenset(deployment_tags)
 
-    # populate cache if it's empty
-    if not TEST_REPOSITORY:
-        cache_test_repository(session)
+    testing_patterns = TESTING_PATTERNS_INDEX.get(fingerprint)
+    if testing_patterns is not None:
+        return testing_patterns
 
+    testing_patterns = []
     for test_set in TEST_REPOSITORY:
-        if nose_utils.process_deployment_tags(
-            cluster_data['deployment_tags'],
-            test_set['deployment_tags']
+        if nose_utils.match_deployment_tags(
+            fingerprint,
+            test_set['compiled_depl_tags']
         ):
 
-            testing_pattern = dict()
-            testing_pattern['cluster_id'] = cluster_data['cluster_id']
-            testing_pattern['test_set_id'] = test_set['test_set_id']
-            testing_pattern['tests'] = []
+            tests = [
+                test['name'] for test in test_set['tests']
+                if nose_utils.match_deployment_tags(
+                    fingerprint,
+                    test['compiled_depl_tags']
+                )
+            ]
 
-            for test in test_set['tests']:
-                if nose_utils.process_deployment_tags(
-                    cluster_data['deployment_tags'],
-                    test['deployment_tags']
-                ):
+            testing_patterns.append((test_set['test_set_id'], tests))
 
-                    testing_pattern['tests'].append(test['name'])
+    TESTING_PATTERNS_INDEX[fingerprint] = testing_patterns
+    return testing_patterns
 
-            to_database.append(
-                models.ClusterTestingPattern(**testing_pattern)
-            )
 
-    session.add_all(to_database)
+def _add_cluster_testing_pattern(session, cluster_data):
+    # populate cache if it's empty
+    if not TEST_REPOSITORY:
+        cache_test_repository(session)
+
+    to_database = [
+        {
+            'cluster_id': cluster_data['cluster_id'],
+            'test_set_id': test_set_id,
+            'tests': list(tests)
+        }
+        for test_set_id, tests
+        in _get_testing_patterns(cluster_data['deployment_tags'])
+    ]
+
+    if to_database:
+        session.execute(
+            models.ClusterTestingPattern.__table__.insert(),
+            to_database
+        )
@@ -0,0 +1,418 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+'''
+Static discovery of tests. Sources of test modules are parsed
+with ast instead of being imported, so neither tests nor client
+libraries they depend on are loaded into adapter process.
+
+Modules, classes, methods and functions are selected by the
+rules nose uses by default: files starting with "." or "_" and
+executable files are ignored, unittest.TestCase subclasses and
+other classes whose names match testMatch regex are collected
+unless __test__ says otherwise, as are their methods (inherited
+ones included) and module level functions matching testMatch.
+Docstrings are parsed only for methods of TestCase subclasses,
+nose driver does not get them for other tests either. Base
+classes are resolved through imports of modules belonging to the
+same top-level package as discovered path.
+
+Unlike nose, test classes imported from other modules, tests
+created at runtime and generator tests are not collected.
+'''
+
+import ast
+import imp
+import logging
+import os
+import re
+
+from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
+
+
+LOG = logging.getLogger(__name__)
+
+# default testMatch of nose
+TEST_MATCH = re.compile(r'(?:^|[\b_\.%s-])[Tt]est' % os.sep)
+
+# classes from outside of discovered package which make
+# their subclasses test cases
+TEST_CASE_BASES = frozenset([
+    'unittest.TestCase',
+    'unittest.case.TestCase',
+    'unittest2.TestCase',
+    'unittest2.case.TestCase',
+    'testtools.TestCase',
+    'testtools.testcase.TestCase',
+    'testresources.ResourcedTestCase',
+])
+
+
+def _dotted_name(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        value = _dotted_name(node.value)
+        if value is not None:
+            return '{0}.{1}'.format(value, node.attr)
+    return None
+
+
+class ModuleSource(object):
+    '''
+    Names imported into module, classes and functions defined
+    in it and its __profile__ (if any).
+    '''
+
+    def __init__(self, name, path, is_package):
+        self.name = name
+        self.path = path
+        self.package = name if is_package else name.rpartition('.')[0]
+
+        self.imports = {}
+        self.classes = {}
+        self.functions = []
+        self.profile = None
+
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname:
+                        self.imports[alias.asname] = alias.name
+                    else:
+                        top_name = alias.name.split('.')[0]
+                        self.imports[top_name] = top_name
+
+            elif isinstance(node, ast.ImportFrom):
+                module = self._absolute_name(node.module, node.level)
+                for alias in node.names:
+                    if alias.name != '*':
+                        self.imports[alias.asname or alias.name] = \
+                            '{0}.{1}'.format(module, alias.name)
+
+            elif isinstance(node, ast.ClassDef):
+                self.classes[node.name] = node
+
+            elif isinstance(node, ast.FunctionDef):
+                self.functions.append(node.name)
+
+            elif isinstance(node, ast.Assign):
+                if any(getattr(target, 'id', None) == '__profile__'
+                       for target in node.targets):
+                    try:
+                        self.profile = ast.literal_eval(node.value)
+                    except ValueError:
+                        LOG.error('__profile__ of %s is not a literal.',
+                                  self.name)
+
+    def _absolute_name(self, module, level):
+        if not level:
+            return module
+
+        parts = self.package.split('.')
+        if level > 1:
+            parts = parts[:1 - level]
+        if module:
+            parts.append(module)
+        return '.'.join(parts)
+
+
+class SourceIndex(object):
+    '''
+    Parses modules of discovered top-level packages on demand
+    and resolves names of classes used in them.
+    '''
+
+    def __init__(self, modules):
+        # modules to discover are registered explicitly since
+        # their directory is not necessarily in sys.path
+        self.locations = dict(
+            (name, (path, is_package)) for name, path, is_package in modules
+        )
+        self.packages = set(name.split('.')[0] for name in self.locations)
+        self.modules = {}
+
+    def locate(self, name):
+        '''
+        Returns (path, is_package) of module of indexed packages.
+        '''
+        if name not in self.locations:
+            parent, _, tail = name.rpartition('.')
+            if parent:
+                parent_location = self.locate(parent)
+                if parent_location is None or not parent_location[1]:
+                    location = None
+                else:
+                    location = _find_module(
+                        tail, os.path.dirname(parent_location[0]))
+            elif name in self.packages:
+                location = _find_module(name)
+            else:
+                location = None
+            self.locations[name] = location
+
+        return self.locations[name]
+
+    def get_module(self, name):
+        if name not in self.modules:
+            self.modules[name] = None
+
+            location = self.locate(name)
+            if location is not None:
+                try:
+                    self.modules[name] = ModuleSource(name, *location)
+                except (IOError, SyntaxError) as e:
+                    LOG.error('%s can not be parsed: %s', location[0], e)
+
+        return self.modules[name]
+
+    def resolve(self, module, name, depth=0):
+        '''
+        Returns (module, class node) for name used in module.
+        For classes outside of indexed packages (module, class node)
+        is (None, fully qualified name).
+        '''
+        head, _, rest = name.partition('.')
+
+        if not rest and head in module.classes:
+            return module, module.classes[head]
+
+        if head in module.imports:
+            name = module.imports[head] + ('.' + rest if rest else '')
+
+        parts = name.split('.')
+        for i in range(len(parts) - 1, 0, -1):
+            source = self.get_module('.'.join(parts[:i]))
+            if source is None:
+                continue
+
+            if i == len(parts) - 1 and depth < 10:
+                if parts[i] in source.classes:
+                    return source, source.classes[parts[i]]
+                if parts[i] in source.imports:
+                    return self.resolve(source, parts[i], depth + 1)
+            break
+
+        return None, name
+
+    def bases(self, module, class_node):
+        for base in class_node.bases:
+            name = _dotted_name(base)
+            if name is not None:
+                yield self.resolve(module, name)
+
+    def is_test_case(self, module, class_node, depth=0):
+        for base_module, base in self.bases(module, class_node):
+            if base_module is None:
+                if base in TEST_CASE_BASES:
+                    return True
+            elif depth < 20 and \
+                    self.is_test_case(base_module, base, depth + 1):
+                return True
+        return False
+
+    def methods(self, module, class_node, depth=0):
+        '''
+        Returns docstrings of methods of class including inherited
+        ones, keyed by name of method.
+        '''
+        methods = {}
+        if depth < 20:
+            for base_module, base in reversed(list(
+                    self.bases(module, class_node))):
+                if base_module is not None:
+                    methods.update(
+                        self.methods(base_module, base, depth + 1))
+
+        for node in class_node.body:
+            if isinstance(node, ast.FunctionDef):
+                methods[node.name] = ast.get_docstring(node, clean=False)
+        return methods
+
+
+def _declared_test(class_node):
+    for node in class_node.body:
+        if isinstance(node, ast.Assign) and \
+                any(getattr(target, 'id', None) == '__test__'
+                    for target in node.targets):
+            try:
+                return bool(ast.literal_eval(node.value))
+            except ValueError:
+                return None
+    return None
+
+
+def _find_module(name, path=None):
+    '''
+    Locates source of module (given by its name relative to path
+    or dotted name if path is None) without importing it.
+    Returns (path, is_package) or None.
+    '''
+    for part in name.split('.'):
+        try:
+            f, path, description = imp.find_module(
+                part, [path] if path else None)
+        except ImportError:
+            return None
+        if f is not None:
+            f.close()
+
+    if description[2] == imp.PKG_DIRECTORY:
+        return os.path.join(path, '__init__.py'), True
+    if description[2] == imp.PY_SOURCE:
+        return path, False
+    return None
+
+
+def _module_name(path):
+    '''
+    Dotted name of module at path (or of package at directory)
+    with respect to enclosing packages, like nose importer does.
+    '''
+    path = os.path.abspath(path)
+    if os.path.isdir(path):
+        dirname, parts = path, []
+    else:
+        dirname, filename = os.path.split(path)
+        parts = [os.path.splitext(filename)[0]]
+
+    while os.path.isfile(os.path.join(dirname, '__init__.py')):
+        dirname, part = os.path.split(dirname)
+        parts.insert(0, part)
+    return '.'.join(parts)
+
+
+def _is_wanted_file(path):
+    filename = os.path.basename(path)
+    return (
+        filename.endswith('.py')
+        and not filename.startswith(('.', '_'))
+        and filename != 'setup.py'
+        and not os.access(path, os.X_OK)
+        and bool(TEST_MATCH.search(filename))
+    )
+
+
+def _iter_modules(path):
+    '''
+    Yields (module name, path, is_package) of modules
+    nose would import when collecting tests from path.
+    '''
+    if os.path.isfile(path):
+        yield _module_name(path), path, False
+        return
+
+    is_package = os.path.isfile(os.path.join(path, '__init__.py'))
+    if is_package:
+        yield _module_name(path), os.path.join(path, '__init__.py'), True
+
+    for entry in sorted(os.listdir(path)):
+        if entry.startswith(('.', '_')):
+            continue
+
+        entry_path = os.path.join(path, entry)
+        if os.path.isdir(entry_path):
+            if os.path.isfile(os.path.join(entry_path, '__init__.py')) or \
+                    TEST_MATCH.search(entry) or entry in ('lib', 'src'):
+                for module in _iter_modules(entry_path):
+                    yield module
+        elif _is_wanted_file(entry_path):
+            yield _module_name(entry_path), entry_path, False
+
+
+def _is_wanted_name(name):
+    return not name.startswith('_') and bool(TEST_MATCH.search(name))
+
+
+def _test_data(name, docstring):
+    data = dict()
+    (data['title'], data['description'],
+     data['duration'], data['deployment_tags']) = \
+        nose_utils.parse_description(docstring)
+    data['name'] = name
+    return data
+
+
+def _resolve_path(path):
+    if os.path.exists(path):
+        return os.path.abspath(path)
+
+    location = _find_module(path)
+    if location is None:
+        raise ImportError('Can not find tests at {0}'.format(path))
+
+    module_path, is_package = location
+    return os.path.dirname(module_path) if is_package else module_path
+
+
+def collect(path):
+    '''
+    Collects __profile__ of modules and data of tests found in
+    them. Result has the same format as DiscoveryPlugin.results().
+    '''
+    path = _resolve_path(path)
+    modules = list(_iter_modules(path))
+
+    index = SourceIndex(modules)
+
+    profiles = {}
+    tests = {}
+    for name, module_path, is_package in modules:
+        module = index.get_module(name)
+        if module is None:
+            continue
+
+        LOG.info('Inspecting %s', module_path)
+
+        if isinstance(module.profile, dict):
+            profile = dict(module.profile)
+            profile['deployment_tags'] = [
+                tag.lower() for tag in profile.get('deployment_tags', [])
+            ]
+            profiles[module_path] = profile
+            LOG.info('%s discovered.', name)
+
+        module_tests = []
+        for class_name in sorted(module.classes):
+            class_node = module.classes[class_name]
+            is_test_case = index.is_test_case(module, class_node)
+
+            declared = _declared_test(class_node)
+            if declared is None:
+                wanted = not class_name.startswith('_') and \
+                    (is_test_case or bool(TEST_MATCH.search(class_name)))
+            else:
+                wanted = declared
+            if not wanted:
+                continue
+
+            methods = index.methods(module, class_node)
+            for method_name in sorted(methods):
+                if _is_wanted_name(method_name):
+                    module_tests.append(_test_data(
+                        '{0}.{1}.{2}'.format(name, class_name, method_name),
+                        methods[method_name] if is_test_case else None))
+
+        for function_name in sorted(set(module.functions)):
+            if _is_wanted_name(function_name):
+                module_tests.append(_test_data(
+                    '{0}.{1}'.format(name, function_name), None))
+
+        if module_tests:
+            tests[module_path] = module_tests
+
+    return profiles, tests
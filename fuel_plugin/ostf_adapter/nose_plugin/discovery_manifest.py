@@ -0,0 +1,145 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+import json
+import logging
+import os
+
+
+LOG = logging.getLogger(__name__)
+
+
+class DiscoveryManifest(object):
+    '''
+    Stores results of discovery of test modules between
+    adapter restarts. Entries are keyed by absolute path of
+    module and hold its mtime, sha1 of its content, its
+    __profile__ (if any) and data of tests found in it.
+
+    Entry also holds mtimes and hashes of modules the test module
+    depends on (e.g. ones defining base classes of its tests), so
+    the test module is rediscovered when any of them is changed.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._states = {}
+        # path -> (mtime, hash) of modules checked during this run
+        self._files = {}
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (IOError, ValueError):
+            LOG.exception('Discovery manifest %s can not be read.',
+                          self.path)
+            self.entries = {}
+
+    def save(self):
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError):
+            LOG.exception('Discovery manifest %s can not be saved.',
+                          self.path)
+
+    @staticmethod
+    def _content_hash(module_path):
+        with open(module_path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def _file_state(self, path, known=None):
+        '''
+        Returns (mtime, hash) of file or None if there is no such
+        file. Content is hashed only if mtime differs from known one.
+        '''
+        if path not in self._files:
+            try:
+                mtime = os.path.getmtime(path)
+                if known is not None and known[0] == mtime:
+                    content_hash = known[1]
+                else:
+                    content_hash = self._content_hash(path)
+            except (IOError, OSError):
+                self._files[path] = None
+            else:
+                self._files[path] = (mtime, content_hash)
+        return self._files[path]
+
+    def _dependencies_are_fresh(self, entry):
+        for path, known in entry['dependencies'].iteritems():
+            state = self._file_state(path, known)
+            if state is None or state[1] != known[1]:
+                return False
+        return True
+
+    def is_fresh(self, module_path):
+        '''
+        Checks whether entry for module and its dependencies is
+        up to date. Content of file is hashed only if its mtime
+        has changed.
+        '''
+        entry = self.entries.get(module_path)
+        # entries written before dependencies were tracked
+        if entry is None or 'dependencies' not in entry:
+            return False
+        if not self._dependencies_are_fresh(entry):
+            return False
+
+        mtime = os.path.getmtime(module_path)
+        if entry['mtime'] == mtime:
+            return True
+
+        content_hash = self._content_hash(module_path)
+        if entry['hash'] == content_hash:
+            entry['mtime'] = mtime
+            return True
+
+        self._states[module_path] = (mtime, content_hash)
+        return False
+
+    def update(self, module_path, profile, tests, dependencies=()):
+        if module_path in self._states:
+            mtime, content_hash = self._states.pop(module_path)
+        else:
+            mtime = os.path.getmtime(module_path)
+            content_hash = self._content_hash(module_path)
+
+        states = {}
+        for path in dependencies:
+            state = self._file_state(path)
+            if state is not None:
+                states[path] = list(state)
+
+        self.entries[module_path] = {
+            'mtime': mtime,
+            'hash': content_hash,
+            'dependencies': states,
+            'profile': profile,
+            'tests': tests
+        }
+
+    def retain(self, modules_paths):
+        '''Drops entries of modules which are not present anymore.
+        '''
+        for module_path in set(self.entries) - set(modules_paths):
+            del self.entries[module_path]
@@ -0,0 +1,147 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import errno
+import fcntl
+import hashlib
+import logging
+import os
+import struct
+import time
+
+from oslo.config import cfg
+import sqlalchemy as sa
+
+from fuel_plugin.ostf_adapter.storage import engine
+
+
+LOG = logging.getLogger(__name__)
+
+
+def get_lock_names(exclusive_testsets, cluster_id):
+    '''
+    Names of locks test run of test set has to hold
+    while being executed on given cluster.
+    '''
+    return sorted(set(
+        serie + str(cluster_id) for serie in exclusive_testsets or []
+    ))
+
+
+class FileLocks(object):
+    '''
+    Locks taken with fcntl.flock on files in lock directory,
+    they serialize test runs of one adapter host only.
+    '''
+
+    def __init__(self, lock_dir):
+        if not os.path.exists(lock_dir):
+            LOG.error('There is no directory to store locks')
+            raise Exception('There is no directory to store locks')
+
+        self.lock_dir = lock_dir
+        self.held = []
+
+    def try_acquire(self, name):
+        fd = open(os.path.join(self.lock_dir, name), 'w')
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError as e:
+            fd.close()
+            if e.errno in (errno.EAGAIN, errno.EACCES):
+                return False
+            raise
+
+        self.held.append(fd)
+        return True
+
+    def release_all(self):
+        for fd in self.held:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            fd.close()
+        self.held = []
+
+
+class AdvisoryLocks(object):
+    '''
+    Postgres session level advisory locks, so test runs of
+    several adapter hosts sharing one db are serialized.
+    Locks are held on dedicated connection which is not
+    used by session of test run (and so is not returned to
+    pool on commit).
+    '''
+
+    def __init__(self, dbpath):
+        self.connection = engine.get_engine(dbpath).connect()\
+            .execution_options(autocommit=True)
+        self.held = []
+
+    @staticmethod
+    def key(name):
+        return struct.unpack('>q', hashlib.sha1(name).digest()[:8])[0]
+
+    def try_acquire(self, name):
+        acquired = self.connection.execute(
+            sa.select([sa.func.pg_try_advisory_lock(self.key(name))])
+        ).scalar()
+
+        if acquired:
+            self.held.append(name)
+        return acquired
+
+    def release_all(self):
+        try:
+            for name in self.held:
+                self.connection.execute(
+                    sa.select([sa.func.pg_advisory_unlock(self.key(name))])
+                )
+        finally:
+            self.held = []
+            self.connection.close()
+
+
+class LockManager(object):
+    '''
+    Acquires locks in canonical (sorted) order, so test runs
+    needing intersecting sets of locks can not deadlock each
+    other. Locks are polled for instead of blocking on them,
+    so waiting test run still can be interrupted.
+    '''
+
+    def __init__(self, backend, poll_interval=1.0):
+        self.backend = backend
+        self.poll_interval = poll_interval
+
+    def acquire(self, names):
+        '''
+        Blocks until all locks are acquired.
+        Returns number of seconds spent waiting.
+        '''
+        started = time.time()
+        for name in sorted(set(names)):
+            while not self.backend.try_acquire(name):
+                time.sleep(self.poll_interval)
+        return time.time() - started
+
+    def release(self):
+        self.backend.release_all()
+
+
+def get_lock_manager(dbpath):
+    if cfg.CONF.adapter.lock_backend == 'db':
+        backend = AdvisoryLocks(dbpath)
+    else:
+        backend = FileLocks(cfg.CONF.adapter.lock_dir)
+
+    return LockManager(backend, cfg.CONF.adapter.lock_poll_interval)
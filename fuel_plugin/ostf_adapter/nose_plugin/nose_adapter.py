@@ -12,17 +12,22 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import fcntl
+from datetime import datetime
+import errno
 import os
 import logging
 import signal
+import sys
+import time
 
 from oslo.config import cfg
 
 from fuel_plugin.ostf_adapter.logger import ResultsLogger
+from fuel_plugin.ostf_adapter.nose_plugin import lock_manager
 from fuel_plugin.ostf_adapter.nose_plugin import nose_test_runner
 from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
-from fuel_plugin.ostf_adapter.storage import engine, models
+from fuel_plugin.ostf_adapter.nose_plugin import worker_pool
+from fuel_plugin.ostf_adapter.storage import engine, events, models
 from fuel_plugin.ostf_adapter.nose_plugin import nose_storage_plugin
 
 
@@ -37,10 +42,49 @@ class InterruptTestRunException(KeyboardInterrupt):
     pass
 
 
+def reset_tests_state():
+    '''
+    Calls functions listed in adapter.worker_reset which modules
+    are imported, so the next test run in the process does not
+    see configs and connections of the previous one.
+    '''
+    for path in cfg.CONF.adapter.worker_reset:
+        module_name, _, function_name = path.rpartition('.')
+        module = sys.modules.get(module_name)
+        if module is not None:
+            getattr(module, function_name)()
+
+
+def _reap(pid, options=0):
+    '''Returns True if child process has exited (and reaps it).'''
+    while True:
+        try:
+            return os.waitpid(pid, options)[0] == pid
+        except OSError as e:
+            if e.errno == errno.EINTR:
+                continue
+            # not our child or already reaped
+            return True
+
+
 class NoseDriver(object):
     def __init__(self):
         LOG.warning('Initializing Nose Driver')
 
+        self.worker_pool = None
+        if cfg.CONF.adapter.worker_pool_size:
+            self.worker_pool = worker_pool.WorkerPool(
+                self._run_tests,
+                size=cfg.CONF.adapter.worker_pool_size,
+                max_runs=cfg.CONF.adapter.worker_max_runs,
+                max_memory_growth=(
+                    cfg.CONF.adapter.worker_max_memory_growth * 1024 * 1024
+                ),
+                preload=cfg.CONF.adapter.worker_preload,
+                reset=reset_tests_state
+            )
+            self.worker_pool.start()
+
     def run(self, test_run, test_set, dbpath,
             ostf_os_access_creds=None,
             tests=None, token=None):
@@ -54,23 +98,29 @@ class NoseDriver(object):
         else:
             argv_add = [test_set.test_path] + test_set.additional_arguments
 
-        results_log = ResultsLogger(test_set.id, test_run.cluster_id)
+        args = (dbpath, test_run.id, test_run.cluster_id,
+                ostf_os_access_creds, argv_add, token, test_set.id)
+
+        pid = None
+        if self.worker_pool is not None:
+            pid = self.worker_pool.submit(*args)
+
+        # new process is started if there is no idle worker
+        if pid is None:
+            pid = nose_utils.run_proc(self._run_tests, *args).pid
 
-        lock_path = cfg.CONF.adapter.lock_dir
-        test_run.pid = nose_utils.run_proc(self._run_tests,
-                                           lock_path,
-                                           dbpath,
-                                           test_run.id,
-                                           test_run.cluster_id,
-                                           ostf_os_access_creds,
-                                           argv_add,
-                                           token,
-                                           results_log).pid
+        test_run.pid = pid
 
-    def _run_tests(self, lock_path, dbpath, test_run_id,
+    def _run_tests(self, dbpath, test_run_id,
                    cluster_id, ostf_os_access_creds, argv_add, token,
-                   results_log):
+                   test_set_id):
+        '''
+        Runs tests and returns True if run was interrupted.
+        '''
         cleanup_flag = False
+        interrupted = False
+
+        results_log = ResultsLogger(test_set_id, cluster_id)
 
         def raise_exception_handler(signum, stack_frame):
             raise InterruptTestRunException()
@@ -81,45 +131,80 @@ class NoseDriver(object):
                 .filter_by(id=test_run_id)\
                 .one()
 
+            locks = None
+            storage_plugin = nose_storage_plugin.StoragePlugin(
+                session, test_run_id, str(cluster_id),
+                ostf_os_access_creds, token, results_log
+            )
+
             try:
-                if not os.path.exists(lock_path):
-                    LOG.error('There is no directory to store locks')
-                    raise Exception('There is no directory to store locks')
+                lock_names = lock_manager.get_lock_names(
+                    testrun.test_set.exclusive_testsets, cluster_id)
 
-                aquired_locks = []
-                for serie in testrun.test_set.exclusive_testsets:
-                    lock_name = serie + str(testrun.cluster_id)
-                    fd = open(os.path.join(lock_path, lock_name), 'w')
-                    fcntl.flock(fd, fcntl.LOCK_EX)
-                    aquired_locks.append(fd)
+                if lock_names:
+                    locks = lock_manager.get_lock_manager(dbpath)
 
-                nose_test_runner.SilentTestProgram(
-                    addplugins=[nose_storage_plugin.StoragePlugin(
-                        session, test_run_id, str(cluster_id),
-                        ostf_os_access_creds, token, results_log
-                    )],
-                    exit=False,
-                    argv=['ostf_tests'] + argv_add)
+                    # makes queue position of test run visible
+                    models.TestRun.update_test_run(
+                        session, test_run_id,
+                        {'lock_names': lock_names,
+                         'lock_requested_at': datetime.utcnow()})
+                    events.notify(session, test_run_id, [])
+                    session.commit()
+
+                    lock_wait_time = locks.acquire(lock_names)
+                    LOG.info('Test run %s waited for locks %s for %.3f s',
+                             test_run_id, lock_names, lock_wait_time)
+
+                    models.TestRun.update_test_run(
+                        session, test_run_id,
+                        {'lock_wait_time': lock_wait_time})
+                    events.notify(session, test_run_id, [])
+                    session.commit()
+
+                groups = None
+                if self._is_parallel(testrun.test_set):
+                    groups = nose_utils.group_tests_by_class(argv_add)
+
+                if groups and len(groups) > 1:
+                    self._run_parallel(dbpath, test_run_id, cluster_id,
+                                       ostf_os_access_creds, token,
+                                       test_set_id, groups)
+                else:
+                    nose_test_runner.SilentTestProgram(
+                        addplugins=[storage_plugin],
+                        exit=False,
+                        argv=['ostf_tests'] + argv_add)
 
             except InterruptTestRunException:
                 # (dshulyak) after process is interrupted we need to
                 # disable existing handler
                 signal.signal(signal.SIGUSR1, lambda *args: signal.SIG_DFL)
+                interrupted = True
                 if testrun.test_set.cleanup_path:
                     cleanup_flag = True
 
             except Exception:
                 LOG.exception('Test run ID: %s', test_run_id)
             finally:
+                # results buffered by storage plugin must reach db
+                # before test run is marked as finished
+                storage_plugin.flush()
+
+                # buffered results may contain 'running' state which
+                # overrides 'stopped' one set by the server on kill
+                if interrupted:
+                    models.Test.update_running_tests(session, test_run_id)
+
                 updated_data = {'status': 'finished',
                                 'pid': None}
 
                 models.TestRun.update_test_run(
                     session, test_run_id, updated_data)
+                events.notify(session, test_run_id)
 
-                for fd in aquired_locks:
-                    fcntl.flock(fd, fcntl.LOCK_UN)
-                    fd.close()
+                if locks is not None:
+                    locks.release()
 
                 if cleanup_flag:
                     self._clean_up(session,
@@ -127,9 +212,100 @@ class NoseDriver(object):
                                    cluster_id,
                                    testrun.test_set.cleanup_path)
 
+        LOG.info('DB connections of test run %s: %s',
+                 test_run_id, engine.REGISTRY.stats())
+
+        return interrupted
+
+    def _is_parallel(self, test_set):
+        if cfg.CONF.adapter.parallel_workers < 2:
+            return False
+        if test_set.parallel is None:
+            return cfg.CONF.adapter.parallel_test_sets
+        return test_set.parallel
+
+    def _run_parallel(self, dbpath, test_run_id, cluster_id,
+                      ostf_os_access_creds, token, test_set_id, groups):
+        '''
+        Runs each group of tests (tests of one test class, so
+        class fixtures are run once per group) in separate
+        process, at most parallel_workers groups at once.
+        Interruption of test run is passed on to these processes.
+
+        Test run itself is run in daemonic process, which can not
+        start children through multiprocessing, so groups are run
+        in processes forked directly.
+        '''
+        pending = list(groups)
+        running = set()
+
+        # adapter server ignores SIGCHLD and test run process
+        # inherits that, so children could not be waited for
+        sigchld_handler = signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        try:
+            while pending or running:
+                while pending and \
+                        len(running) < cfg.CONF.adapter.parallel_workers:
+                    running.add(nose_utils.fork_proc(self._run_group,
+                                                     dbpath,
+                                                     test_run_id,
+                                                     cluster_id,
+                                                     ostf_os_access_creds,
+                                                     pending.pop(0),
+                                                     token,
+                                                     test_set_id))
+
+                for pid in list(running):
+                    if _reap(pid, os.WNOHANG):
+                        running.discard(pid)
+                time.sleep(0.1)
+
+        except InterruptTestRunException:
+            signal.signal(signal.SIGUSR1, lambda *args: signal.SIG_DFL)
+
+            for pid in running:
+                try:
+                    os.kill(pid, signal.SIGUSR1)
+                except OSError:
+                    pass
+            for pid in running:
+                _reap(pid)
+            raise
+
+        finally:
+            signal.signal(signal.SIGCHLD, sigchld_handler)
+
+    def _run_group(self, dbpath, test_run_id, cluster_id,
+                   ostf_os_access_creds, argv_add, token, test_set_id):
+        def raise_exception_handler(signum, stack_frame):
+            raise InterruptTestRunException()
+        signal.signal(signal.SIGUSR1, raise_exception_handler)
+
+        results_log = ResultsLogger(test_set_id, cluster_id)
+
+        with engine.contexted_session(dbpath) as session:
+            storage_plugin = nose_storage_plugin.StoragePlugin(
+                session, test_run_id, str(cluster_id),
+                ostf_os_access_creds, token, results_log
+            )
+
+            try:
+                nose_test_runner.SilentTestProgram(
+                    addplugins=[storage_plugin],
+                    exit=False,
+                    argv=['ostf_tests'] + argv_add)
+            except InterruptTestRunException:
+                signal.signal(signal.SIGUSR1, lambda *args: signal.SIG_DFL)
+            except Exception:
+                LOG.exception('Test run ID: %s', test_run_id)
+            finally:
+                storage_plugin.flush()
+
     def kill(self, test_run):
         try:
-            if test_run.pid:
+            # pid of finished run may belong to worker
+            # which is already busy with another run
+            if test_run.pid and not test_run.is_finished():
                 os.kill(test_run.pid, signal.SIGUSR1)
                 return True
         except OSError:
@@ -12,13 +12,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import inspect
 import logging
 import os
+import sys
+import types
 
 from nose import plugins
 
+from fuel_plugin.ostf_adapter.nose_plugin import ast_discovery
+from fuel_plugin.ostf_adapter.nose_plugin import discovery_manifest
 from fuel_plugin.ostf_adapter.nose_plugin import nose_test_runner
 from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
+from fuel_plugin.ostf_adapter.storage import fields
 from fuel_plugin.ostf_adapter.storage import models
 
 
@@ -26,14 +32,31 @@ LOG = logging.getLogger(__name__)
 
 
 class DiscoveryPlugin(plugins.Plugin):
+    '''
+    Collects __profile__ of imported modules and data of
+    tests found in them. When manifest is given modules
+    which are up to date in it are not imported at all,
+    their data is taken from the manifest.
+    '''
 
     enabled = True
     name = 'discovery'
     score = 15000
 
-    def __init__(self, session):
-        self.session = session
-        self.test_sets = {}
+    def __init__(self, manifest=None):
+        self.manifest = manifest
+
+        # path of module (or directory of package) -> __profile__
+        self.profiles = {}
+        # path of module -> list of data of tests found in module
+        self.tests = {}
+        # name of imported module -> its path
+        self.modules = {}
+        # paths of modules which data is taken from manifest
+        self.skipped = set()
+        # path of module -> paths of modules it depends on
+        self.dependencies = {}
+
         super(DiscoveryPlugin, self).__init__()
 
     def options(self, parser, env=os.environ):
@@ -42,73 +65,282 @@ class DiscoveryPlugin(plugins.Plugin):
     def configure(self, options, conf):
         pass
 
+    def wantFile(self, file):
+        if self.manifest is None:
+            return None
+
+        path = os.path.abspath(file)
+        if path.endswith('.py') and self.manifest.is_fresh(path):
+            self.skipped.add(path)
+            return False
+        return None
+
     def afterImport(self, filename, module):
         module = __import__(module, fromlist=[module])
         LOG.info('Inspecting %s', filename)
+
+        path = os.path.abspath(filename)
+        self.modules[module.__name__] = path
+        if self.manifest is not None:
+            self.dependencies[path] = _module_dependencies(module)
+
         if hasattr(module, '__profile__'):
-            profile = module.__profile__
+            profile = dict(module.__profile__)
 
             profile['deployment_tags'] = [
                 tag.lower() for tag in profile.get('deployment_tags', [])
             ]
 
-            try:
-                test_set = models.TestSet(**profile)
-                self.session.merge(test_set)
-                self.test_sets[test_set.id] = test_set
-
-                # flush test_sets data into db
-                self.session.commit()
-            except Exception as e:
-                LOG.error(
-                    ('An error has occured while processing'
-                     ' data entity for %s. Error message: %s'),
-                    module.__name__,
-                    e.message
-                )
+            self.profiles[path] = profile
             LOG.info('%s discovered.', module.__name__)
 
     def addSuccess(self, test):
-        test_id = test.id()
-        for test_set_id in self.test_sets.keys():
-            if test_set_id in test_id:
-                data = dict()
-
-                (data['title'], data['description'],
-                 data['duration'], data['deployment_tags']) = \
-                    nose_utils.get_description(test)
-
-                data.update(
-                    {
-                        'test_set_id': test_set_id,
-                        'name': test_id
-                    }
-                )
-
-                try:
-                    test_obj = models.Test(**data)
-                    self.session.merge(test_obj)
-
-                    # flush tests data into db
-                    self.session.commit()
-                except Exception as e:
-                    LOG.error(
-                        ('An error has occured while '
-                         'processing data entity for '
-                         'test with name %s. Error message: %s'),
-                        test_id,
-                        e.message
-                    )
-                LOG.info('%s added for %s', test_id, test_set_id)
+        data = dict()
 
+        (data['title'], data['description'],
+         data['duration'], data['deployment_tags']) = \
+            nose_utils.get_description(test)
+        data['name'] = test.id()
 
-def discovery(path, session):
-    """Will discover all tests on provided path and save info in db
-    """
-    LOG.info('Starting discovery for %r.', path)
+        module_name = test.test.__class__.__module__
+        self.tests.setdefault(self.modules.get(module_name), []).append(data)
+
+    def results(self):
+        '''
+        Returns profiles and tests data of both imported modules
+        and modules skipped in favour of manifest.
+        '''
+        profiles = dict(self.profiles)
+        tests = dict(self.tests)
+
+        for path in self.skipped:
+            entry = self.manifest.entries[path]
+            if entry['profile']:
+                profiles[path] = entry['profile']
+            tests[path] = entry['tests']
+
+        return profiles, tests
+
+    def update_manifest(self):
+        imported = [path for path in self.modules.values()
+                    if path.endswith('.py')]
+
+        for path in imported:
+            self.manifest.update(path,
+                                 self.profiles.get(path),
+                                 self.tests.get(path, []),
+                                 self.dependencies.get(path, ()))
 
+        self.manifest.retain(set(imported) | self.skipped)
+
+
+def _source_file(module):
+    path = getattr(module, '__file__', None)
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    if path.endswith(('.pyc', '.pyo')):
+        path = path[:-1]
+    return path
+
+
+def _module_dependencies(module):
+    '''
+    Returns paths of modules which change may change results of
+    discovery of module: modules it imports and modules defining
+    classes it uses together with their base classes.
+    '''
+    modules = set()
+    for value in vars(module).itervalues():
+        if isinstance(value, types.ModuleType):
+            modules.add(value)
+        elif inspect.isclass(value):
+            for cls in inspect.getmro(value):
+                modules.add(sys.modules.get(cls.__module__))
+
+    own_path = _source_file(module)
+    paths = set(_source_file(dependency) for dependency in modules
+                if dependency is not None)
+    paths.discard(own_path)
+    paths.discard(None)
+    return sorted(paths)
+
+
+def _run_discovery(path, plugin):
     nose_test_runner.SilentTestProgram(
-        addplugins=[DiscoveryPlugin(session)],
+        addplugins=[plugin],
         exit=False,
         argv=['tests_discovery', '--collect-only', '--nocapture', path]
     )
+
+
+def collect(path, backend='nose', manifest=None):
+    '''
+    Returns profiles and tests data discovered on path.
+    Backend "nose" imports test modules (except those up to date
+    in manifest, if it is given) while "ast" only parses them.
+    '''
+    if backend == 'ast':
+        return ast_discovery.collect(path)
+    if backend != 'nose':
+        raise ValueError('Unknown discovery backend {0}'.format(backend))
+
+    plugin = DiscoveryPlugin(manifest=manifest)
+    _run_discovery(path, plugin)
+
+    if manifest is not None:
+        LOG.info('%s modules imported, %s taken from manifest.',
+                 len(plugin.modules), len(plugin.skipped))
+        plugin.update_manifest()
+
+    return plugin.results()
+
+
+def make_models(profiles, tests):
+    '''
+    Creates TestSet and Test entities from discovered data.
+    Test is bound to each test set which id is a part of its name.
+    '''
+    test_sets = {}
+    for path, profile in profiles.iteritems():
+        try:
+            test_set = models.TestSet(**profile)
+        except Exception as e:
+            LOG.error(
+                ('An error has occured while processing'
+                 ' data entity for %s. Error message: %s'),
+                path,
+                e.message
+            )
+            continue
+        test_sets[test_set.id] = test_set
+
+    tests_models = []
+    for module_tests in tests.itervalues():
+        for data in module_tests:
+            for test_set_id in test_sets:
+                if test_set_id in data['name']:
+                    tests_models.append(
+                        models.Test(test_set_id=test_set_id, **data)
+                    )
+                    LOG.info('%s added for %s', data['name'], test_set_id)
+
+    return test_sets.values(), tests_models
+
+
+def _column_values(obj, columns):
+    values = {}
+    for column in columns:
+        value = getattr(obj, column.key)
+        if isinstance(column.type, fields.ListField):
+            value = list(value or [])
+        values[column.key] = value
+    return values
+
+
+def sync_db(session, test_sets, tests):
+    '''
+    Brings test sets and template tests stored in db in line
+    with discovered ones: new entities are added, changed ones
+    are updated and those which were not discovered are removed.
+    Only testing patterns and test sets are deleted here, test
+    runs and tests of removed test sets are removed by db through
+    ON DELETE CASCADE of their foreign keys to testing patterns and
+    test sets. Returns True if anything was changed.
+    '''
+    changed = False
+
+    test_set_columns = models.TestSet.__table__.columns
+    existing_test_sets = dict(
+        (test_set.id, test_set)
+        for test_set in session.query(models.TestSet)
+    )
+    for test_set in test_sets:
+        existing = existing_test_sets.pop(test_set.id, None)
+        if existing is None or \
+                _column_values(existing, test_set_columns) != \
+                _column_values(test_set, test_set_columns):
+            session.merge(test_set)
+            changed = True
+
+    if existing_test_sets:
+        removed = existing_test_sets.keys()
+        LOG.info('Removing test sets %s.', removed)
+
+        session.query(models.ClusterTestingPattern)\
+            .filter(models.ClusterTestingPattern.test_set_id.in_(removed))\
+            .delete(synchronize_session=False)
+        session.query(models.TestSet)\
+            .filter(models.TestSet.id.in_(removed))\
+            .delete(synchronize_session=False)
+        changed = True
+
+    test_columns = [column for column in models.Test.__table__.columns
+                    if column.key not in ('id', 'test_run_id', 'version')]
+    existing_tests = dict(
+        ((test.test_set_id, test.name), test)
+        for test in session.query(models.Test)
+        .filter(models.Test.test_run_id.is_(None))
+    )
+    for test in tests:
+        existing = existing_tests.pop((test.test_set_id, test.name), None)
+        if existing is None:
+            session.add(test)
+            changed = True
+            continue
+
+        values = _column_values(test, test_columns)
+        if _column_values(existing, test_columns) != values:
+            for key, value in values.iteritems():
+                setattr(existing, key, value)
+            changed = True
+
+    removed_tests = [test.id for test in existing_tests.values()
+                     if test.test_set_id not in existing_test_sets]
+    if removed_tests:
+        session.query(models.Test)\
+            .filter(models.Test.id.in_(removed_tests))\
+            .delete(synchronize_session=False)
+        changed = True
+
+    session.flush()
+    return changed
+
+
+def discovery(path, session, backend='nose'):
+    """Will discover all tests on provided path and save info in db
+    """
+    LOG.info('Starting discovery for %r.', path)
+
+    test_sets, tests = make_models(*collect(path, backend))
+    for entity in test_sets + tests:
+        session.merge(entity)
+
+    # flush test_sets and tests data into db
+    session.commit()
+
+
+def incremental_discovery(path, session, manifest_path, backend='nose'):
+    """Discovers tests on provided path importing only modules
+    changed since previous discovery and applies difference
+    to db without committing it. Returns True if db was changed.
+    Manifest is not used by "ast" backend since it does not
+    import modules anyway.
+    """
+    LOG.info('Starting incremental discovery for %r.', path)
+
+    manifest = None
+    if backend == 'nose':
+        manifest = discovery_manifest.DiscoveryManifest(manifest_path)
+        manifest.load()
+
+    test_sets, tests = make_models(*collect(path, backend, manifest))
+    changed = sync_db(session, test_sets, tests)
+
+    # manifest is saved even if transaction is not committed
+    # later since db is always compared with full discovery
+    # results and will be fixed on next start
+    if manifest is not None:
+        manifest.save()
+
+    return changed
@@ -20,7 +20,7 @@ from nose import plugins
 from oslo.config import cfg
 
 from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
-from fuel_plugin.ostf_adapter.storage import models
+from fuel_plugin.ostf_adapter.storage import results_writer
 
 CONF = cfg.CONF
 
@@ -41,6 +41,11 @@ class StoragePlugin(plugins.Plugin):
         self.cluster_id = cluster_id
         self.ostf_os_access_creds = ostf_os_access_creds
         self.results_log = results_log
+        self.results_writer = results_writer.BufferedResultWriter(
+            session, test_run_id,
+            batch_size=CONF.adapter.results_batch_size,
+            flush_interval=CONF.adapter.results_flush_interval
+        )
 
         super(StoragePlugin, self).__init__()
         self._start_time = None
@@ -63,12 +68,7 @@ class StoragePlugin(plugins.Plugin):
     def _add_test_results(self, test, data):
         test_id = test.id()
 
-        models.Test.add_result(
-            self.session,
-            self.test_run_id,
-            test_id,
-            data
-        )
+        self.results_writer.add(test_id, data)
         if data['status'] != 'running':
             test_name = nose_utils.get_description(test)[0]
             self.results_log.log_results(
@@ -101,7 +101,11 @@ class StoragePlugin(plugins.Plugin):
 
         for test in tests_to_update:
             self._add_test_results(test, data)
-        self.session.commit()
+
+    def flush(self):
+        '''Writes all buffered test results to db.
+        '''
+        self.results_writer.flush()
 
     def addSuccess(self, test, capt=None):
         self._add_message(test, status='success')
@@ -12,12 +12,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import itertools
+import collections
 import traceback
 import re
 import json
 import os
 import multiprocessing
+import sys
 
 import logging
 
@@ -57,6 +58,42 @@ def _process_docstring(docstring, pattern):
     return docstring, value
 
 
+def parse_description(docstring):
+    '''
+    Parses docstring of test method into its title,
+    description, duration and deployment tags.
+    '''
+    if docstring:
+        deployment_tags_pattern = r'Deployment tags:.?(?P<tags>.+)?'
+        docstring, deployment_tags = _process_docstring(
+            docstring,
+            deployment_tags_pattern
+        )
+
+        # if deployment tags is empty or absent
+        # _process_docstring returns None so we
+        # must check this and prevent
+        if deployment_tags:
+            deployment_tags = [
+                tag.strip().lower() for tag in deployment_tags.split(',')
+            ]
+        else:
+            deployment_tags = []
+
+        duration_pattern = r'Duration:.?(?P<duration>.+)'
+        docstring, duration = _process_docstring(
+            docstring,
+            duration_pattern
+        )
+
+        docstring = docstring.split('\n')
+        name = docstring.pop(0)
+        description = u'\n'.join(docstring) if docstring else u""
+
+        return name, description, duration, deployment_tags
+    return u"", u"", u"", []
+
+
 def get_description(test_obj):
     '''
     Parses docstring of test object in order
@@ -68,36 +105,7 @@ def get_description(test_obj):
     this method works pretty buggy.
     '''
     if isinstance(test_obj, case.Test):
-        docstring = test_obj.test._testMethodDoc
-
-        if docstring:
-            deployment_tags_pattern = r'Deployment tags:.?(?P<tags>.+)?'
-            docstring, deployment_tags = _process_docstring(
-                docstring,
-                deployment_tags_pattern
-            )
-
-            # if deployment tags is empty or absent
-            # _process_docstring returns None so we
-            # must check this and prevent
-            if deployment_tags:
-                deployment_tags = [
-                    tag.strip().lower() for tag in deployment_tags.split(',')
-                ]
-            else:
-                deployment_tags = []
-
-            duration_pattern = r'Duration:.?(?P<duration>.+)'
-            docstring, duration = _process_docstring(
-                docstring,
-                duration_pattern
-            )
-
-            docstring = docstring.split('\n')
-            name = docstring.pop(0)
-            description = u'\n'.join(docstring) if docstring else u""
-
-            return name, description, duration, deployment_tags
+        return parse_description(test_obj.test._testMethodDoc)
     return u"", u"", u"", []
 
 
@@ -106,6 +114,21 @@ def modify_test_name_for_nose(test_path):
     return '{0}:{1}.{2}'.format(test_module, test_class, test_method)
 
 
+def group_tests_by_class(tests_names):
+    '''
+    Groups names of tests prepared by modify_test_name_for_nose
+    by their test classes. Returns None if some name does not
+    point to a test method (e.g. whole test path is given).
+    '''
+    groups = collections.OrderedDict()
+    for test_name in tests_names:
+        if ':' not in test_name or '.' not in test_name.split(':')[1]:
+            return None
+        test_class = test_name.rsplit('.', 1)[0]
+        groups.setdefault(test_class, []).append(test_name)
+    return groups.values()
+
+
 def format_exception(exc_info):
     ec, ev, tb = exc_info
 
@@ -140,6 +163,30 @@ def run_proc(func, *args):
     return proc
 
 
+def fork_proc(func, *args):
+    '''
+    Runs func in forked child process and returns its pid.
+    Unlike run_proc it may be used in daemonic processes (ones
+    started by run_proc and workers of worker pool), which
+    multiprocessing does not allow to have children. Child
+    exits with status 1 if func raised an exception.
+    '''
+    pid = os.fork()
+    if pid:
+        return pid
+
+    status = 0
+    try:
+        func(*args)
+    except BaseException:
+        LOG.exception('Process %s failed.', os.getpid())
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+
 def get_module(module_path):
     pass
 
@@ -165,20 +212,37 @@ def get_tests_to_update(test):
     return tests
 
 
+def compile_deployment_tags(test_depl_tags):
+    '''
+    Converts deployment tags of testset or test into
+    conjunction of groups of alternative tags: each
+    'tag_a | tag_b' entry becomes frozenset of its alternatives.
+    '''
+    return tuple([
+        frozenset([alt_tag.strip() for alt_tag in tag.split('|')])
+        for tag in test_depl_tags
+    ])
+
+
+def match_deployment_tags(cluster_depl_tags, compiled_depl_tags):
+    '''
+    Determines whether test entity with deployment tags compiled
+    by compile_deployment_tags is appropriate for cluster, i.e.
+    every group of alternatives has tag of the cluster.
+    '''
+    for group in compiled_depl_tags:
+        if group.isdisjoint(cluster_depl_tags):
+            return False
+    return True
+
+
 def process_deployment_tags(cluster_depl_tags, test_depl_tags):
     '''
     Process alternative deployment tags for testsets and tests
     and determines whether current test entity (testset or test)
     is appropriate for cluster.
     '''
-
-    test_depl_tags = [
-        [alt_tag.strip() for alt_tag in tag.split('|')]
-        for tag in test_depl_tags
-    ]
-
-    for comb in itertools.product(*test_depl_tags):
-        if set(comb).issubset(cluster_depl_tags):
-            return True
-
-    return False
+    return match_deployment_tags(
+        cluster_depl_tags,
+        compile_deployment_tags(test_depl_tags)
+    )
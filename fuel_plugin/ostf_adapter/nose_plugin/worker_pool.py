@@ -0,0 +1,220 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import multiprocessing
+import os
+import resource
+import signal
+
+
+LOG = logging.getLogger(__name__)
+
+
+def _rss():
+    '''Resident memory of current process in bytes.'''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (IOError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Worker(object):
+    '''
+    Handle of pre-forked process. Arguments of runs are sent
+    to the process over a pipe, after each run the process
+    replies whether it is going to exit (and so has to be
+    replaced) or is ready for next run.
+    '''
+
+    def __init__(self, conn, process):
+        self.conn = conn
+        self.process = process
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def close(self):
+        self.conn.close()
+
+
+class WorkerPool(object):
+    '''
+    Keeps given number of processes forked in advance which
+    have already imported modules listed in preload and
+    executes target in them.
+
+    Worker is replaced after max_runs runs, after its
+    resident memory grew by more than max_memory_growth
+    bytes since it was started, after interrupted run
+    (target returns True) and after its death.
+
+    reset is called in worker after each run to drop state
+    which code of the run left in the process (cached configs,
+    sessions, connections), worker which failed to do it is
+    replaced.
+    '''
+
+    def __init__(self, target, size, max_runs, max_memory_growth,
+                 preload=(), reset=None):
+        self.target = target
+        self.size = size
+        self.max_runs = max_runs
+        self.max_memory_growth = max_memory_growth
+        self.preload = preload
+        self.reset = reset
+
+        self.idle = []
+        self.busy = []
+
+    def start(self):
+        while len(self.idle) + len(self.busy) < self.size:
+            self.idle.append(self._spawn())
+
+    def _spawn(self):
+        parent_conn, child_conn = multiprocessing.Pipe()
+
+        process = multiprocessing.Process(
+            target=self._serve,
+            args=(child_conn, parent_conn))
+        process.daemon = True
+        process.start()
+
+        child_conn.close()
+
+        LOG.info('Worker %s is started.', process.pid)
+        return Worker(parent_conn, process)
+
+    def _serve(self, conn, parent_conn):
+        # kill requests sent while worker is idle are ignored,
+        # target installs its own handler for the time of run
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+
+        # worker must get EOF on its pipe when pool process
+        # is gone, so ends of pipes inherited from it are closed
+        parent_conn.close()
+        for worker in self.idle + self.busy:
+            worker.close()
+
+        for module_name in self.preload:
+            try:
+                __import__(module_name)
+            except Exception:
+                LOG.exception('Worker can not preload %s.', module_name)
+
+        initial_rss = _rss()
+        runs = 0
+
+        while True:
+            try:
+                args = conn.recv()
+            except (EOFError, IOError):
+                break
+
+            environ = dict(os.environ)
+            interrupted = False
+            try:
+                interrupted = bool(self.target(*args))
+            except BaseException:
+                LOG.exception('Worker %s failed to run %s.',
+                              os.getpid(), args)
+                interrupted = True
+            finally:
+                signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+
+                # runs pass data to tests through environment
+                os.environ.clear()
+                os.environ.update(environ)
+
+            if self.reset is not None and not interrupted:
+                try:
+                    self.reset()
+                except Exception:
+                    LOG.exception('Worker %s failed to reset its state.',
+                                  os.getpid())
+                    interrupted = True
+
+            runs += 1
+            retire = (interrupted or
+                      runs >= self.max_runs or
+                      _rss() - initial_rss > self.max_memory_growth)
+
+            try:
+                conn.send(retire)
+            except IOError:
+                break
+
+            if retire:
+                LOG.info('Worker %s retires after %s runs.',
+                         os.getpid(), runs)
+                break
+
+        conn.close()
+
+    def _collect(self):
+        '''
+        Returns workers which finished their runs into idle
+        ones and replaces retired and dead workers.
+        '''
+        for worker in list(self.busy):
+            if not worker.conn.poll():
+                continue
+
+            self.busy.remove(worker)
+            try:
+                retired = worker.conn.recv()
+            except (EOFError, IOError):
+                retired = True
+
+            if retired:
+                worker.close()
+            else:
+                self.idle.append(worker)
+
+        # idle workers never write into pipe, so readable
+        # pipe means worker has exited
+        for worker in list(self.idle):
+            if worker.conn.poll():
+                self.idle.remove(worker)
+                worker.close()
+
+        self.start()
+
+    def submit(self, *args):
+        '''
+        Sends arguments of run to idle worker. Returns pid of
+        worker or None if all workers are busy.
+        '''
+        self._collect()
+
+        while self.idle:
+            worker = self.idle.pop(0)
+            try:
+                worker.conn.send(args)
+            except IOError:
+                worker.close()
+                continue
+
+            self.busy.append(worker)
+            return worker.pid
+
+        return None
+
+    def close(self):
+        for worker in self.idle + self.busy:
+            worker.close()
+        self.idle = []
+        self.busy = []
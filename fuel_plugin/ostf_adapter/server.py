@@ -25,9 +25,13 @@ from fuel_plugin.ostf_adapter import config as ostf_config
 from fuel_plugin.ostf_adapter import nailgun_hooks
 from fuel_plugin.ostf_adapter import logger
 from fuel_plugin.ostf_adapter.wsgi import app
+from fuel_plugin.ostf_adapter.wsgi import events
 from fuel_plugin.ostf_adapter.nose_plugin import nose_discovery
+from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
 from fuel_plugin.ostf_adapter.storage import engine
+from fuel_plugin.ostf_adapter.storage import retention
 from fuel_plugin.ostf_adapter import mixins
+from fuel_plugin.ostf_adapter import nose_plugin
 
 
 CONF = cfg.CONF
@@ -48,20 +52,56 @@ def main():
         return nailgun_hooks.after_initialization_environment_hook()
 
     with engine.contexted_session(CONF.adapter.dbpath) as session:
-        # performing cleaning of expired data (if any) in db
-        mixins.clean_db(session)
-        log.info('Cleaned up database.')
         # discover testsets and their tests
         CORE_PATH = CONF.debug_tests or 'fuel_health'
 
-        log.info('Performing nose discovery with {0}.'.format(CORE_PATH))
+        if CONF.adapter.discovery_manifest:
+            log.info('Performing incremental {0} discovery with {1}.'
+                     .format(CONF.adapter.discovery_backend, CORE_PATH))
 
-        nose_discovery.discovery(path=CORE_PATH, session=session)
+            changed = nose_discovery.incremental_discovery(
+                path=CORE_PATH,
+                session=session,
+                manifest_path=CONF.adapter.discovery_manifest,
+                backend=CONF.adapter.discovery_backend
+            )
 
-        # cache needed data from test repository
-        mixins.cache_test_repository(session)
+            # cache needed data from test repository
+            mixins.cache_test_repository(session)
+
+            if changed:
+                mixins.refresh_cluster_testing_patterns(session)
+        else:
+            # performing cleaning of expired data (if any) in db
+            mixins.clean_db(session)
+            log.info('Cleaned up database.')
+
+            log.info('Performing {0} discovery with {1}.'
+                     .format(CONF.adapter.discovery_backend, CORE_PATH))
+
+            nose_discovery.discovery(
+                path=CORE_PATH,
+                session=session,
+                backend=CONF.adapter.discovery_backend
+            )
+
+            # cache needed data from test repository
+            mixins.cache_test_repository(session)
 
     log.info('Discovery is completed')
+
+    if CONF.adapter.worker_pool_size:
+        # workers of nose driver are forked and warmed up
+        # before the first test run is requested
+        nose_plugin.get_plugin('nose')
+
+    # changes of test runs are pushed to streaming clients
+    events.start(CONF.adapter.dbpath)
+
+    if CONF.adapter.retention_interval:
+        nose_utils.run_proc(retention.compact_periodically,
+                            CONF.adapter.dbpath)
+
     host, port = CONF.adapter.server_host, CONF.adapter.server_port
     srv = pywsgi.WSGIServer((host, port), root)
 
@@ -73,3 +113,5 @@ def main():
         srv.serve_forever()
     except KeyboardInterrupt:
         pass
+    finally:
+        engine.REGISTRY.dispose()
@@ -0,0 +1,71 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+'''
+Rollups of results of tests across finished test runs.
+
+Rollup of test (models.TestStats) is updated incrementally with
+results of each finished test run, so reading of rollups never
+touches tests table. Duration percentiles are computed over
+window of the latest DURATIONS_WINDOW durations of test.
+'''
+
+import math
+
+PASSED_STATUSES = ('success',)
+FAILED_STATUSES = ('failure', 'error')
+COUNTED_STATUSES = PASSED_STATUSES + FAILED_STATUSES
+
+DURATIONS_WINDOW = 100
+
+
+def percentile(values, fraction):
+    '''Nearest-rank percentile of values, None for no values.'''
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = int(math.ceil(fraction * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+def pass_rate(passed, runs):
+    if not runs:
+        return None
+    return float(passed) / runs
+
+
+def apply_result(stats, status, time_taken, window=DURATIONS_WINDOW):
+    '''
+    Folds result of test from finished test run into its rollup.
+    Only results with status from COUNTED_STATUSES are counted.
+    '''
+    if status not in COUNTED_STATUSES:
+        return
+
+    stats.runs = (stats.runs or 0) + 1
+    if status in PASSED_STATUSES:
+        stats.passed = (stats.passed or 0) + 1
+        stats.failure_streak = 0
+    else:
+        stats.failed = (stats.failed or 0) + 1
+        stats.failure_streak = (stats.failure_streak or 0) + 1
+        stats.max_failure_streak = max(stats.max_failure_streak or 0,
+                                       stats.failure_streak)
+    stats.last_status = status
+
+    if time_taken is not None:
+        durations = (list(stats.durations or []) + [time_taken])[-window:]
+        stats.durations = durations
+        stats.p50 = percentile(durations, 0.5)
+        stats.p95 = percentile(durations, 0.95)
@@ -13,20 +13,152 @@
 #    under the License.
 
 import logging
+import os
+import time
 
 from contextlib import contextmanager
-from sqlalchemy import create_engine, orm
+from oslo.config import cfg
+from sqlalchemy import create_engine, orm, pool
 
 
 LOG = logging.getLogger(__name__)
 
 
+class EngineStats(object):
+    '''Connection statistics of single engine of registry.
+    '''
+
+    def __init__(self):
+        self.connections_opened = 0
+        self.connect_time = 0.0
+
+    def timed_creator(self, connect):
+        def creator():
+            started = time.time()
+            connection = connect()
+            self.connect_time += time.time() - started
+            self.connections_opened += 1
+            return connection
+        return creator
+
+
+class EngineRegistry(object):
+    '''
+    Holds single engine (and so single connection pool)
+    per dbpath for the whole process.
+
+    Engines are tied to the process which created them.
+    When registry is accessed from forked child (e.g. one
+    started by nose_utils.run_proc) inherited engines are
+    detached and new ones are created on demand, so child
+    never uses sockets opened by parent. Inherited engines
+    are not disposed explicitly since closing of inherited
+    connections terminates corresponding postgres backends
+    which are still in use by parent process.
+    '''
+
+    def __init__(self):
+        self._engines = {}
+        self._stats = {}
+        self._pid = os.getpid()
+        self._inherited = []
+
+    def _check_pid(self):
+        pid = os.getpid()
+        if pid != self._pid:
+            LOG.debug('Detaching %s engines inherited from process %s',
+                      len(self._engines), self._pid)
+            self._inherited.extend(self._engines.values())
+            self._engines = {}
+            self._stats = {}
+            self._pid = pid
+
+    def get_engine(self, dbpath):
+        self._check_pid()
+
+        if dbpath not in self._engines:
+            self._engines[dbpath] = self._create_engine(dbpath)
+        return self._engines[dbpath]
+
+    def _create_engine(self, dbpath):
+        LOG.debug('Creating engine for dbpath={0}'.format(dbpath))
+        stats = EngineStats()
+
+        # engine which is never connected, used only to get
+        # dbapi connect function configured for given dbpath
+        proto = create_engine(dbpath, poolclass=pool.NullPool)
+        cargs, cparams = proto.dialect.create_connect_args(proto.url)
+
+        kwargs = {
+            'creator': stats.timed_creator(
+                lambda: proto.dialect.connect(*cargs, **cparams)
+            ),
+            'pool_recycle': cfg.CONF.adapter.db_pool_recycle,
+        }
+        if proto.dialect.name != 'sqlite':
+            kwargs.update({
+                'pool_size': cfg.CONF.adapter.db_pool_size,
+                'max_overflow': cfg.CONF.adapter.db_max_overflow,
+            })
+
+        self._stats[dbpath] = stats
+        return create_engine(dbpath, **kwargs)
+
+    def dispose(self):
+        self._check_pid()
+
+        for engine in self._engines.values():
+            engine.dispose()
+        self._engines = {}
+        self._stats = {}
+
+    def stats(self):
+        self._check_pid()
+
+        result = {}
+        for dbpath, engine in self._engines.iteritems():
+            stats = self._stats[dbpath]
+            engine_stats = {
+                'connections_opened': stats.connections_opened,
+                'connect_time': stats.connect_time,
+            }
+            if isinstance(engine.pool, pool.QueuePool):
+                engine_stats.update({
+                    'pool_size': engine.pool.size(),
+                    'checked_out': engine.pool.checkedout(),
+                    'overflow': engine.pool.overflow(),
+                })
+            # password is masked in url representation
+            result[repr(engine.url)] = engine_stats
+        return result
+
+
+REGISTRY = EngineRegistry()
+
+
+def get_engine(dbpath):
+    return REGISTRY.get_engine(dbpath)
+
+
+def get_backends_count(session):
+    '''
+    Returns number of postgres backends connected to
+    database of session. None is returned for other dialects.
+    '''
+    if session.bind.dialect.name != 'postgresql':
+        return None
+    return session.execute(
+        'SELECT count(*) FROM pg_stat_activity '
+        'WHERE datname = current_database()'
+    ).scalar()
+
+
 @contextmanager
 def contexted_session(dbpath):
     '''Allows to handle session via context manager
     '''
     LOG.debug('Starting session with dbpath={0}'.format(dbpath))
-    engine = create_engine(dbpath)
+    engine = get_engine(dbpath)
     session = orm.Session(bind=engine)
     try:
         LOG.debug('Before yielding session.')
@@ -0,0 +1,138 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import logging
+import select
+
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy import orm
+
+from fuel_plugin.ostf_adapter.storage import engine
+
+
+LOG = logging.getLogger(__name__)
+
+CHANNEL = 'ostf_test_runs'
+
+# postgres limits payload of notification with 8000 bytes
+MAX_PAYLOAD_SIZE = 7900
+
+_PENDING_KEY = 'ostf_pending_notifications'
+
+_HANDLERS = []
+
+
+def make_payloads(test_run_id, tests_names=None):
+    '''
+    Payloads announcing change of test run and its tests with
+    given names. None instead of names stands for all tests
+    of test run. Long list of names is split into several
+    payloads so each of them fits into notification.
+    '''
+    if tests_names is None:
+        return [json.dumps({'test_run_id': test_run_id, 'tests': None})]
+
+    payloads = []
+    chunk = []
+    for name in tests_names:
+        candidate = json.dumps({'test_run_id': test_run_id,
+                                'tests': chunk + [name]})
+        if chunk and len(candidate) > MAX_PAYLOAD_SIZE:
+            payloads.append(json.dumps({'test_run_id': test_run_id,
+                                        'tests': chunk}))
+            chunk = []
+        chunk.append(name)
+
+    payloads.append(json.dumps({'test_run_id': test_run_id,
+                                'tests': chunk}))
+    return payloads
+
+
+def notify(session, test_run_id, tests_names=None):
+    '''
+    Announces change of test run to adapter servers. Notification
+    is delivered when transaction of session is committed.
+
+    On postgres NOTIFY is used, so servers sharing db get changes
+    made by test runs of each other. For other dialects payloads
+    are passed to handlers registered with subscribe within
+    current process.
+    '''
+    payloads = make_payloads(test_run_id, tests_names)
+
+    if session.bind.dialect.name == 'postgresql':
+        for payload in payloads:
+            session.execute(sa.select([sa.func.pg_notify(CHANNEL, payload)]))
+    elif _HANDLERS:
+        session.info.setdefault(_PENDING_KEY, []).extend(payloads)
+
+
+def subscribe(handler):
+    '''
+    Registers handler called with decoded payload of every
+    notification made in current process (non-postgres dialects).
+    '''
+    _HANDLERS.append(handler)
+
+
+@event.listens_for(orm.Session, 'after_commit')
+def _dispatch(session):
+    for payload in session.info.pop(_PENDING_KEY, []):
+        for handler in _HANDLERS:
+            handler(json.loads(payload))
+
+
+@event.listens_for(orm.Session, 'after_rollback')
+def _discard(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _select_read(fd):
+    select.select([fd], [], [])
+
+
+def listen(dbpath, handler, wait_read=None):
+    '''
+    Listens for notifications on dedicated postgres connection
+    and calls handler with decoded payload of each of them.
+    Blocks forever, wait_read (e.g. gevent.socket.wait_read) is
+    called with descriptor of connection to wait for data.
+    '''
+    if wait_read is None:
+        wait_read = _select_read
+
+    # connection is detached from pool since it is never returned
+    connection = engine.get_engine(dbpath).raw_connection()
+    connection.detach()
+
+    dbapi_connection = connection.connection
+    dbapi_connection.autocommit = True
+    try:
+        dbapi_connection.cursor().execute('LISTEN {0}'.format(CHANNEL))
+
+        while True:
+            wait_read(dbapi_connection.fileno())
+            dbapi_connection.poll()
+
+            while dbapi_connection.notifies:
+                notification = dbapi_connection.notifies.pop(0)
+                try:
+                    handler(json.loads(notification.payload))
+                except Exception:
+                    LOG.exception('Failed to handle notification %s',
+                                  notification.payload)
+    finally:
+        connection.close()
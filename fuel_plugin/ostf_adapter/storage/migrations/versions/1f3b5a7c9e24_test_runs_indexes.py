@@ -0,0 +1,25 @@
+"""test_runs_indexes
+
+Revision ID: 1f3b5a7c9e24
+Revises: 2c6e4d8f1a90
+Create Date: 2015-03-16 10:05:43.271906
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '1f3b5a7c9e24'
+down_revision = '2c6e4d8f1a90'
+
+from alembic import op
+
+
+def upgrade():
+    op.create_index('ix_test_runs_cluster_id_test_set_id_id', 'test_runs',
+                    ['cluster_id', 'test_set_id', 'id'])
+    op.create_index('ix_tests_test_run_id_name', 'tests',
+                    ['test_run_id', 'name'])
+
+
+def downgrade():
+    op.drop_index('ix_tests_test_run_id_name', 'tests')
+    op.drop_index('ix_test_runs_cluster_id_test_set_id_id', 'test_runs')
@@ -0,0 +1,33 @@
+"""versions
+
+Revision ID: 2c6e4d8f1a90
+Revises: 4b7e9c1d0a35
+Create Date: 2015-03-12 16:21:08.418305
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '2c6e4d8f1a90'
+down_revision = '4b7e9c1d0a35'
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateSequence, DropSequence
+
+
+def upgrade():
+    op.execute(CreateSequence(sa.Sequence('ostf_version_seq')))
+
+    # existing rows get their versions from default as well
+    for table in ('test_runs', 'tests'):
+        op.add_column(table, sa.Column(
+            'version',
+            sa.BigInteger(),
+            server_default=sa.text("nextval('ostf_version_seq')"),
+            nullable=False))
+
+
+def downgrade():
+    op.drop_column('tests', 'version')
+    op.drop_column('test_runs', 'version')
+    op.execute(DropSequence(sa.Sequence('ostf_version_seq')))
@@ -0,0 +1,45 @@
+"""test_stats
+
+Revision ID: 3a9c1e5b7d20
+Revises: 5d8e2b4f6a13
+Create Date: 2015-03-24 17:12:30.551872
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3a9c1e5b7d20'
+down_revision = '5d8e2b4f6a13'
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+def upgrade():
+    op.create_table(
+        'test_stats',
+        sa.Column('test_name', sa.String(length=512), nullable=False),
+        sa.Column('cluster_id', sa.Integer(), autoincrement=False,
+                  nullable=False),
+        sa.Column('test_set_id', sa.String(length=128), nullable=True),
+        sa.Column('runs', sa.Integer(), nullable=False),
+        sa.Column('passed', sa.Integer(), nullable=False),
+        sa.Column('failed', sa.Integer(), nullable=False),
+        sa.Column('failure_streak', sa.Integer(), nullable=False),
+        sa.Column('max_failure_streak', sa.Integer(), nullable=False),
+        sa.Column('last_status', sa.String(length=32), nullable=True),
+        sa.Column('last_test_run_id', sa.Integer(), nullable=True),
+        sa.Column('durations', postgresql.ARRAY(sa.Float()), nullable=True),
+        sa.Column('p50', sa.Float(), nullable=True),
+        sa.Column('p95', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('test_name', 'cluster_id')
+    )
+    op.add_column('test_runs', sa.Column('stats_version',
+                                         sa.BigInteger(),
+                                         nullable=True))
+
+
+def downgrade():
+    op.drop_column('test_runs', 'stats_version')
+    op.drop_table('test_stats')
@@ -0,0 +1,24 @@
+"""parallel_test_sets
+
+Revision ID: 3e5d1a8c2f47
+Revises: 54904076d82d
+Create Date: 2015-03-02 14:21:09.318406
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3e5d1a8c2f47'
+down_revision = '54904076d82d'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('test_sets', sa.Column('parallel',
+                                         sa.Boolean(),
+                                         nullable=True))
+
+
+def downgrade():
+    op.drop_column('test_sets', 'parallel')
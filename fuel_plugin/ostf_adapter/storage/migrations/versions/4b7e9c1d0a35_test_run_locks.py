@@ -0,0 +1,35 @@
+"""test_run_locks
+
+Revision ID: 4b7e9c1d0a35
+Revises: 3e5d1a8c2f47
+Create Date: 2015-03-05 11:47:32.604218
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4b7e9c1d0a35'
+down_revision = '3e5d1a8c2f47'
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+def upgrade():
+    op.add_column('test_runs', sa.Column('lock_names',
+                                         postgresql.ARRAY(
+                                             sa.String(length=256)
+                                         ),
+                                         nullable=True))
+    op.add_column('test_runs', sa.Column('lock_requested_at',
+                                         sa.DateTime(),
+                                         nullable=True))
+    op.add_column('test_runs', sa.Column('lock_wait_time',
+                                         sa.Float(),
+                                         nullable=True))
+
+
+def downgrade():
+    op.drop_column('test_runs', 'lock_wait_time')
+    op.drop_column('test_runs', 'lock_requested_at')
+    op.drop_column('test_runs', 'lock_names')
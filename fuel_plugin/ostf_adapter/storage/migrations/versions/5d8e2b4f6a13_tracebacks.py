@@ -0,0 +1,34 @@
+"""tracebacks
+
+Revision ID: 5d8e2b4f6a13
+Revises: 1f3b5a7c9e24
+Create Date: 2015-03-19 13:38:52.906144
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5d8e2b4f6a13'
+down_revision = '1f3b5a7c9e24'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'tracebacks',
+        sa.Column('id', sa.String(length=40), nullable=False),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.add_column('tests', sa.Column('traceback_id',
+                                     sa.String(length=40),
+                                     sa.ForeignKey('tracebacks.id'),
+                                     nullable=True))
+    op.create_index('ix_tests_traceback_id', 'tests', ['traceback_id'])
+
+
+def downgrade():
+    op.drop_index('ix_tests_traceback_id', 'tests')
+    op.drop_column('tests', 'traceback_id')
+    op.drop_table('tracebacks')
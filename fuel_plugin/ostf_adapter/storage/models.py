@@ -17,13 +17,15 @@ import logging
 
 import sqlalchemy as sa
 from sqlalchemy import desc
+from sqlalchemy import exc
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import joinedload, relationship, object_mapper
+from sqlalchemy.orm import object_session
 from sqlalchemy.dialects.postgresql import ARRAY
 
 from fuel_plugin.ostf_adapter import nose_plugin
-from fuel_plugin.ostf_adapter.storage import fields, engine
+from fuel_plugin.ostf_adapter.storage import analytics, fields, engine
 
 
 LOG = logging.getLogger(__name__)
@@ -31,6 +33,23 @@ LOG = logging.getLogger(__name__)
 
 BASE = declarative_base()
 
+# versions of test runs and tests are taken from single sequence,
+# so every change gets version greater than ones of earlier changes
+VERSION_SEQUENCE = 'ostf_version_seq'
+
+
+def next_version():
+    return sa.func.nextval(VERSION_SEQUENCE)
+
+
+def _version_column():
+    return sa.Column(
+        sa.BigInteger(),
+        server_default=sa.text("nextval('{0}')".format(VERSION_SEQUENCE)),
+        onupdate=next_version(),
+        nullable=False
+    )
+
 
 class ClusterState(BASE):
     '''
@@ -92,6 +111,10 @@ class TestSet(BASE):
     # with current test set
     exclusive_testsets = sa.Column(ARRAY(sa.String(128)))
 
+    # whether test classes of test set can be run concurrently,
+    # adapter.parallel_test_sets is used if it is not set
+    parallel = sa.Column(sa.Boolean)
+
     tests = relationship(
         'Test',
         backref='test_set',
@@ -110,6 +133,18 @@ class TestSet(BASE):
             .first()
 
 
+class Traceback(BASE):
+    '''
+    Distinct traceback of tests of finished test runs
+    addressed by sha1 of its text.
+    '''
+
+    __tablename__ = 'tracebacks'
+
+    id = sa.Column(sa.String(40), primary_key=True)
+    text = sa.Column(sa.Text(), nullable=False)
+
+
 class Test(BASE):
 
     __tablename__ = 'tests'
@@ -132,11 +167,21 @@ class Test(BASE):
     duration = sa.Column(sa.String(512))
     message = sa.Column(sa.Text())
     traceback = sa.Column(sa.Text())
+    # set instead of traceback by compaction of finished test runs;
+    # tracebacks are not served by API (they reach users through
+    # results log while test run goes), so text is kept in tracebacks
+    # table only for inspection of database
+    traceback_id = sa.Column(
+        sa.String(40),
+        sa.ForeignKey('tracebacks.id'),
+        index=True
+    )
     status = sa.Column(sa.Enum(*STATES, name='test_states'))
     step = sa.Column(sa.Integer())
     time_taken = sa.Column(sa.Float())
     meta = sa.Column(fields.JsonField())
     deployment_tags = sa.Column(ARRAY(sa.String(64)))
+    version = _version_column()
 
     test_run_id = sa.Column(
         sa.Integer(),
@@ -154,6 +199,10 @@ class Test(BASE):
         )
     )
 
+    __table_args__ = (
+        sa.Index('ix_tests_test_run_id_name', 'test_run_id', 'name'),
+    )
+
     @property
     def frontend(self):
         return {
@@ -165,14 +214,85 @@ class Test(BASE):
             'message': self.message,
             'step': self.step,
             'status': self.status,
-            'taken': self.time_taken
+            'taken': self.time_taken,
+            'version': self.version
         }
 
     @classmethod
     def add_result(cls, session, test_run_id, test_name, data):
+        if 'traceback' in data:
+            data = dict(data, traceback_id=None)
         session.query(cls).\
             filter_by(name=test_name, test_run_id=test_run_id).\
             update(data, synchronize_session=False)
+        TestRun.bump_version(session, test_run_id)
+
+    @classmethod
+    def add_results(cls, session, test_run_id, results):
+        '''
+        Stores results for several tests of test run at once.
+        results is iterable of (test_name, data) pairs.
+
+        On postgresql results with the same set of updated columns
+        are written with single UPDATE ... FROM (VALUES ...)
+        statement. Other dialects fall back to add_result per test.
+        '''
+        dialect = session.bind.dialect
+        if dialect.name != 'postgresql':
+            for test_name, data in results:
+                cls.add_result(session, test_run_id, test_name, data)
+            return
+
+        # version is not bumped by onupdate of textual statement
+        version = "version = nextval('{0}')".format(VERSION_SEQUENCE)
+        # new traceback replaces one moved away by compaction
+        reset_traceback = 'traceback_id = NULL'
+
+        grouped = {}
+        for test_name, data in results:
+            columns = tuple(sorted(data.keys()))
+            grouped.setdefault(columns, []).append((test_name, data))
+
+        for columns, group in grouped.iteritems():
+            params = {'test_run_id': test_run_id}
+            rows = []
+            for i, (test_name, data) in enumerate(group):
+                params['name_{0}'.format(i)] = test_name
+                row = [':name_{0}'.format(i)]
+                for column in columns:
+                    key = '{0}_{1}'.format(column, i)
+                    params[key] = data[column]
+                    row.append(':' + key)
+                rows.append('({0})'.format(', '.join(row)))
+
+            # values of VALUES list have no type information so they
+            # are casted to types of corresponding columns explicitly
+            assignments = [
+                '{0} = CAST(v.{0} AS {1})'.format(
+                    column,
+                    cls.__table__.c[column].type.compile(dialect=dialect)
+                )
+                for column in columns
+            ]
+
+            extra_assignments = [version]
+            if 'traceback' in columns:
+                extra_assignments.append(reset_traceback)
+
+            statement = sa.text(
+                'UPDATE {table} SET {assignments} '
+                'FROM (VALUES {rows}) AS v (name, {columns}) '
+                'WHERE {table}.test_run_id = :test_run_id '
+                'AND {table}.name = v.name'.format(
+                    table=cls.__tablename__,
+                    assignments=', '.join(assignments + extra_assignments),
+                    rows=', '.join(rows),
+                    columns=', '.join(columns)
+                )
+            )
+            session.execute(statement, params)
+
+        TestRun.bump_version(session, test_run_id)
 
     @classmethod
     def update_running_tests(cls, session, test_run_id, status='stopped'):
@@ -180,6 +300,7 @@ class Test(BASE):
             filter(cls.test_run_id == test_run_id,
                    cls.status.in_(('running', 'wait_running'))). \
             update({'status': status}, synchronize_session=False)
+        TestRun.bump_version(session, test_run_id)
 
     @classmethod
     def update_test_run_tests(cls, session, test_run_id,
@@ -189,6 +310,53 @@ class Test(BASE):
                    cls.test_run_id == test_run_id). \
             update({'status': status, 'time_taken': None},
                    synchronize_session=False)
+        TestRun.bump_version(session, test_run_id)
+
+    @classmethod
+    def copy_tests(cls, session, test_run_id, test_set_id,
+                   tests_names, predefined_tests):
+        '''
+        Copies tests of test set with given names for test run
+        with single INSERT ... SELECT statement. Status of copies
+        is computed in db: if predefined_tests are given other
+        tests are copied as 'disabled'.
+        '''
+        table = cls.__table__
+        status_column = table.c.status
+
+        # copies get new versions from default of column
+        copied_columns = [column for column in table.c
+                          if column.name not in ('id', 'test_run_id',
+                                                 'status', 'version')]
+
+        if predefined_tests:
+            status = sa.case(
+                [(table.c.name.in_(predefined_tests), 'wait_running')],
+                else_='disabled'
+            )
+        else:
+            status = sa.literal('wait_running')
+
+        select = sa.select(
+            copied_columns + [
+                sa.literal(test_run_id, sa.Integer),
+                sa.cast(status, status_column.type)
+            ]
+        ).where(
+            sa.and_(
+                table.c.name.in_(tests_names),
+                table.c.test_set_id == test_set_id,
+                table.c.test_run_id.is_(None)
+            )
+        )
+
+        session.execute(
+            table.insert().from_select(
+                [column.name for column in copied_columns] +
+                ['test_run_id', 'status'],
+                select
+            )
+        )
 
     def copy_test(self, test_run, predefined_tests):
         '''
@@ -199,7 +367,7 @@ class Test(BASE):
         mapper = object_mapper(self)
         primary_keys = set([col.key for col in mapper.primary_key])
         for column in mapper.iterate_properties:
-            if column.key not in primary_keys:
+            if column.key not in primary_keys and column.key != 'version':
                 setattr(new_test, column.key, getattr(self, column.key))
         new_test.test_run_id = test_run.id
         if predefined_tests and new_test.name not in predefined_tests:
@@ -227,6 +395,16 @@ class TestRun(BASE):
     ended_at = sa.Column(sa.DateTime)
     pid = sa.Column(sa.Integer)
 
+    # locks of exclusive test sets needed by test run, moment
+    # it started waiting for them and how long it waited
+    lock_names = sa.Column(ARRAY(sa.String(256)))
+    lock_requested_at = sa.Column(sa.DateTime)
+    lock_wait_time = sa.Column(sa.Float)
+
+    version = _version_column()
+    # greatest version of tests already counted in rollups
+    stats_version = sa.Column(sa.BigInteger)
+
     test_set_id = sa.Column(sa.String(128))
     cluster_id = sa.Column(sa.Integer)
 
@@ -237,6 +415,8 @@ class TestRun(BASE):
              'cluster_testing_pattern.cluster_id'],
             ondelete='CASCADE'
         ),
+        sa.Index('ix_test_runs_cluster_id_test_set_id_id',
+                 'cluster_id', 'test_set_id', 'id'),
         {}
     )
 
@@ -265,8 +445,35 @@ class TestRun(BASE):
     def is_finished(self):
         return self.status == 'finished'
 
+    @property
+    def queue_position(self):
+        '''
+        Number of running test runs which hold or wait (since
+        earlier moment) for locks needed by this test run.
+        None if test run does not wait for locks.
+        '''
+        if not self.lock_names or self.lock_wait_time is not None \
+                or self.is_finished():
+            return None
+
+        session = object_session(self)
+        if session is None:
+            return None
+
+        return session.query(TestRun)\
+            .filter(TestRun.id != self.id)\
+            .filter(TestRun.status == 'running')\
+            .filter(TestRun.lock_names.overlap(self.lock_names))\
+            .filter(sa.or_(
+                TestRun.lock_wait_time.isnot(None),
+                TestRun.lock_requested_at < self.lock_requested_at))\
+            .count()
+
     @property
     def frontend(self):
+        return self.to_frontend()
+
+    def to_frontend(self, include_tests=True):
         test_run_data = {
             'id': self.id,
             'testset': self.test_set_id,
@@ -275,9 +482,12 @@ class TestRun(BASE):
             'status': self.status,
             'started_at': self.started_at,
             'ended_at': self.ended_at,
+            'lock_wait_time': self.lock_wait_time,
+            'queue_position': self.queue_position,
+            'version': self.version,
             'tests': []
         }
-        if self.tests:
+        if include_tests and self.tests:
             test_run_data['tests'] = [test.frontend for test in self.tests]
         return test_run_data
 
@@ -287,22 +497,33 @@ class TestRun(BASE):
         '''
         Creates new test_run object with given data
         and makes copy of tests that will be bound
-        with this test_run. Copying is performed by
-        copy_test method of Test class.
+        with this test_run. On postgresql copying is performed
+        by copy_tests method of Test class in db, for other
+        dialects copy_test method is used for each test.
         '''
         predefined_tests = tests or []
         tests_names = session.query(ClusterTestingPattern.tests)\
             .filter_by(test_set_id=test_set, cluster_id=cluster_id)\
             .scalar()
 
+        test_run = cls(test_set_id=test_set, cluster_id=cluster_id,
+                       status=status)
+        session.add(test_run)
+
+        if session.bind.dialect.name == 'postgresql':
+            # id of test_run is needed for copies of tests
+            session.flush()
+            Test.copy_tests(session, test_run.id, test_set,
+                            tests_names, predefined_tests)
+            # version of test run is kept not less than ones of its tests
+            cls.bump_version(session, test_run.id)
+            return test_run
+
         tests = session.query(Test)\
             .filter(Test.name.in_(tests_names))\
             .filter_by(test_set_id=test_set)\
             .filter_by(test_run_id=None)
 
-        test_run = cls(test_set_id=test_set, cluster_id=cluster_id,
-                       status=status)
-        session.add(test_run)
         for test in tests:
             session.add(test.copy_test(test_run, predefined_tests))
         return test_run
@@ -335,6 +556,17 @@ class TestRun(BASE):
                 filter_by(id=test_run_id).first()
         return test_run
 
+    @classmethod
+    def bump_version(cls, session, test_run_id):
+        '''
+        Marks test run as changed, must follow any change
+        of its tests (so clients which know the latest version
+        of test run get its changed tests).
+        '''
+        session.query(cls). \
+            filter(cls.id == test_run_id). \
+            update({'version': next_version()}, synchronize_session=False)
+
     @classmethod
     def update_test_run(cls, session, test_run_id, updated_data):
         if updated_data.get('status') in ['finished']:
@@ -344,6 +576,16 @@ class TestRun(BASE):
             filter(cls.id == test_run_id). \
             update(updated_data, synchronize_session=False)
 
+        if updated_data.get('status') in ['finished']:
+            # rollups are auxiliary data, their failure
+            # must not prevent test run from finishing
+            try:
+                with session.begin_nested():
+                    TestStats.add_test_run(session, test_run_id)
+            except Exception:
+                LOG.exception('Failed to update rollups with results '
+                              'of test run %s', test_run_id)
+
     @classmethod
     def is_last_running(cls, session, test_set, cluster_id):
         '''
@@ -402,3 +644,126 @@ class TestRun(BASE):
             Test.update_running_tests(
                 session, self.id, status='stopped')
         return self.frontend
+
+
+class TestStats(BASE):
+    '''
+    Rollup of results of test across finished test runs of
+    cluster, rollup with cluster_id ALL_CLUSTERS covers
+    test runs of all clusters.
+    '''
+
+    __tablename__ = 'test_stats'
+
+    ALL_CLUSTERS = 0
+
+    test_name = sa.Column(sa.String(512), primary_key=True)
+    cluster_id = sa.Column(sa.Integer, primary_key=True, autoincrement=False)
+    test_set_id = sa.Column(sa.String(128))
+
+    runs = sa.Column(sa.Integer, nullable=False, default=0)
+    passed = sa.Column(sa.Integer, nullable=False, default=0)
+    failed = sa.Column(sa.Integer, nullable=False, default=0)
+    failure_streak = sa.Column(sa.Integer, nullable=False, default=0)
+    max_failure_streak = sa.Column(sa.Integer, nullable=False, default=0)
+    last_status = sa.Column(sa.String(32))
+    last_test_run_id = sa.Column(sa.Integer)
+
+    # latest durations of test, percentiles are computed over them
+    durations = sa.Column(ARRAY(sa.Float))
+    p50 = sa.Column(sa.Float)
+    p95 = sa.Column(sa.Float)
+
+    updated_at = sa.Column(sa.DateTime)
+
+    @property
+    def frontend(self):
+        return {
+            'id': self.test_name,
+            'testset': self.test_set_id,
+            'cluster_id': (None if self.cluster_id == self.ALL_CLUSTERS
+                           else self.cluster_id),
+            'runs': self.runs,
+            'passed': self.passed,
+            'failed': self.failed,
+            'pass_rate': analytics.pass_rate(self.passed, self.runs),
+            'failure_streak': self.failure_streak,
+            'max_failure_streak': self.max_failure_streak,
+            'last_status': self.last_status,
+            'p50': self.p50,
+            'p95': self.p95,
+            'updated_at': self.updated_at
+        }
+
+    @classmethod
+    def _add_missing(cls, session, keys):
+        '''
+        Inserts empty rollups for (test_name, cluster_id) keys which
+        have none yet, each in its own savepoint. Rollup inserted
+        concurrently by another test run makes insert wait for that
+        transaction and fail, such rollup is just left to it.
+        '''
+        existing = set(
+            session.query(cls.test_name, cls.cluster_id)
+            .filter(cls.test_name.in_(set(name for name, _ in keys)))
+            .filter(cls.cluster_id.in_(set(scope for _, scope in keys)))
+        )
+
+        for test_name, cluster_id in sorted(set(keys) - existing):
+            try:
+                with session.begin_nested():
+                    session.add(cls(test_name=test_name,
+                                    cluster_id=cluster_id))
+            except exc.IntegrityError:
+                LOG.debug('Rollup of %s for cluster %s is added '
+                          'concurrently', test_name, cluster_id)
+
+    @classmethod
+    def add_test_run(cls, session, test_run_id):
+        '''
+        Folds results of finished test run into rollups of
+        its cluster and of all clusters. Only tests changed since
+        the previous call for the same test run are counted, so
+        restarted test runs are not counted twice.
+        '''
+        test_run = session.query(TestRun).filter_by(id=test_run_id).one()
+        since = test_run.stats_version or 0
+
+        results = session.query(Test.name, Test.status,
+                                Test.time_taken, Test.version)\
+            .filter(Test.test_run_id == test_run_id)\
+            .filter(Test.version > since)\
+            .filter(Test.status.in_(analytics.COUNTED_STATUSES))\
+            .all()
+        if not results:
+            return
+
+        scopes = (test_run.cluster_id, cls.ALL_CLUSTERS)
+        cls._add_missing(session, [(result.name, cluster_id)
+                                   for result in results
+                                   for cluster_id in scopes])
+
+        # rows are locked in the same order by all test runs and
+        # loaded anew, other test runs may have changed them meanwhile
+        rollups = dict(
+            ((stats.test_name, stats.cluster_id), stats)
+            for stats in session.query(cls)
+            .filter(cls.test_name.in_([result.name for result in results]))
+            .filter(cls.cluster_id.in_(scopes))
+            .order_by(cls.test_name, cls.cluster_id)
+            .with_for_update()
+            .populate_existing()
+        )
+
+        now = datetime.utcnow()
+        for result in results:
+            for cluster_id in scopes:
+                stats = rollups[(result.name, cluster_id)]
+                stats.test_set_id = test_run.test_set_id
+                analytics.apply_result(stats, result.status,
+                                       result.time_taken)
+                stats.last_test_run_id = test_run_id
+                stats.updated_at = now
+
+        test_run.stats_version = max(result.version for result in results)
+        session.flush()
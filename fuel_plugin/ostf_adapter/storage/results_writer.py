@@ -0,0 +1,130 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+from fuel_plugin.ostf_adapter.storage import events
+from fuel_plugin.ostf_adapter.storage import models
+
+
+LOG = logging.getLogger(__name__)
+
+
+class BufferedResultWriter(object):
+    '''
+    Write-behind sink for results of tests of one test run.
+
+    Results are accumulated in memory (only the latest result
+    of each test is kept) and are written to db with single
+    bulk statement and single commit when either batch_size
+    results are pending or the oldest pending result is older
+    than flush_interval seconds. The latter is checked by timer
+    as well, so results (e.g. 'running' state of the test which
+    has just been started) reach db in flush_interval seconds
+    even if the next result comes much later.
+
+    Results with status from eager_statuses are flushed at once
+    together with everything buffered before them.
+
+    Session is used by timer thread too, so it must not be used
+    by anyone else until flush() is called. flush() must be called
+    before test run is moved to terminal state so no result is lost.
+    '''
+
+    def __init__(self, session, test_run_id, batch_size=50,
+                 flush_interval=1.0, eager_statuses=()):
+        self.session = session
+        self.test_run_id = test_run_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.eager_statuses = eager_statuses
+
+        self._pending = OrderedDict()
+        self._first_pending_at = None
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, test_name, data):
+        with self._lock:
+            if not self._pending:
+                self._first_pending_at = time.time()
+                self._start_timer()
+
+            # latest result of test wins and there is no need
+            # to write intermediate ones
+            self._pending.pop(test_name, None)
+            self._pending[test_name] = dict(data)
+
+            if self._should_flush(data):
+                self.flush()
+
+    def _start_timer(self):
+        if self.flush_interval <= 0:
+            return
+        self._timer = threading.Timer(self.flush_interval,
+                                      self._flush_by_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_by_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            LOG.exception('Failed to flush results of test run %s',
+                          self.test_run_id)
+            # results stay buffered and are retried later
+            with self._lock:
+                self.session.rollback()
+                if self._pending:
+                    self._start_timer()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            # no-op for the timer which is flushing right now
+            self._timer.cancel()
+            self._timer = None
+
+    def _should_flush(self, data):
+        if data.get('status') in self.eager_statuses:
+            return True
+        if len(self._pending) >= self.batch_size:
+            return True
+        return time.time() - self._first_pending_at >= self.flush_interval
+
+    def flush(self):
+        with self._lock:
+            self._cancel_timer()
+            if not self._pending:
+                return
+
+            LOG.debug('Flushing %s results of test run %s',
+                      len(self._pending), self.test_run_id)
+
+            models.Test.add_results(
+                self.session,
+                self.test_run_id,
+                self._pending.items()
+            )
+            events.notify(self.session, self.test_run_id,
+                          self._pending.keys())
+            self.session.commit()
+
+            self._pending.clear()
+            self._first_pending_at = None
@@ -0,0 +1,210 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import time
+
+from oslo.config import cfg
+import sqlalchemy as sa
+
+from fuel_plugin.ostf_adapter.storage import engine
+from fuel_plugin.ostf_adapter.storage import models
+
+
+LOG = logging.getLogger(__name__)
+
+
+def traceback_digest(text):
+    if isinstance(text, unicode):
+        text = text.encode('utf-8')
+    return hashlib.sha1(text).hexdigest()
+
+
+def expired_test_runs(session, keep_last, max_age=None):
+    '''
+    Query of ids of finished test runs which are not among
+    keep_last latest test runs of their test set and cluster or
+    were started more than max_age ago. The latest test run of
+    test set is never expired since it is shown to users.
+    '''
+    rank = sa.func.row_number().over(
+        partition_by=(models.TestRun.cluster_id,
+                      models.TestRun.test_set_id),
+        order_by=models.TestRun.id.desc()
+    ).label('rank')
+
+    ranked = session.query(models.TestRun.id,
+                           models.TestRun.status,
+                           models.TestRun.started_at,
+                           rank).subquery()
+
+    conditions = []
+    if keep_last:
+        conditions.append(ranked.c.rank > keep_last)
+    if max_age:
+        conditions.append(ranked.c.started_at < datetime.utcnow() - max_age)
+
+    return session.query(ranked.c.id)\
+        .filter(ranked.c.rank > 1)\
+        .filter(ranked.c.status == 'finished')\
+        .filter(sa.or_(*conditions))\
+        .order_by(ranked.c.id)
+
+
+class Compactor(object):
+    '''
+    Removes expired test runs (tests are removed by cascade)
+    and moves tracebacks of tests of finished test runs into
+    content-addressed tracebacks table, so each distinct
+    traceback is stored once.
+
+    Work is done in batches of batch_size rows, each batch is
+    committed separately so tables are never locked for long,
+    pause seconds are slept (with given sleep function) between
+    batches to let other db clients proceed.
+    '''
+
+    def __init__(self, session, keep_last, max_age=None, batch_size=100,
+                 pause=0, sleep=time.sleep):
+        self.session = session
+        self.keep_last = keep_last
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.pause = pause
+        self.sleep = sleep
+
+    def _batches(self, step):
+        '''Runs step until it processes less than full batch.'''
+        total = 0
+        while True:
+            processed = step()
+            self.session.commit()
+            total += processed
+
+            if processed < self.batch_size:
+                return total
+            self.sleep(self.pause)
+
+    def delete_expired_test_runs(self):
+        if not self.keep_last and not self.max_age:
+            return 0
+
+        def step():
+            ids = [row.id for row in
+                   expired_test_runs(self.session, self.keep_last,
+                                     self.max_age)
+                   .limit(self.batch_size)]
+            if ids:
+                self.session.query(models.TestRun)\
+                    .filter(models.TestRun.id.in_(ids))\
+                    .delete(synchronize_session=False)
+            return len(ids)
+
+        return self._batches(step)
+
+    def dedupe_tracebacks(self):
+        def step():
+            rows = self.session\
+                .query(models.Test.id, models.Test.traceback)\
+                .join(models.TestRun,
+                      models.TestRun.id == models.Test.test_run_id)\
+                .filter(models.TestRun.status == 'finished')\
+                .filter(models.Test.traceback.isnot(None))\
+                .filter(models.Test.traceback != '')\
+                .limit(self.batch_size)\
+                .all()
+
+            by_digest = {}
+            texts = {}
+            for test_id, text in rows:
+                digest = traceback_digest(text)
+                by_digest.setdefault(digest, []).append(test_id)
+                texts[digest] = text
+
+            if texts:
+                stored = set(digest for digest, in self.session
+                             .query(models.Traceback.id)
+                             .filter(models.Traceback.id.in_(texts.keys())))
+                for digest, text in texts.iteritems():
+                    if digest not in stored:
+                        self.session.add(
+                            models.Traceback(id=digest, text=text))
+                self.session.flush()
+
+            for digest, tests_ids in by_digest.iteritems():
+                self.session.query(models.Test)\
+                    .filter(models.Test.id.in_(tests_ids))\
+                    .update({'traceback': None, 'traceback_id': digest},
+                            synchronize_session=False)
+            return len(rows)
+
+        return self._batches(step)
+
+    def delete_orphaned_tracebacks(self):
+        def step():
+            used = sa.exists()\
+                .where(models.Test.traceback_id == models.Traceback.id)
+            ids = [digest for digest, in self.session
+                   .query(models.Traceback.id)
+                   .filter(~used)
+                   .limit(self.batch_size)]
+            if ids:
+                self.session.query(models.Traceback)\
+                    .filter(models.Traceback.id.in_(ids))\
+                    .delete(synchronize_session=False)
+            return len(ids)
+
+        return self._batches(step)
+
+    def run(self):
+        started = time.time()
+        stats = {
+            'deleted_test_runs': self.delete_expired_test_runs(),
+            'deduplicated_tracebacks': self.dedupe_tracebacks(),
+            'deleted_tracebacks': self.delete_orphaned_tracebacks(),
+        }
+        LOG.info('Compaction finished in %.1f s: %s',
+                 time.time() - started, stats)
+        return stats
+
+
+def compact(dbpath, sleep=time.sleep):
+    adapter = cfg.CONF.adapter
+    max_age = None
+    if adapter.retention_max_age:
+        max_age = timedelta(days=adapter.retention_max_age)
+
+    with engine.contexted_session(dbpath) as session:
+        return Compactor(session,
+                         keep_last=adapter.retention_keep_last,
+                         max_age=max_age,
+                         batch_size=adapter.retention_batch_size,
+                         pause=adapter.retention_batch_pause,
+                         sleep=sleep).run()
+
+
+def compact_periodically(dbpath, sleep=time.sleep):
+    '''
+    Background compaction job, is run by adapter server in
+    separate process, so blocking db calls of batches do not
+    stall greenlets serving requests.
+    '''
+    while True:
+        sleep(cfg.CONF.adapter.retention_interval)
+        try:
+            compact(dbpath, sleep)
+        except Exception:
+            LOG.exception('Compaction of test runs failed')
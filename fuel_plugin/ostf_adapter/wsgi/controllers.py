@@ -12,21 +12,43 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+from datetime import datetime
+import hashlib
 import json
 import logging
 
-from sqlalchemy import func
-from sqlalchemy.orm import joinedload
-from pecan import rest, expose, request, abort
+from sqlalchemy import and_, func
+from sqlalchemy.orm import joinedload, subqueryload
+from pecan import rest, expose, request, response, abort
 
 from oslo.config import cfg
 
 from fuel_plugin.ostf_adapter import mixins
+from fuel_plugin.ostf_adapter.storage import engine
+from fuel_plugin.ostf_adapter.storage import events as storage_events
 from fuel_plugin.ostf_adapter.storage import models
+from fuel_plugin.ostf_adapter.wsgi import events
 
 
 LOG = logging.getLogger(__name__)
 
+DATETIME_FORMATS = ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S',
+                    '%Y-%m-%d %H:%M:%S', '%Y-%m-%d')
+
+
+def _parse_datetime(value):
+    for datetime_format in DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, datetime_format)
+        except ValueError:
+            pass
+    raise ValueError('Unknown datetime format: {0}'.format(value))
+
+
+def _parse_bool(value):
+    return value.lower() not in ('0', 'false', 'no', 'off')
+
 
 class BaseRestController(rest.RestController):
     def _handle_get(self, method, remainder):
@@ -67,19 +89,20 @@ class TestsController(BaseRestController):
     @expose('json')
     def get(self, cluster):
         mixins.discovery_check(request.session, cluster, request.token)
-        needed_tests_list = request.session\
-            .query(models.ClusterTestingPattern.tests)\
-            .filter_by(cluster_id=cluster)
-
-        result = []
-        for tests in needed_tests_list:
-            tests_to_return = request.session.query(models.Test)\
-                .filter(models.Test.name.in_(tests[0]))\
-                .all()
-
-            result.extend(tests_to_return)
-
-        result.sort(key=lambda test: test.name)
+        needed_tests = request.session\
+            .query(models.ClusterTestingPattern.test_set_id,
+                   func.unnest(models.ClusterTestingPattern.tests)
+                   .label('name'))\
+            .filter_by(cluster_id=cluster)\
+            .subquery()
+
+        result = request.session.query(models.Test)\
+            .join(needed_tests,
+                  and_(models.Test.name == needed_tests.c.name,
+                       models.Test.test_set_id == needed_tests.c.test_set_id))\
+            .filter(models.Test.test_run_id.is_(None))\
+            .order_by(models.Test.name)\
+            .all()
 
         if result:
             return [item.frontend for item in result]
@@ -91,13 +114,65 @@ class TestrunsController(BaseRestController):
 
     _custom_actions = {
         'last': ['GET'],
+        'events': ['GET'],
+        'stream': ['GET'],
     }
 
     @expose('json')
-    def get_all(self):
-        test_runs = request.session.query(models.TestRun).all()
-
-        return [item.frontend for item in test_runs]
+    def get_all(self, cluster_id=None, test_set_id=None, status=None,
+                started_after=None, started_before=None,
+                marker=None, limit=None, include_tests='true'):
+        '''
+        Test runs matching given filters, the newest first. They
+        are paged if limit or marker is given: when page is full,
+        X-Next-Marker header of response holds marker of the next
+        page. Tests of test runs are loaded with single query or
+        omitted if include_tests is false.
+        '''
+        try:
+            if limit is not None:
+                limit = int(limit)
+                if limit <= 0:
+                    raise ValueError('Limit must be positive')
+                limit = min(limit, cfg.CONF.adapter.testruns_max_page_size)
+            elif marker is not None:
+                limit = cfg.CONF.adapter.testruns_page_size
+            if marker is not None:
+                marker = int(marker)
+            if started_after is not None:
+                started_after = _parse_datetime(started_after)
+            if started_before is not None:
+                started_before = _parse_datetime(started_before)
+        except ValueError:
+            abort(400)
+        include_tests = _parse_bool(include_tests)
+
+        query = request.session.query(models.TestRun)
+        if cluster_id is not None:
+            query = query.filter(models.TestRun.cluster_id == cluster_id)
+        if test_set_id is not None:
+            query = query.filter(models.TestRun.test_set_id == test_set_id)
+        if status is not None:
+            query = query.filter(models.TestRun.status == status)
+        if started_after is not None:
+            query = query.filter(models.TestRun.started_at >= started_after)
+        if started_before is not None:
+            query = query.filter(models.TestRun.started_at < started_before)
+        if marker is not None:
+            query = query.filter(models.TestRun.id < marker)
+        if include_tests:
+            query = query.options(subqueryload('tests'))
+
+        query = query.order_by(models.TestRun.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        test_runs = query.all()
+
+        if limit is not None and len(test_runs) == limit:
+            response.headers['X-Next-Marker'] = str(test_runs[-1].id)
+
+        return [item.to_frontend(include_tests=include_tests)
+                for item in test_runs]
 
     @expose('json')
     def get_one(self, test_run_id):
@@ -108,16 +183,110 @@ class TestrunsController(BaseRestController):
         return {}
 
     @expose('json')
-    def get_last(self, cluster_id):
+    def get_last(self, cluster_id, since=None):
+        '''
+        Last test runs of each test set of cluster. ETag of response
+        is built from versions of test runs, so polling client gets
+        304 while none of them changes. With since=<version> only
+        test runs changed after given version are returned and they
+        contain only tests changed after it, the greatest version of
+        returned test runs is to be used as since of the next request.
+        '''
+        try:
+            since = None if since is None else int(since)
+        except ValueError:
+            abort(400)
+
         test_run_ids = request.session.query(func.max(models.TestRun.id)) \
             .group_by(models.TestRun.test_set_id)\
             .filter_by(cluster_id=cluster_id)
 
+        versions = request.session\
+            .query(models.TestRun.id, models.TestRun.version)\
+            .filter(models.TestRun.id.in_(test_run_ids))\
+            .order_by(models.TestRun.id)\
+            .all()
+
+        etag = hashlib.sha1(repr((versions, since))).hexdigest()
+        if etag in request.if_none_match:
+            response.status = 304
+            return response
+        response.etag = etag
+
+        if since is None:
+            test_runs = request.session.query(models.TestRun)\
+                .options(joinedload('tests'))\
+                .filter(models.TestRun.id.in_(test_run_ids))
+
+            return [item.frontend for item in test_runs]
+
+        changed_ids = [test_run_id for test_run_id, version in versions
+                       if version > since]
+        if not changed_ids:
+            return []
+
         test_runs = request.session.query(models.TestRun)\
-            .options(joinedload('tests'))\
-            .filter(models.TestRun.id.in_(test_run_ids))
+            .filter(models.TestRun.id.in_(changed_ids))\
+            .order_by(models.TestRun.id)
+        result = collections.OrderedDict(
+            (test_run.id, test_run.to_frontend(include_tests=False))
+            for test_run in test_runs
+        )
+
+        changed_tests = request.session.query(models.Test)\
+            .filter(models.Test.test_run_id.in_(changed_ids))\
+            .filter(models.Test.version > since)\
+            .order_by(models.Test.name)
+        for test in changed_tests:
+            result[test.test_run_id]['tests'].append(test.frontend)
+
+        return result.values()
+
+    @expose('json')
+    def get_events(self, cluster_id, since=None, timeout=None):
+        '''
+        Long-poll for changes of test runs of cluster. Responds as
+        soon as there are changes newer than since version or with
+        empty list of events after timeout seconds. Request without
+        since returns current version to start polling from, reset
+        in response means that client has to refetch test runs
+        (e.g. with /testruns/last) and continue from new version.
+        '''
+        max_timeout = cfg.CONF.adapter.events_poll_timeout
+        try:
+            since = None if since is None else int(since)
+            timeout = min(float(timeout or max_timeout), max_timeout)
+        except ValueError:
+            abort(400)
+
+        result = []
+        if since is not None:
+            result = events.BUS.wait(cluster_id, since, timeout)
+
+        # session of request is not used while waiting, so
+        # waiting clients do not hold db connections
+        data = {'version': events.BUS.version, 'events': result or []}
+        if result is None:
+            data['reset'] = True
+        return data
+
+    @expose()
+    def get_stream(self, cluster_id, since=None):
+        '''
+        Stream of changes of test runs of cluster as Server-Sent
+        Events. Reconnecting client continues from Last-Event-ID.
+        '''
+        since = since or request.headers.get('Last-Event-ID')
+        try:
+            since = events.BUS.version if since is None else int(since)
+        except ValueError:
+            abort(400)
 
-        return [item.frontend for item in test_runs]
+        response.content_type = 'text/event-stream'
+        response.cache_control = 'no-cache'
+        response.app_iter = events.stream(
+            cluster_id, since, cfg.CONF.adapter.events_keepalive)
+        return response
 
     @expose('json')
     def post(self):
@@ -125,7 +294,9 @@ class TestrunsController(BaseRestController):
         if 'objects' in test_runs:
             test_runs = test_runs['objects']
 
-        # Discover tests for all clusters in request
+        # Discover tests for all clusters in request, test runs
+        # are started for current deployment of cluster, not the
+        # cached one
         clusters_ids = []
         nedded_testsets = set()
         for test_run in test_runs:
@@ -134,7 +305,8 @@ class TestrunsController(BaseRestController):
                 clusters_ids.append(cluster_id)
                 mixins.discovery_check(request.session,
                                        cluster_id,
-                                       request.token)
+                                       request.token,
+                                       refresh=True)
             nedded_testsets.add(test_run['testset'])
         # Validate testsets from request
         test_sets = set([testset.id for testset in request.
@@ -162,6 +334,9 @@ class TestrunsController(BaseRestController):
                 token=request.token
             )
 
+            if test_run:
+                storage_events.notify(request.session, test_run['id'])
+
             res.append(test_run)
 
         return res
@@ -189,4 +364,46 @@ class TestrunsController(BaseRestController):
                                                  ostf_os_access_creds,
                                                  tests=tests,
                                                  token=request.token))
+                else:
+                    continue
+
+                storage_events.notify(request.session, test_run.id)
         return data
+
+
+class AnalyticsController(BaseRestController):
+    '''
+    Rollups of results of tests across finished test runs,
+    of all clusters (/v1/analytics) or of given one
+    (/v1/analytics/<cluster_id>). Rollups are maintained when
+    test runs finish, so tests table is not read here.
+    '''
+
+    @expose('json')
+    def get_all(self, test_set_id=None):
+        return self._get_stats(models.TestStats.ALL_CLUSTERS, test_set_id)
+
+    @expose('json')
+    def get_one(self, cluster_id, test_set_id=None):
+        return self._get_stats(cluster_id, test_set_id)
+
+    def _get_stats(self, cluster_id, test_set_id):
+        stats = request.session.query(models.TestStats)\
+            .filter_by(cluster_id=cluster_id)
+        if test_set_id is not None:
+            stats = stats.filter_by(test_set_id=test_set_id)
+
+        return [item.frontend
+                for item in stats.order_by(models.TestStats.test_name)]
+
+
+class MetricsController(BaseRestController):
+
+    @expose('json')
+    def get_all(self):
+        return {
+            'db': {
+                'engines': engine.REGISTRY.stats(),
+                'backends': engine.get_backends_count(request.session)
+            }
+        }
@@ -0,0 +1,179 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import functools
+import logging
+import time
+
+import gevent
+from gevent import event
+from gevent import socket
+from oslo.config import cfg
+from pecan import jsonify
+
+from fuel_plugin.ostf_adapter.storage import engine
+from fuel_plugin.ostf_adapter.storage import events
+from fuel_plugin.ostf_adapter.storage import models
+
+
+LOG = logging.getLogger(__name__)
+
+
+class EventBus(object):
+    '''
+    In-process bus of test run changes served to streaming
+    clients. Last size events are kept in ring buffer, each of
+    them has version which is greater than versions of previous
+    ones. Versions start from current time in milliseconds, so
+    cursor kept by client across restart of server is most
+    likely recognized as outdated one.
+
+    Bus is read by greenlets of wsgi server, so there is no
+    locking: publish never switches to another greenlet.
+    '''
+
+    def __init__(self, size=1000):
+        self.events = collections.deque(maxlen=size)
+        self.version = int(time.time() * 1000)
+        self._changed = event.Event()
+
+    def publish(self, cluster_id, data):
+        self.version += 1
+        data = dict(data, version=self.version)
+        self.events.append((self.version, str(cluster_id), data))
+
+        # waiters of previous event are woken up, new
+        # waiters will wait for the next one
+        changed, self._changed = self._changed, event.Event()
+        changed.set()
+
+    def get_events(self, cluster_id, since):
+        '''
+        Events of cluster with version greater than since.
+        None is returned when since is not known to the bus
+        (events following it were dropped from buffer or it
+        was given by previous instance of server), client has
+        to refetch state of test runs then.
+        '''
+        if since > self.version:
+            return None
+        if since < self.version and \
+                (not self.events or self.events[0][0] > since + 1):
+            return None
+
+        cluster_id = str(cluster_id)
+        return [data for version, event_cluster_id, data in self.events
+                if version > since and event_cluster_id == cluster_id]
+
+    def wait(self, cluster_id, since, timeout):
+        '''
+        Blocks until there are events of cluster newer than since
+        or timeout expires. Returns result of get_events.
+        '''
+        deadline = time.time() + timeout
+        while True:
+            result = self.get_events(cluster_id, since)
+            if result is None or result:
+                return result
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return result
+            self._changed.wait(remaining)
+
+
+BUS = EventBus()
+
+
+def load_event(dbpath, payload, bus=None):
+    '''
+    Publishes current state of test run and its tests named in
+    payload of notification. Single pair of queries is made per
+    notification regardless of number of clients streaming it.
+    '''
+    bus = bus or BUS
+
+    with engine.contexted_session(dbpath) as session:
+        test_run = session.query(models.TestRun)\
+            .filter_by(id=payload['test_run_id'])\
+            .first()
+        if test_run is None:
+            return
+
+        tests = session.query(models.Test)\
+            .filter_by(test_run_id=test_run.id)
+        if payload['tests'] is not None:
+            if not payload['tests']:
+                tests = []
+            else:
+                tests = tests.filter(models.Test.name.in_(payload['tests']))
+
+        data = {
+            'test_run': test_run.to_frontend(include_tests=False),
+            'tests': [test.frontend for test in tests]
+        }
+        cluster_id = test_run.cluster_id
+
+    bus.publish(cluster_id, data)
+
+
+def _listen(dbpath):
+    handler = functools.partial(load_event, dbpath)
+    while True:
+        try:
+            events.listen(dbpath, handler, socket.wait_read)
+        except Exception:
+            LOG.exception('Listening for test runs notifications failed')
+            gevent.sleep(cfg.CONF.adapter.events_reconnect_interval)
+
+
+def start(dbpath):
+    '''
+    Feeds bus of current process: with notifications of
+    postgres listened for by separate greenlet, with ones
+    made in current process for other dialects.
+    '''
+    global BUS
+    BUS = EventBus(cfg.CONF.adapter.events_buffer_size)
+
+    if engine.get_engine(dbpath).dialect.name == 'postgresql':
+        return gevent.spawn(_listen, dbpath)
+
+    events.subscribe(functools.partial(load_event, dbpath))
+
+
+def format_sse(data):
+    return 'id: {0}\ndata: {1}\n\n'.format(data['version'],
+                                           jsonify.encode(data))
+
+
+def stream(cluster_id, since, keepalive):
+    '''
+    Generator of Server-Sent Events of cluster starting after
+    version since. Comment line is sent when there were no
+    events for keepalive seconds, so dead clients are detected
+    and proxies do not close connection.
+    '''
+    while True:
+        result = BUS.wait(cluster_id, since, keepalive)
+        if result is None:
+            since = BUS.version
+            yield 'event: reset\ndata: {{"version": {0}}}\n\n'.format(since)
+        elif result:
+            since = result[-1]['version']
+            for data in result:
+                yield format_sse(data)
+        else:
+            yield ': keepalive\n\n'
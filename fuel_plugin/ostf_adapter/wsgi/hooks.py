@@ -13,17 +13,19 @@
 #    under the License.
 
 import logging
-from sqlalchemy import create_engine, orm
+from sqlalchemy import orm
 
 from pecan import hooks
 
+from fuel_plugin.ostf_adapter.storage import engine as storage_engine
+
 
 LOG = logging.getLogger(__name__)
 
 
 class CustomTransactionalHook(hooks.TransactionHook):
     def __init__(self, dbpath):
-        engine = create_engine(dbpath)
+        engine = storage_engine.get_engine(dbpath)
         self.session = orm.scoped_session(orm.sessionmaker())
         self.session.configure(bind=engine)
 
@@ -24,6 +24,8 @@ class V1Controller(object):
     tests = controllers.TestsController()
     testsets = controllers.TestsetsController()
     testruns = controllers.TestrunsController()
+    metrics = controllers.MetricsController()
+    analytics = controllers.AnalyticsController()
 
 
 class RootController(object):
@@ -0,0 +1,136 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Counts db statements and commits issued by storage plugin per test run.
+
+Generates test module with given number of tests (some of them fail,
+raise errors or are skipped, and one class fails in setUpClass), runs it
+through the same nose program which is used by nose driver and reports
+how many UPDATE statements and commits were sent to db with results
+buffering switched off (one write per test event, as it used to be)
+and with default buffering settings.
+
+No database is needed, session is replaced by mock object.
+
+Usage:
+    python -m fuel_plugin.testing.benchmarks.commits_per_run [tests_count]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import mock
+from sqlalchemy.dialects.postgresql import psycopg2
+
+from fuel_plugin.ostf_adapter import config
+from fuel_plugin.ostf_adapter.nose_plugin import nose_storage_plugin
+from fuel_plugin.ostf_adapter.nose_plugin import nose_test_runner
+
+
+TEST_MODULE_HEADER = '''
+import unittest2
+
+
+class BrokenFixtureTest(unittest2.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        raise Exception('setUpClass failure')
+
+    def test_first(self):
+        pass
+
+    def test_second(self):
+        pass
+
+
+class GeneratedTest(unittest2.TestCase):
+'''
+
+TEST_TEMPLATE = '''
+    def test_{0:04d}(self):
+        """Generated test {0}
+        Duration: 1 s.
+        """
+        {1}
+'''
+
+TEST_BODIES = (
+    'self.assertTrue(True)',
+    'self.assertTrue(True)',
+    'self.assertTrue(True)',
+    'self.assertTrue(False, "Step 1 failed: generated failure")',
+    'raise ValueError("generated error")',
+    'self.skipTest("generated skip")',
+)
+
+
+def generate_test_module(directory, tests_count):
+    path = os.path.join(directory, 'test_generated.py')
+    with open(path, 'w') as f:
+        f.write(TEST_MODULE_HEADER)
+        for i in range(tests_count):
+            f.write(TEST_TEMPLATE.format(
+                i, TEST_BODIES[i % len(TEST_BODIES)]))
+    return path
+
+
+def make_session():
+    session = mock.MagicMock()
+    session.bind.dialect = psycopg2.dialect()
+    return session
+
+
+def run(test_path, batch_size, flush_interval):
+    config.cfg.CONF.set_override('results_batch_size',
+                                 batch_size, 'adapter')
+    config.cfg.CONF.set_override('results_flush_interval',
+                                 flush_interval, 'adapter')
+
+    session = make_session()
+    plugin = nose_storage_plugin.StoragePlugin(
+        session, 1, '1', {}, None, mock.Mock())
+
+    nose_test_runner.SilentTestProgram(
+        addplugins=[plugin],
+        exit=False,
+        argv=['ostf_tests', '--nocapture', test_path])
+    plugin.flush()
+
+    return session.execute.call_count, session.commit.call_count
+
+
+def main(tests_count=100):
+    config.init_config([])
+
+    directory = tempfile.mkdtemp()
+    try:
+        test_path = generate_test_module(directory, tests_count)
+
+        print('{0:<12}{1:>12}{2:>12}'.format('mode', 'statements',
+                                             'commits'))
+        for mode, batch_size, flush_interval in (
+                ('unbuffered', 1, 0),
+                ('buffered',
+                 config.cfg.CONF.adapter.results_batch_size,
+                 config.cfg.CONF.adapter.results_flush_interval)):
+            statements, commits = run(test_path, batch_size, flush_interval)
+            print('{0:<12}{1:>12}{2:>12}'.format(mode, statements, commits))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,127 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Micro-benchmark of deployment tags matching.
+
+Collects deployment tags of testsets (__profile__ dicts) and tests
+(docstrings) from sources of fuel_health without importing it and
+matches them against several cluster profiles with:
+
+    product  - enumeration of itertools.product of alternatives
+               (the way process_deployment_tags used to work);
+    compile  - process_deployment_tags, which compiles tags on each call;
+    matcher  - match_deployment_tags with tags compiled beforehand
+               (the way cached test repository is processed).
+
+Usage:
+    python -m fuel_plugin.testing.benchmarks.deployment_tags [iterations]
+"""
+
+import ast
+import itertools
+import os
+import re
+import sys
+import timeit
+
+import fuel_health
+from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
+
+
+CLUSTERS = [
+    set(['ha', 'ubuntu', 'neutron', 'kvm', '2014.2-6.0',
+         'additional_components', 'murano', 'sahara', 'ceilometer']),
+    set(['multinode', 'centos', 'nova_network', 'qemu',
+         'public_on_all_nodes', '2014.2-6.0']),
+    set(['ha', 'rhel', 'nova_network', 'kvm']),
+]
+
+
+def product_match(cluster_depl_tags, test_depl_tags):
+    test_depl_tags = [
+        [alt_tag.strip() for alt_tag in tag.split('|')]
+        for tag in test_depl_tags
+    ]
+
+    for comb in itertools.product(*test_depl_tags):
+        if set(comb).issubset(cluster_depl_tags):
+            return True
+
+    return False
+
+
+def _profile_tags(source):
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.Assign) and \
+                any(getattr(target, 'id', None) == '__profile__'
+                    for target in node.targets):
+            profile = ast.literal_eval(node.value)
+            return [tag.lower() for tag in profile.get('deployment_tags', [])]
+
+
+def collect_corpus(path):
+    corpus = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            if not filename.endswith('.py'):
+                continue
+            with open(os.path.join(dirpath, filename)) as f:
+                source = f.read()
+
+            profile_tags = _profile_tags(source)
+            if profile_tags is not None:
+                corpus.append(profile_tags)
+
+            for tags in re.findall(r'Deployment tags:.?(.+)', source):
+                corpus.append(
+                    [tag.strip().lower() for tag in tags.split(',')])
+    return corpus
+
+
+def main(iterations=1000):
+    corpus = collect_corpus(os.path.dirname(fuel_health.__file__))
+    compiled = [nose_utils.compile_deployment_tags(tags) for tags in corpus]
+
+    def run_product():
+        for cluster in CLUSTERS:
+            for tags in corpus:
+                product_match(cluster, tags)
+
+    def run_compile():
+        for cluster in CLUSTERS:
+            for tags in corpus:
+                nose_utils.process_deployment_tags(cluster, tags)
+
+    def run_matcher():
+        for cluster in CLUSTERS:
+            for tags in compiled:
+                nose_utils.match_deployment_tags(cluster, tags)
+
+    # all implementations have to agree with each other
+    for cluster in CLUSTERS:
+        for tags, compiled_tags in zip(corpus, compiled):
+            assert product_match(cluster, tags) == \
+                nose_utils.match_deployment_tags(cluster, compiled_tags)
+
+    print('{0} tag expressions, {1} clusters, {2} iterations'.format(
+        len(corpus), len(CLUSTERS), iterations))
+    for name, func in (('product', run_product),
+                       ('compile', run_compile),
+                       ('matcher', run_matcher)):
+        elapsed = timeit.timeit(func, number=iterations)
+        print('{0:<10}{1:>10.3f} s'.format(name, elapsed))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,87 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Startup time of tests discovery backends.
+
+Each backend is run in a fresh interpreter (modules imported by one
+run would make next runs faster otherwise), time of discovery and
+number of modules loaded into process are reported for:
+
+    nose - test modules (and client libraries) are imported;
+    ast  - sources of test modules are parsed only.
+
+Test sets and tests found by backends are compared as well.
+
+Usage:
+    python -m fuel_plugin.testing.benchmarks.discovery_startup [path]
+"""
+
+import json
+import subprocess
+import sys
+import time
+
+
+BACKENDS = ('nose', 'ast')
+
+MODULE = 'fuel_plugin.testing.benchmarks.discovery_startup'
+
+
+def run_backend(backend, path):
+    # adapter itself is imported by both backends
+    from fuel_plugin.ostf_adapter.nose_plugin import nose_discovery
+
+    modules_before = len(sys.modules)
+    started = time.time()
+
+    test_sets, tests = nose_discovery.make_models(
+        *nose_discovery.collect(path, backend))
+
+    print(json.dumps({
+        'elapsed': time.time() - started,
+        'modules': len(sys.modules) - modules_before,
+        'test_sets': sorted(test_set.id for test_set in test_sets),
+        'tests': sorted('{0}:{1}'.format(test.test_set_id, test.name)
+                        for test in tests)
+    }))
+
+
+def main(path='fuel_health'):
+    results = {}
+    print('{0:<8}{1:>10}{2:>10}{3:>10}{4:>10}'.format(
+        'backend', 'time, s', 'modules', 'sets', 'tests'))
+
+    for backend in BACKENDS:
+        output = subprocess.check_output(
+            [sys.executable, '-m', MODULE, '--backend', backend, path])
+        result = json.loads(output.strip().splitlines()[-1])
+        results[backend] = result
+
+        print('{0:<8}{1:>10.3f}{2:>10}{3:>10}{4:>10}'.format(
+            backend, result['elapsed'], result['modules'],
+            len(result['test_sets']), len(result['tests'])))
+
+    for key in ('test_sets', 'tests'):
+        difference = set(results['nose'][key]) ^ set(results['ast'][key])
+        if difference:
+            print('{0} found by one backend only:'.format(key))
+            for item in sorted(difference):
+                print('    {0}'.format(item))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--backend']:
+        run_backend(*sys.argv[2:4])
+    else:
+        main(*sys.argv[1:2])
@@ -0,0 +1,84 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Latency of test run dispatching.
+
+Measures time from dispatching of run till the moment its process
+has imported modules tests depend on (fuel_health.nmanager and
+OpenStack clients by default) and is ready to run nose:
+
+    process - new process is started for each run (nose_utils.run_proc);
+    pool    - run is sent to idle worker of WorkerPool.
+
+Usage:
+    python -m fuel_plugin.testing.benchmarks.run_dispatch [runs] [modules]
+"""
+
+import multiprocessing
+import sys
+import time
+
+from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
+from fuel_plugin.ostf_adapter.nose_plugin import worker_pool
+
+
+# created before workers are forked to be inherited by them
+QUEUE = None
+
+
+def _ready(modules):
+    for module_name in modules:
+        try:
+            __import__(module_name)
+        except ImportError:
+            pass
+    QUEUE.put(time.time())
+
+
+def main(runs=5, modules='fuel_health.nmanager'):
+    global QUEUE
+
+    modules = modules.split(',')
+    QUEUE = multiprocessing.Queue()
+
+    pool = worker_pool.WorkerPool(_ready, size=1, max_runs=runs + 1,
+                                  max_memory_growth=sys.maxint,
+                                  preload=modules)
+    pool.start()
+
+    results = {'process': [], 'pool': []}
+    for _ in range(runs):
+        started = time.time()
+        nose_utils.run_proc(_ready, modules)
+        results['process'].append(QUEUE.get() - started)
+
+        # let worker finish previous run
+        time.sleep(0.1)
+        pool._collect()
+
+        started = time.time()
+        pool.submit(modules)
+        results['pool'].append(QUEUE.get() - started)
+
+    pool.close()
+
+    print('{0} runs, modules: {1}'.format(runs, ', '.join(modules)))
+    for name in ('process', 'pool'):
+        timings = sorted(results[name])
+        print('{0:<10}min {1:>8.1f} ms   median {2:>8.1f} ms'.format(
+            name, timings[0] * 1000, timings[len(timings) // 2] * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]] + sys.argv[2:3])
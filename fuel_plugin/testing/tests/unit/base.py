@@ -107,6 +107,7 @@ class BaseWSGITest(unittest2.TestCase):
         self.request_patcher.stop()
 
         mixins.TEST_REPOSITORY = []
+        mixins.invalidate_cluster_depl_tags()
 
     @property
     def is_background_working(self):
@@ -0,0 +1,168 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+import unittest2
+
+from fuel_plugin.ostf_adapter.storage import analytics
+from fuel_plugin.ostf_adapter.storage import models
+from fuel_plugin.testing.tests.unit import base
+
+
+class TestPercentile(unittest2.TestCase):
+
+    def test_nearest_rank(self):
+        values = [5.0, 1.0, 4.0, 2.0, 3.0]
+
+        self.assertEqual(analytics.percentile(values, 0.5), 3.0)
+        self.assertEqual(analytics.percentile(values, 0.95), 5.0)
+        self.assertEqual(analytics.percentile(values, 0), 1.0)
+        self.assertIsNone(analytics.percentile([], 0.5))
+
+
+class TestApplyResult(unittest2.TestCase):
+
+    def setUp(self):
+        self.stats = models.TestStats(test_name='test', cluster_id=1)
+
+    def apply(self, *results):
+        for status, time_taken in results:
+            analytics.apply_result(self.stats, status, time_taken, window=3)
+
+    def test_counters_and_streaks(self):
+        self.apply(('failure', 1.0), ('error', 1.0), ('success', 1.0),
+                   ('failure', 1.0), ('skipped', None), ('stopped', None))
+
+        self.assertEqual(self.stats.runs, 4)
+        self.assertEqual(self.stats.passed, 1)
+        self.assertEqual(self.stats.failed, 3)
+        self.assertEqual(self.stats.failure_streak, 1)
+        self.assertEqual(self.stats.max_failure_streak, 2)
+        self.assertEqual(self.stats.last_status, 'failure')
+        self.assertEqual(self.stats.frontend['pass_rate'], 0.25)
+
+    def test_durations_window(self):
+        self.apply(('success', 10.0), ('success', 1.0), ('success', 2.0),
+                   ('success', 3.0), ('failure', None))
+
+        self.assertEqual(self.stats.durations, [1.0, 2.0, 3.0])
+        self.assertEqual(self.stats.p50, 2.0)
+        self.assertEqual(self.stats.p95, 3.0)
+
+
+class TestStatsOnDatabase(base.BaseWSGITest):
+
+    def setUp(self):
+        super(TestStatsOnDatabase, self).setUp()
+
+        self.fast_pass = self.ext_id + 'general_test.Dummy_test.test_fast_pass'
+        self.fast_fail = self.ext_id + 'general_test.Dummy_test.test_fast_fail'
+
+        for cluster_id in (1, 2):
+            self.session.merge(models.ClusterState(id=cluster_id,
+                                                   deployment_tags=[]))
+            self.session.merge(models.ClusterTestingPattern(
+                cluster_id=cluster_id, test_set_id='general_test',
+                tests=[self.fast_pass, self.fast_fail]))
+        self.session.flush()
+
+    def start(self, cluster_id):
+        test_run = models.TestRun.add_test_run(
+            self.session, 'general_test', cluster_id,
+            tests=[self.fast_pass, self.fast_fail])
+        self.session.flush()
+        return test_run.id
+
+    def finish(self, test_run_id, results):
+        for name, status in results:
+            models.Test.add_result(self.session, test_run_id, name,
+                                   {'status': status, 'time_taken': 1.0})
+        models.TestRun.update_test_run(self.session, test_run_id,
+                                       {'status': 'finished'})
+
+    def stats(self, cluster_id):
+        self.session.expire_all()
+        return dict(
+            (stats.test_name, (stats.runs, stats.passed, stats.failed))
+            for stats in self.session.query(models.TestStats)
+            .filter_by(cluster_id=cluster_id))
+
+    def test_results_are_folded_into_rollups(self):
+        self.finish(self.start(1), [(self.fast_pass, 'success'),
+                                    (self.fast_fail, 'failure')])
+        self.finish(self.start(2), [(self.fast_pass, 'success'),
+                                    (self.fast_fail, 'success')])
+
+        self.assertEqual(self.stats(1), {self.fast_pass: (1, 1, 0),
+                                         self.fast_fail: (1, 0, 1)})
+        self.assertEqual(self.stats(2), {self.fast_pass: (1, 1, 0),
+                                         self.fast_fail: (1, 1, 0)})
+        self.assertEqual(self.stats(models.TestStats.ALL_CLUSTERS),
+                         {self.fast_pass: (2, 2, 0),
+                          self.fast_fail: (2, 1, 1)})
+
+    def test_restarted_test_run_is_not_counted_twice(self):
+        test_run_id = self.start(1)
+        self.finish(test_run_id, [(self.fast_pass, 'success'),
+                                  (self.fast_fail, 'failure')])
+
+        # only the failed test is run again
+        self.finish(test_run_id, [(self.fast_fail, 'success')])
+
+        self.assertEqual(self.stats(1), {self.fast_pass: (1, 1, 0),
+                                         self.fast_fail: (2, 1, 1)})
+
+        self.finish(test_run_id, [])
+        self.assertEqual(self.stats(1), {self.fast_pass: (1, 1, 0),
+                                         self.fast_fail: (2, 1, 1)})
+
+    def test_rollup_added_concurrently(self):
+        table = models.TestStats.__table__
+        other = self.engine.connect()
+        self.addCleanup(other.close)
+        self.addCleanup(self.engine.execute, table.delete().where(
+            table.c.test_name == self.fast_pass))
+
+        # another test run inserts rollup for all clusters and
+        # commits only when this one already tries to insert it
+        other_trans = other.begin()
+        other.execute(table.insert(), test_name=self.fast_pass,
+                      cluster_id=models.TestStats.ALL_CLUSTERS,
+                      test_set_id='general_test', runs=1, passed=1,
+                      failed=0, failure_streak=0, max_failure_streak=0)
+
+        test_run_id = self.start(1)
+        errors = []
+
+        def finish():
+            try:
+                self.finish(test_run_id, [(self.fast_pass, 'success')])
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=finish)
+        thread.start()
+        time.sleep(0.5)
+        other_trans.commit()
+        thread.join(10)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.stats(1), {self.fast_pass: (1, 1, 0)})
+        self.assertEqual(
+            self.stats(models.TestStats.ALL_CLUSTERS)[self.fast_pass],
+            (2, 2, 0))
+        test_run = self.session.query(models.TestRun).get(test_run_id)
+        self.assertIsNotNone(test_run.stats_version)
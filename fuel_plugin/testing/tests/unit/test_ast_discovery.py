@@ -0,0 +1,132 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+
+import unittest2
+
+from fuel_plugin.ostf_adapter.nose_plugin import ast_discovery
+from fuel_plugin.ostf_adapter.nose_plugin import nose_discovery
+
+TEST_PATH = 'fuel_plugin/testing/fixture/dummy_tests'
+
+
+def _rows(entities):
+    return sorted(
+        sorted((column.key, getattr(entity, column.key))
+               for column in entity.__table__.columns)
+        for entity in entities
+    )
+
+
+class TestAstDiscovery(unittest2.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.package = os.path.join(self.tmp_dir, 'static_tests')
+        os.mkdir(self.package)
+        self.write('__init__.py', '')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, filename, source):
+        with open(os.path.join(self.package, filename), 'w') as f:
+            f.write(source)
+
+    def test_same_models_as_nose(self):
+        nose_test_sets, nose_tests = nose_discovery.make_models(
+            *nose_discovery.collect(TEST_PATH, 'nose'))
+        ast_test_sets, ast_tests = nose_discovery.make_models(
+            *nose_discovery.collect(TEST_PATH, 'ast'))
+
+        self.assertEqual(_rows(nose_test_sets), _rows(ast_test_sets))
+        self.assertEqual(_rows(nose_tests), _rows(ast_tests))
+
+    def test_plain_classes_and_functions_as_nose(self):
+        self.write('test_plain.py', '\n'.join([
+            '__profile__ = {"id": "static_tests", "deployment_tags": []}',
+            'class Base(object):',
+            '    def test_inherited(self):',
+            '        """Inherited test"""',
+            'class TestPlain(Base):',
+            '    def test_own(self):',
+            '        """Own test"""',
+            '    def helper(self):',
+            '        pass',
+            'class Helper(object):',
+            '    def test_nothing(self):',
+            '        pass',
+            'class TestDisabled(object):',
+            '    __test__ = False',
+            '    def test_nothing(self):',
+            '        pass',
+            'def test_function():',
+            '    """Function test"""',
+            'def helper():',
+            '    pass',
+        ]))
+
+        nose_test_sets, nose_tests = nose_discovery.make_models(
+            *nose_discovery.collect(self.package, 'nose'))
+        ast_test_sets, ast_tests = nose_discovery.make_models(
+            *nose_discovery.collect(self.package, 'ast'))
+
+        self.assertEqual(
+            sorted(test.name for test in ast_tests),
+            ['static_tests.test_plain.TestPlain.test_inherited',
+             'static_tests.test_plain.TestPlain.test_own',
+             'static_tests.test_plain.test_function'])
+        self.assertEqual(_rows(nose_test_sets), _rows(ast_test_sets))
+        self.assertEqual(_rows(nose_tests), _rows(ast_tests))
+
+    def test_inherited_methods_through_imports(self):
+        self.write('base.py', '\n'.join([
+            'import unittest2 as ut',
+            'class Base(ut.TestCase):',
+            '    def test_inherited(self):',
+            '        """Inherited test"""',
+        ]))
+        self.write('test_module.py', '\n'.join([
+            'from . import base',
+            '__profile__ = {"id": "module", "deployment_tags": ["HA"]}',
+            'class Tests(base.Base):',
+            '    def test_own(self):',
+            '        """Own test',
+            '        Deployment tags: Ubuntu',
+            '        """',
+            '    def helper(self):',
+            '        pass',
+            'class Skipped(base.Base):',
+            '    __test__ = False',
+            'class NotTestCase(object):',
+            '    def test_nothing(self):',
+            '        pass',
+        ]))
+
+        profiles, tests = ast_discovery.collect(self.package)
+        module_path = os.path.join(self.package, 'test_module.py')
+
+        self.assertEqual(profiles[module_path]['deployment_tags'], ['ha'])
+        self.assertEqual(
+            sorted(test['name'] for test in tests[module_path]),
+            ['static_tests.test_module.Tests.test_inherited',
+             'static_tests.test_module.Tests.test_own']
+        )
+        own_test = [test for test in tests[module_path]
+                    if test['name'].endswith('test_own')][0]
+        self.assertEqual(own_test['title'], 'Own test')
+        self.assertEqual(own_test['deployment_tags'], ['ubuntu'])
@@ -0,0 +1,143 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import unittest2
+
+from fuel_health.common import cleaner
+from fuel_health.common import waiter
+
+
+class NotFound(Exception):
+    pass
+
+
+class Resource(object):
+
+    def __init__(self, name):
+        self.id = self.name = name
+
+
+class FakeKind(object):
+    '''Resources of kind disappearing delay seconds after deletion.'''
+
+    def __init__(self, log, names, delay=0, broken=()):
+        self.log = log
+        self.resources = dict((name, Resource(name)) for name in names)
+        self.deleted_at = {}
+        self.delay = delay
+        self.broken = broken
+        self.fetches = 0
+
+    def list_items(self):
+        return self.resources.values()
+
+    def delete_item(self, item):
+        if item.name in self.broken:
+            raise IOError('{0} is in use'.format(item.name))
+        self.log.append(('delete', item.name, time.time()))
+        self.deleted_at[item.id] = time.time()
+
+    def fetch(self, ids):
+        self.fetches += 1
+        return dict((resource_id, self.resources[resource_id])
+                    for resource_id in ids
+                    if time.time() < self.deleted_at[resource_id] +
+                    self.delay)
+
+    def step(self, name, depends=(), wait=True):
+        step = cleaner.Step(name, self.list_items, self.delete_item, depends)
+        if wait:
+            step.fetch = self.fetch
+            step.check = lambda resource: resource is None
+        return step
+
+
+def fast_waiter():
+    return waiter.Waiter(first_interval=0.01, max_interval=0.01)
+
+
+class TestCleaner(unittest2.TestCase):
+
+    def setUp(self):
+        self.log = []
+
+    def test_dependencies_are_deleted_first(self):
+        servers = FakeKind(self.log, ['s1', 's2'], delay=0.05)
+        groups = FakeKind(self.log, ['g1'])
+
+        summary = cleaner.Cleaner([
+            groups.step('security_groups', depends=['servers', 'stacks']),
+            servers.step('servers'),
+        ], waiter_factory=fast_waiter).run()
+
+        deleted = dict((name, moment) for _, name, moment in self.log)
+        self.assertGreaterEqual(deleted['g1'],
+                                max(deleted['s1'], deleted['s2']) + 0.05)
+        self.assertEqual(sorted(summary['servers']['deleted']), ['s1', 's2'])
+        self.assertEqual(summary['security_groups']['deleted'], ['g1'])
+        self.assertGreaterEqual(summary['servers']['duration'], 0.05)
+
+    def test_independent_kinds_are_deleted_concurrently(self):
+        kinds = [FakeKind(self.log, ['r{0}'.format(n)], delay=0.2)
+                 for n in range(5)]
+
+        started = time.time()
+        cleaner.Cleaner([kind.step('kind{0}'.format(n))
+                         for n, kind in enumerate(kinds)],
+                        waiter_factory=fast_waiter).run()
+
+        self.assertLess(time.time() - started, 0.2 * 3)
+
+    def test_resources_of_kind_are_waited_for_together(self):
+        servers = FakeKind(self.log, ['s{0}'.format(n) for n in range(10)],
+                           delay=0.05)
+
+        cleaner.Cleaner([servers.step('servers')],
+                        waiter_factory=fast_waiter).run()
+
+        self.assertLess(servers.fetches, 20)
+
+    def test_failures_are_summarized(self):
+        servers = FakeKind(self.log, ['s1', 's2'], broken=['s1'])
+        stuck = FakeKind(self.log, ['v1'], delay=60)
+
+        def broken_list():
+            raise IOError('Service unavailable')
+
+        summary = cleaner.Cleaner([
+            servers.step('servers'),
+            stuck.step('volumes'),
+            cleaner.Step('alarms', broken_list, None),
+        ], timeout=0.05, waiter_factory=fast_waiter).run()
+
+        self.assertEqual(summary['servers']['deleted'], ['s2'])
+        self.assertEqual(summary['servers']['failed'],
+                         {'s1': 's1 is in use'})
+        self.assertEqual(summary['volumes']['deleted'], [])
+        self.assertEqual(summary['volumes']['failed'],
+                         {'v1': 'Request timed out'})
+        self.assertEqual(summary['alarms']['failed'],
+                         {'*': 'Service unavailable'})
+
+    def test_missing_resources_are_deleted(self):
+        def delete_item(item):
+            raise NotFound()
+
+        summary = cleaner.Cleaner([
+            cleaner.Step('keypairs', lambda: [Resource('k1')], delete_item)
+        ]).run()
+
+        self.assertEqual(summary['keypairs']['deleted'], ['k1'])
@@ -0,0 +1,90 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+import unittest2
+
+from fuel_health import cleanup
+
+
+class Volume(object):
+    '''Cinder v1 volume, it has display_name instead of name.'''
+
+    def __init__(self, volume_id, display_name):
+        self.id = volume_id
+        self.display_name = display_name
+
+
+class Server(object):
+
+    def __init__(self, server_id, name):
+        self.id = server_id
+        self.name = name
+
+
+class TestManagerStep(unittest2.TestCase):
+
+    def test_items_are_matched_by_name(self):
+        manager = mock.Mock()
+        manager.list.return_value = [Server(1, 'ost1_test-server'),
+                                     Server(2, 'production'),
+                                     Server(3, None)]
+
+        step = cleanup._manager_step('servers', manager, delete_type='id')
+
+        self.assertEqual([item.id for item in step.list_items()], [1])
+
+        step.delete_item(step.list_items()[0])
+        manager.delete.assert_called_once_with(1)
+
+    def test_items_with_display_name_only(self):
+        manager = mock.Mock()
+        manager.list.return_value = [
+            Volume(1, 'ost1_test-bootable-volume'),
+            Volume(2, 'production'),
+        ]
+
+        step = cleanup._manager_step('volumes', manager)
+
+        self.assertEqual([item.id for item in step.list_items()], [1])
+
+
+class TestSteps(unittest2.TestCase):
+
+    def setUp(self):
+        self.manager = mock.Mock()
+        self.volume = Volume(1, 'ost1_test-bootable-volume')
+        self.manager.volume_client.volumes.list.return_value = [
+            self.volume, Volume(2, 'production')]
+
+    def steps(self, cluster_deployment_info=()):
+        return dict((step.name, step) for step in
+                    cleanup._steps(self.manager, cluster_deployment_info))
+
+    def test_test_volumes_are_deleted(self):
+        steps = self.steps()
+
+        self.assertEqual(steps['volumes'].list_items(), [self.volume])
+        self.assertIn('volumes', steps['volume_types'].depends)
+        self.assertIn('volumes', steps['tenants'].depends)
+
+    def test_steps_of_failed_client_are_skipped(self):
+        type(self.manager).compute_client = mock.PropertyMock(
+            side_effect=IOError('nova is down'))
+
+        steps = self.steps(['heat'])
+
+        self.assertNotIn('servers', steps)
+        self.assertIn('volumes', steps)
+        self.assertIn('stacks', steps)
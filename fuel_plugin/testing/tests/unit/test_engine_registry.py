@@ -0,0 +1,56 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+
+import mock
+import unittest2
+
+from fuel_plugin.ostf_adapter import config
+from fuel_plugin.ostf_adapter.storage import engine
+
+
+class TestEngineRegistry(unittest2.TestCase):
+
+    def setUp(self):
+        config.init_config([])
+        self.dbpath = 'sqlite://'
+        self.registry = engine.EngineRegistry()
+
+    def tearDown(self):
+        self.registry.dispose()
+
+    def test_engine_is_reused(self):
+        first = self.registry.get_engine(self.dbpath)
+        second = self.registry.get_engine(self.dbpath)
+
+        self.assertIs(first, second)
+
+    def test_engines_are_detached_after_fork(self):
+        parent_engine = self.registry.get_engine(self.dbpath)
+
+        with mock.patch.object(engine.os, 'getpid',
+                               return_value=os.getpid() + 1):
+            child_engine = self.registry.get_engine(self.dbpath)
+
+            self.assertIsNot(parent_engine, child_engine)
+            self.assertIn(parent_engine, self.registry._inherited)
+
+    def test_connections_are_counted(self):
+        connection = self.registry.get_engine(self.dbpath).connect()
+        connection.close()
+
+        stats = self.registry.stats()
+
+        self.assertEqual(stats.values()[0]['connections_opened'], 1)
@@ -0,0 +1,116 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+import gevent
+from sqlalchemy import create_engine
+from sqlalchemy import orm
+import unittest2
+
+from fuel_plugin.ostf_adapter.storage import events as storage_events
+from fuel_plugin.ostf_adapter.wsgi import events
+
+
+class TestEventBus(unittest2.TestCase):
+
+    def setUp(self):
+        self.bus = events.EventBus(size=3)
+        self.start = self.bus.version
+
+    def test_events_of_cluster_since_version(self):
+        self.bus.publish(1, {'n': 1})
+        self.bus.publish(2, {'n': 2})
+        self.bus.publish(1, {'n': 3})
+
+        self.assertEqual(
+            [data['n'] for data in self.bus.get_events(1, self.start)],
+            [1, 3])
+        self.assertEqual(
+            [data['n'] for data in self.bus.get_events(1, self.start + 1)],
+            [3])
+        self.assertEqual(self.bus.get_events(1, self.bus.version), [])
+
+    def test_unknown_version_resets_client(self):
+        for n in range(4):
+            self.bus.publish(1, {'n': n})
+
+        # the first event is dropped from buffer
+        self.assertIsNone(self.bus.get_events(1, self.start))
+        self.assertEqual(len(self.bus.get_events(1, self.start + 1)), 3)
+        # version of previous instance of server
+        self.assertIsNone(self.bus.get_events(1, self.bus.version + 10))
+
+    def test_wait_is_woken_up_by_event_of_cluster(self):
+        gevent.spawn_later(0.01, self.bus.publish, 2, {'n': 1})
+        gevent.spawn_later(0.02, self.bus.publish, 1, {'n': 2})
+
+        result = self.bus.wait(1, self.start, timeout=5)
+
+        self.assertEqual([data['n'] for data in result], [2])
+
+    def test_wait_timeout(self):
+        self.assertEqual(self.bus.wait(1, self.start, timeout=0.01), [])
+
+    def test_stream(self):
+        events.BUS, bus = self.bus, events.BUS
+        self.addCleanup(setattr, events, 'BUS', bus)
+
+        self.bus.publish(1, {'n': 1})
+        stream = events.stream(1, self.start, keepalive=0.01)
+
+        event_id, data = next(stream).strip().split('\n')
+        self.assertEqual(event_id, 'id: {0}'.format(self.start + 1))
+        self.assertEqual(json.loads(data[len('data: '):]),
+                         {'n': 1, 'version': self.start + 1})
+        self.assertEqual(next(stream), ': keepalive\n\n')
+
+
+class TestNotifications(unittest2.TestCase):
+
+    def setUp(self):
+        self.received = []
+        storage_events.subscribe(self.received.append)
+        self.addCleanup(storage_events._HANDLERS.remove,
+                        self.received.append)
+
+        self.session = orm.Session(bind=create_engine('sqlite://'))
+        self.addCleanup(self.session.close)
+
+    def test_delivered_on_commit(self):
+        storage_events.notify(self.session, 1, ['test_a'])
+        self.assertEqual(self.received, [])
+
+        self.session.commit()
+        self.assertEqual(self.received,
+                         [{'test_run_id': 1, 'tests': ['test_a']}])
+
+    def test_discarded_on_rollback(self):
+        storage_events.notify(self.session, 1)
+        self.session.rollback()
+        self.session.commit()
+
+        self.assertEqual(self.received, [])
+
+    def test_payloads_are_split(self):
+        names = ['test_{0:0>100}'.format(n) for n in range(200)]
+
+        payloads = storage_events.make_payloads(1, names)
+
+        self.assertGreater(len(payloads), 1)
+        self.assertTrue(all(len(payload) <= storage_events.MAX_PAYLOAD_SIZE
+                            for payload in payloads))
+        self.assertEqual(
+            sum([json.loads(payload)['tests'] for payload in payloads], []),
+            names)
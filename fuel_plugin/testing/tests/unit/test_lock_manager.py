@@ -0,0 +1,72 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import shutil
+import tempfile
+
+import mock
+import unittest2
+
+from fuel_plugin.ostf_adapter.nose_plugin import lock_manager
+
+
+class TestLockManager(unittest2.TestCase):
+
+    def setUp(self):
+        self.lock_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.lock_dir)
+
+    def test_lock_names(self):
+        self.assertEqual(
+            lock_manager.get_lock_names(['smoke', 'ha', 'smoke'], 1),
+            ['ha1', 'smoke1']
+        )
+        self.assertEqual(lock_manager.get_lock_names(None, 1), [])
+
+    def test_locks_are_taken_in_canonical_order(self):
+        backend = mock.Mock()
+        backend.try_acquire.return_value = True
+
+        lock_manager.LockManager(backend).acquire(['b', 'c', 'a'])
+
+        self.assertEqual(backend.try_acquire.call_args_list,
+                         [mock.call('a'), mock.call('b'), mock.call('c')])
+
+    def test_busy_lock_is_polled(self):
+        backend = mock.Mock()
+        backend.try_acquire.side_effect = [False, False, True]
+
+        with mock.patch.object(lock_manager.time, 'sleep') as sleep:
+            lock_manager.LockManager(backend, 0.5).acquire(['a'])
+
+        self.assertEqual(sleep.call_args_list, [mock.call(0.5)] * 2)
+
+    def test_file_locks(self):
+        first = lock_manager.FileLocks(self.lock_dir)
+        second = lock_manager.FileLocks(self.lock_dir)
+
+        self.assertTrue(first.try_acquire('smoke1'))
+        self.assertFalse(second.try_acquire('smoke1'))
+
+        first.release_all()
+        self.assertTrue(second.try_acquire('smoke1'))
+        second.release_all()
+
+    def test_advisory_lock_key_is_stable(self):
+        key = lock_manager.AdvisoryLocks.key('smoke1')
+
+        self.assertEqual(key, lock_manager.AdvisoryLocks.key('smoke1'))
+        self.assertTrue(-2 ** 63 <= key < 2 ** 63)
@@ -0,0 +1,83 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from sqlalchemy.dialects.postgresql import psycopg2
+import unittest2
+
+from fuel_plugin.ostf_adapter.storage import models
+
+
+class TestCopyTests(unittest2.TestCase):
+
+    def compile(self, predefined_tests):
+        session = mock.MagicMock()
+        models.Test.copy_tests(session, 5, 'test_set',
+                               ['test_one', 'test_two'], predefined_tests)
+
+        self.assertEqual(session.execute.call_count, 1)
+        statement = session.execute.call_args[0][0]
+        return str(statement.compile(dialect=psycopg2.dialect()))
+
+    def test_insert_from_select(self):
+        statement = self.compile([])
+
+        self.assertTrue(statement.startswith('INSERT INTO tests ('))
+        self.assertIn('test_run_id, status) SELECT tests.name', statement)
+        self.assertIn('tests.test_run_id IS NULL', statement)
+        self.assertNotIn('CASE', statement)
+
+    def test_status_from_predefined_tests(self):
+        statement = self.compile(['test_one'])
+
+        self.assertIn('CAST(CASE WHEN (tests.name IN', statement)
+        self.assertIn('AS test_states)', statement)
+
+    def test_copies_get_new_versions(self):
+        statement = self.compile([])
+
+        self.assertNotIn('version', statement)
+
+
+class TestVersions(unittest2.TestCase):
+
+    def test_version_is_bumped_on_update(self):
+        statement = models.Test.__table__.update().values(status='success')
+
+        self.assertIn('version=nextval(',
+                      str(statement.compile(dialect=psycopg2.dialect())))
+
+    def test_add_results_bump_versions(self):
+        session = mock.MagicMock()
+        session.bind.dialect = psycopg2.dialect()
+
+        with mock.patch.object(models.TestRun, 'bump_version') as bump:
+            models.Test.add_results(session, 5,
+                                    [('test_one', {'status': 'success'})])
+
+        statement = str(session.execute.call_args[0][0])
+        self.assertIn("version = nextval('ostf_version_seq')", statement)
+        bump.assert_called_once_with(session, 5)
+
+    def test_new_traceback_resets_stored_one(self):
+        session = mock.MagicMock()
+        session.bind.dialect = psycopg2.dialect()
+
+        with mock.patch.object(models.TestRun, 'bump_version'):
+            models.Test.add_results(
+                session, 5,
+                [('test_one', {'status': 'failure', 'traceback': 'tb'})])
+
+        statement = str(session.execute.call_args[0][0])
+        self.assertIn('traceback_id = NULL', statement)
@@ -0,0 +1,95 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+import unittest2
+
+from fuel_health.common import sessions
+import fuel_health.config
+from fuel_health import nmanager
+
+
+class TestOfficialClientManager(unittest2.TestCase):
+
+    def setUp(self):
+        config = mock.MagicMock()
+        config.identity.uri = 'http://keystone:5000/v2.0/'
+        config.identity.admin_username = 'admin'
+        config.identity.admin_password = 'secret'
+        config.identity.admin_tenant_name = 'admin'
+        config.compute.catalog_type = 'compute'
+        config.volume.catalog_type = 'volume'
+        config.heat.endpoint = 'http://heat:8004/v1'
+        config.sahara.api_url = 'http://sahara:8386/v1.1'
+
+        self.auth_ref = mock.Mock(auth_token='token', tenant_id='tenant')
+        self.auth_ref.service_catalog.url_for.side_effect = \
+            lambda service_type, endpoint_type: \
+            'http://{0}/public'.format(service_type)
+
+        patchers = [
+            mock.patch.object(fuel_health.config, 'FuelConfig',
+                              return_value=config),
+            mock.patch.object(nmanager, 'SESSIONS', sessions.SessionCache()),
+            mock.patch.object(nmanager.OfficialClientManager,
+                              '_authenticate',
+                              return_value=(self.auth_ref, None)),
+            mock.patch.object(nmanager.novaclient.client, 'Client'),
+            mock.patch.object(nmanager.cinderclient.client, 'Client'),
+            mock.patch.object(nmanager.keystoneclient.v2_0.client, 'Client'),
+            mock.patch.object(nmanager.keystoneclient.v3.client, 'Client'),
+        ]
+        for name in ('heatclient', 'muranoclient', 'saharaclient',
+                     'ceilometerclient', 'neutronclient'):
+            patchers.append(mock.patch.object(nmanager, name, create=True))
+
+        mocks = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+        self.authenticate = mocks[2]
+        self.nova, self.cinder, self.keystone, self.keystone_v3 = mocks[3:7]
+        self.keystone.return_value.tenant_id = 'tenant'
+        self.sahara = nmanager.saharaclient.client.Client
+
+    def test_single_authentication_for_all_clients(self):
+        for _ in range(2):
+            manager = nmanager.OfficialClientManager()
+            for name in manager.client_attr_names:
+                getattr(manager, name)
+
+        self.assertEqual(self.authenticate.call_count, 1)
+
+    def test_clients_reuse_token_of_session(self):
+        manager = nmanager.OfficialClientManager()
+
+        manager.compute_client
+        kwargs = self.nova.call_args[1]
+        self.assertEqual(kwargs['auth_token'], 'token')
+        self.assertEqual(kwargs['bypass_url'], 'http://compute/public')
+
+        volume_client = manager.volume_client
+        self.assertEqual(volume_client.client.auth_token, 'token')
+        self.assertEqual(volume_client.client.management_url,
+                         'http://volume/public')
+
+        manager.identity_v3_client
+        self.assertEqual(self.keystone_v3.call_args[1]['token'], 'token')
+        self.assertNotIn('password', self.keystone_v3.call_args[1])
+
+        manager.sahara_client
+        kwargs = self.sahara.call_args[1]
+        self.assertEqual(kwargs['input_auth_token'], 'token')
+        self.assertEqual(kwargs['sahara_url'],
+                         'http://sahara:8386/v1.1/tenant')
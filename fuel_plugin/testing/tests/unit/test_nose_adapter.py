@@ -0,0 +1,146 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+import time
+
+import mock
+import unittest2
+
+from fuel_plugin.ostf_adapter import config
+from fuel_plugin.ostf_adapter.nose_plugin import nose_adapter
+
+
+class TestParallelRun(unittest2.TestCase):
+
+    def setUp(self):
+        config.init_config([])
+        self.tmp_dir = tempfile.mkdtemp()
+        self.driver = nose_adapter.NoseDriver()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _run_group(self, dbpath, test_run_id, cluster_id,
+                   ostf_os_access_creds, argv_add, token, test_set_id):
+        time.sleep(0.5)
+        with open(os.path.join(self.tmp_dir, argv_add[0]), 'w') as f:
+            f.write(str(os.getpid()))
+
+    def test_groups_run_concurrently(self):
+        groups = [['first'], ['second'], ['third']]
+        self.driver._run_group = self._run_group
+
+        started = time.time()
+        self.driver._run_parallel('dbpath', 1, 1, {}, None, 'sanity', groups)
+        elapsed = time.time() - started
+
+        self.assertLess(elapsed, 1.4)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)),
+                         ['first', 'second', 'third'])
+
+    def test_parallel_run_in_daemonic_process(self):
+        def run_group(dbpath, test_run_id, cluster_id, ostf_os_access_creds,
+                      argv_add, token, test_set_id):
+            test_class = argv_add[0].split(':')[1].split('.')[0]
+            self._run_group(dbpath, test_run_id, cluster_id,
+                            ostf_os_access_creds, [test_class], token,
+                            test_set_id)
+
+        self.driver._run_group = run_group
+        self.driver._is_parallel = lambda test_set: True
+
+        session = mock.MagicMock()
+        testrun = session.query.return_value.filter_by.return_value\
+            .one.return_value
+        testrun.test_set.exclusive_testsets = []
+        testrun.test_set.cleanup_path = None
+
+        patchers = [
+            mock.patch.object(nose_adapter.engine, 'contexted_session'),
+            mock.patch.object(nose_adapter, 'ResultsLogger'),
+            mock.patch.object(nose_adapter.nose_storage_plugin,
+                              'StoragePlugin'),
+            mock.patch.object(nose_adapter.models.TestRun,
+                              'update_test_run'),
+            mock.patch.object(nose_adapter.events, 'notify'),
+        ]
+        mocks = [patcher.start() for patcher in patchers]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+        mocks[0].return_value.__enter__.return_value = session
+
+        # test run is run in daemonic process, as it is by the driver
+        proc = nose_adapter.nose_utils.run_proc(
+            self.driver._run_tests, 'dbpath', 1, 1, {},
+            ['tests:First.test_one', 'tests:First.test_two',
+             'tests:Second.test_one'], None, 'sanity')
+        proc.join(10)
+
+        self.assertEqual(proc.exitcode, 0)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)),
+                         ['First', 'Second'])
+
+    def test_is_parallel(self):
+        test_set = mock.Mock(parallel=None)
+
+        config.cfg.CONF.set_override('parallel_test_sets', True, 'adapter')
+        self.addCleanup(config.cfg.CONF.clear_override,
+                        'parallel_test_sets', 'adapter')
+
+        self.assertTrue(self.driver._is_parallel(test_set))
+
+        test_set.parallel = False
+        self.assertFalse(self.driver._is_parallel(test_set))
+
+
+RESETS = []
+
+
+def _reset():
+    RESETS.append(os.getpid())
+
+
+class TestResetTestsState(unittest2.TestCase):
+
+    def setUp(self):
+        config.init_config([])
+        del RESETS[:]
+
+    def test_functions_of_imported_modules_are_called(self):
+        config.cfg.CONF.set_override(
+            'worker_reset', [__name__ + '._reset', 'not_imported.reset'],
+            'adapter')
+        self.addCleanup(config.cfg.CONF.clear_override,
+                        'worker_reset', 'adapter')
+
+        nose_adapter.reset_tests_state()
+
+        self.assertEqual(RESETS, [os.getpid()])
+
+    def test_process_singletons_are_reset(self):
+        from fuel_health import config as health_config
+
+        @health_config.process_singleton
+        class Config(object):
+            pass
+
+        first = Config()
+        self.assertIs(Config(), first)
+
+        nose_adapter.reset_tests_state()
+
+        self.assertIsNot(Config(), first)
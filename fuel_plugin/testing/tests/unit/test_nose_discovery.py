@@ -12,8 +12,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from mock import Mock
+import os
+import shutil
+import tempfile
+
+from mock import MagicMock, Mock
 import unittest2
+from fuel_plugin.ostf_adapter.nose_plugin import discovery_manifest
 from fuel_plugin.ostf_adapter.nose_plugin import nose_discovery
 from fuel_plugin.ostf_adapter.storage import models
 
@@ -130,3 +135,128 @@ class TestNoseDiscovery(unittest2.TestCase):
             needed_test.deployment_tags,
             expected['test']['deployment_tags']
         )
+
+
+class TestIncrementalDiscovery(unittest2.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manifest_path = os.path.join(self.tmp_dir, 'manifest.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def discover(self):
+        manifest = discovery_manifest.DiscoveryManifest(self.manifest_path)
+        manifest.load()
+
+        plugin = nose_discovery.DiscoveryPlugin(manifest=manifest)
+        nose_discovery._run_discovery(TEST_PATH, plugin)
+
+        plugin.update_manifest()
+        manifest.save()
+
+        return plugin
+
+    def test_fresh_modules_are_not_imported(self):
+        first = self.discover()
+        second = self.discover()
+
+        imported_modules = [path for path in second.modules.values()
+                            if path.endswith('.py')]
+
+        self.assertEqual(imported_modules, [])
+        self.assertEqual(
+            second.skipped,
+            set(path for path in first.modules.values()
+                if path.endswith('.py'))
+        )
+        self.assertEqual(first.results(), second.results())
+
+    def test_base_classes_are_dependencies(self):
+        self.discover()
+
+        manifest = discovery_manifest.DiscoveryManifest(self.manifest_path)
+        manifest.load()
+        entry = manifest.entries[os.path.abspath(
+            os.path.join(TEST_PATH, 'general_test.py'))]
+
+        self.assertIn(nose_discovery._source_file(unittest2.case),
+                      entry['dependencies'])
+
+    def test_sync_db_with_empty_db(self):
+        test_sets, tests = nose_discovery.make_models(
+            *self.discover().results())
+        session = MagicMock()
+
+        changed = nose_discovery.sync_db(session, test_sets, tests)
+
+        self.assertTrue(changed)
+        self.assertEqual(session.merge.call_count, 9)
+        self.assertEqual(session.add.call_count, 27)
+
+
+class TestDiscoveryManifest(unittest2.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.module_path = os.path.join(self.tmp_dir, 'module.py')
+        with open(self.module_path, 'w') as f:
+            f.write('x = 1\n')
+
+        self.dependency_path = os.path.join(self.tmp_dir, 'base.py')
+        with open(self.dependency_path, 'w') as f:
+            f.write('class Base(object): pass\n')
+
+        self.manifest = discovery_manifest.DiscoveryManifest(
+            os.path.join(self.tmp_dir, 'manifest.json'))
+        self.manifest.update(self.module_path, None, [],
+                             [self.dependency_path])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_touched_module_is_fresh(self):
+        os.utime(self.module_path, (0, 0))
+
+        self.assertTrue(self.manifest.is_fresh(self.module_path))
+        self.assertEqual(self.manifest.entries[self.module_path]['mtime'], 0)
+
+    def test_changed_module_is_not_fresh(self):
+        with open(self.module_path, 'w') as f:
+            f.write('x = 2\n')
+        os.utime(self.module_path, (0, 0))
+
+        self.assertFalse(self.manifest.is_fresh(self.module_path))
+
+    def test_unknown_module_is_not_fresh(self):
+        self.assertFalse(self.manifest.is_fresh(
+            os.path.join(self.tmp_dir, 'other.py')))
+
+    def reloaded(self):
+        self.manifest.save()
+        manifest = discovery_manifest.DiscoveryManifest(self.manifest.path)
+        manifest.load()
+        return manifest
+
+    def test_touched_dependency_is_fresh(self):
+        os.utime(self.dependency_path, (0, 0))
+
+        self.assertTrue(self.reloaded().is_fresh(self.module_path))
+
+    def test_changed_dependency_is_not_fresh(self):
+        with open(self.dependency_path, 'w') as f:
+            f.write('class Base(dict): pass\n')
+        os.utime(self.dependency_path, (0, 0))
+
+        self.assertFalse(self.reloaded().is_fresh(self.module_path))
+
+    def test_removed_dependency_is_not_fresh(self):
+        os.remove(self.dependency_path)
+
+        self.assertFalse(self.reloaded().is_fresh(self.module_path))
+
+    def test_entry_without_dependencies_is_not_fresh(self):
+        del self.manifest.entries[self.module_path]['dependencies']
+
+        self.assertFalse(self.reloaded().is_fresh(self.module_path))
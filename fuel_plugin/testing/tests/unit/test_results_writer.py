@@ -0,0 +1,222 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import mock
+from sqlalchemy.dialects.postgresql import psycopg2
+import unittest2
+
+from fuel_plugin.ostf_adapter.storage import models
+from fuel_plugin.ostf_adapter.storage import results_writer
+from fuel_plugin.testing.tests.unit import base
+
+
+class TestBufferedResultWriter(unittest2.TestCase):
+
+    def setUp(self):
+        self.session = mock.MagicMock()
+        self.session.bind.dialect = psycopg2.dialect()
+
+        notify_patcher = mock.patch.object(results_writer.events, 'notify')
+        self.notify = notify_patcher.start()
+        self.addCleanup(notify_patcher.stop)
+
+        self.writer = results_writer.BufferedResultWriter(
+            self.session, 1, batch_size=3, flush_interval=60)
+
+    def test_terminal_results_are_buffered(self):
+        self.writer.add('test_one', {'status': 'success'})
+        self.writer.add('test_two', {'status': 'failure'})
+
+        self.assertEqual(len(self.writer), 2)
+        self.assertFalse(self.session.execute.called)
+        self.assertFalse(self.session.commit.called)
+
+    def test_running_is_buffered(self):
+        self.writer.add('test_one', {'status': 'success'})
+        self.writer.add('test_two', {'status': 'running'})
+
+        self.assertEqual(len(self.writer), 2)
+        self.assertFalse(self.session.commit.called)
+
+    def test_eager_status_flushes_at_once(self):
+        writer = results_writer.BufferedResultWriter(
+            self.session, 1, batch_size=3, flush_interval=60,
+            eager_statuses=('running',))
+
+        writer.add('test_one', {'status': 'success'})
+        writer.add('test_two', {'status': 'running'})
+
+        self.assertEqual(len(writer), 0)
+        self.assertEqual(self.session.execute.call_count, 1)
+        self.assertEqual(self.session.commit.call_count, 1)
+
+    def test_flushed_results_are_notified(self):
+        self.writer.add('test_one', {'status': 'success'})
+        self.writer.add('test_two', {'status': 'running'})
+        self.writer.flush()
+
+        self.notify.assert_called_once_with(
+            self.session, 1, ['test_one', 'test_two'])
+
+    def test_flush_on_batch_size(self):
+        for name in ('test_one', 'test_two', 'test_three'):
+            self.writer.add(name, {'status': 'skipped'})
+
+        self.assertEqual(len(self.writer), 0)
+        self.assertEqual(self.session.commit.call_count, 1)
+
+    def test_flush_on_interval(self):
+        with mock.patch.object(results_writer.time, 'time') as time_mock:
+            time_mock.return_value = 100
+            self.writer.add('test_one', {'status': 'success'})
+            self.assertEqual(len(self.writer), 1)
+
+            time_mock.return_value = 161
+            self.writer.add('test_two', {'status': 'success'})
+
+        self.assertEqual(len(self.writer), 0)
+        self.assertEqual(self.session.commit.call_count, 1)
+
+    def test_flush_by_timer(self):
+        writer = results_writer.BufferedResultWriter(
+            self.session, 1, batch_size=3, flush_interval=0.05)
+
+        writer.add('test_one', {'status': 'running'})
+        time.sleep(0.3)
+
+        self.assertEqual(len(writer), 0)
+        self.assertEqual(self.session.commit.call_count, 1)
+
+    def test_flush_cancels_timer(self):
+        writer = results_writer.BufferedResultWriter(
+            self.session, 1, batch_size=3, flush_interval=0.05)
+
+        writer.add('test_one', {'status': 'running'})
+        writer.flush()
+        time.sleep(0.1)
+
+        self.assertEqual(self.session.commit.call_count, 1)
+
+    def test_failed_flush_by_timer_is_retried(self):
+        self.session.commit.side_effect = [IOError('db is gone'), None]
+        writer = results_writer.BufferedResultWriter(
+            self.session, 1, batch_size=3, flush_interval=0.05)
+
+        writer.add('test_one', {'status': 'running'})
+        time.sleep(0.3)
+
+        self.assertEqual(len(writer), 0)
+        self.assertEqual(self.session.commit.call_count, 2)
+        self.assertEqual(self.session.rollback.call_count, 1)
+
+    def test_latest_result_wins(self):
+        self.writer.add('test_one', {'status': 'error'})
+        self.writer.add('test_one', {'status': 'success'})
+        self.writer.flush()
+
+        statement, params = self.session.execute.call_args[0]
+        self.assertEqual(params, {'test_run_id': 1,
+                                  'name_0': 'test_one',
+                                  'status_0': 'success'})
+
+    def test_flush_of_empty_buffer(self):
+        self.writer.flush()
+
+        self.assertFalse(self.session.commit.called)
+
+
+class TestAddResults(unittest2.TestCase):
+
+    def test_single_statement_on_postgresql(self):
+        session = mock.MagicMock()
+        session.bind.dialect = psycopg2.dialect()
+
+        models.Test.add_results(session, 7, [
+            ('test_one', {'status': 'success', 'step': None}),
+            ('test_two', {'status': 'failure', 'step': 2}),
+        ])
+
+        self.assertEqual(session.execute.call_count, 1)
+        statement, params = session.execute.call_args[0]
+
+        self.assertIn('FROM (VALUES (:name_0, :status_0, :step_0), '
+                      '(:name_1, :status_1, :step_1)) '
+                      'AS v (name, status, step)', str(statement))
+        self.assertIn('status = CAST(v.status AS test_states)',
+                      str(statement))
+        self.assertIn('step = CAST(v.step AS INTEGER)', str(statement))
+        self.assertEqual(params['test_run_id'], 7)
+        self.assertEqual(params['step_1'], 2)
+
+    def test_fallback_for_other_dialects(self):
+        session = mock.MagicMock()
+        session.bind.dialect.name = 'sqlite'
+
+        with mock.patch.object(models.Test, 'add_result') as add_result:
+            models.Test.add_results(session, 7, [
+                ('test_one', {'status': 'success'}),
+                ('test_two', {'status': 'failure'}),
+            ])
+
+        self.assertEqual(add_result.call_count, 2)
+        self.assertFalse(session.execute.called)
+
+
+class TestBufferedResultWriterOnDatabase(base.BaseWSGITest):
+
+    def setUp(self):
+        super(TestBufferedResultWriterOnDatabase, self).setUp()
+
+        self.fast_pass = self.ext_id + 'general_test.Dummy_test.test_fast_pass'
+        self.fast_fail = self.ext_id + 'general_test.Dummy_test.test_fast_fail'
+
+        self.session.merge(models.ClusterState(id=1, deployment_tags=[]))
+        self.session.merge(models.ClusterTestingPattern(
+            cluster_id=1, test_set_id='general_test',
+            tests=[self.fast_pass, self.fast_fail]))
+        self.session.flush()
+
+        test_run = models.TestRun.add_test_run(
+            self.session, 'general_test', 1,
+            tests=[self.fast_pass, self.fast_fail])
+        self.session.commit()
+        self.test_run_id = test_run.id
+
+        self.writer = results_writer.BufferedResultWriter(
+            self.session, self.test_run_id, batch_size=10,
+            flush_interval=60)
+
+    def results(self):
+        self.session.expire_all()
+        return dict(
+            (test.name, (test.status, test.step))
+            for test in self.session.query(models.Test)
+            .filter_by(test_run_id=self.test_run_id))
+
+    def test_results_are_written_on_flush(self):
+        self.writer.add(self.fast_pass, {'status': 'running'})
+        self.writer.add(self.fast_fail, {'status': 'failure', 'step': 2})
+        self.writer.add(self.fast_pass, {'status': 'success'})
+
+        self.assertEqual(self.results(),
+                         {self.fast_pass: ('wait_running', None),
+                          self.fast_fail: ('wait_running', None)})
+
+        self.writer.flush()
+
+        self.assertEqual(self.results(),
+                         {self.fast_pass: ('success', None),
+                          self.fast_fail: ('failure', 2)})
@@ -0,0 +1,72 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from datetime import timedelta
+
+import mock
+from sqlalchemy.dialects.postgresql import psycopg2
+from sqlalchemy import orm
+import unittest2
+
+from fuel_plugin.ostf_adapter.storage import retention
+
+
+class TestExpiredTestRuns(unittest2.TestCase):
+
+    def compile(self, keep_last, max_age=None):
+        query = retention.expired_test_runs(orm.Session(), keep_last, max_age)
+        return str(query.statement.compile(dialect=psycopg2.dialect()))
+
+    def test_ranked_within_test_set_and_cluster(self):
+        statement = self.compile(10)
+
+        self.assertIn('row_number() OVER (PARTITION BY test_runs.cluster_id, '
+                      'test_runs.test_set_id ORDER BY test_runs.id DESC)',
+                      statement)
+        self.assertIn('anon_1.rank > %(rank_1)s', statement)
+        self.assertIn('anon_1.status = %(status_1)s', statement)
+        self.assertNotIn('started_at <', statement)
+
+    def test_age_limit(self):
+        statement = self.compile(0, timedelta(days=30))
+
+        self.assertIn('anon_1.started_at < %(started_at_1)s', statement)
+
+
+class TestCompactor(unittest2.TestCase):
+
+    def setUp(self):
+        self.session = mock.Mock()
+        self.sleep = mock.Mock()
+        self.compactor = retention.Compactor(self.session, keep_last=5,
+                                             batch_size=10, pause=0.5,
+                                             sleep=self.sleep)
+
+    def test_batches_until_partial_one(self):
+        step = mock.Mock(side_effect=[10, 10, 3])
+
+        self.assertEqual(self.compactor._batches(step), 23)
+        self.assertEqual(self.session.commit.call_count, 3)
+        self.assertEqual(self.sleep.call_args_list,
+                         [mock.call(0.5), mock.call(0.5)])
+
+    def test_nothing_expires_without_policy(self):
+        self.compactor.keep_last = 0
+
+        self.assertEqual(self.compactor.delete_expired_test_runs(), 0)
+        self.assertFalse(self.session.query.called)
+
+    def test_digest_of_unicode(self):
+        self.assertEqual(retention.traceback_digest(u'Traceback \u2026'),
+                         retention.traceback_digest('Traceback \xe2\x80\xa6'))
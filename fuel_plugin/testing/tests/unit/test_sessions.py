@@ -0,0 +1,82 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import itertools
+
+import unittest2
+
+from fuel_health.common import sessions
+
+
+class TestSessions(unittest2.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.cache = sessions.SessionCache(refresh_margin=300,
+                                           clock=lambda: self.now)
+        self.tokens = itertools.count(1)
+        self.authentications = []
+
+    def authenticate(self, lifetime=3600):
+        def authenticate():
+            token = 'token-{0}'.format(next(self.tokens))
+            self.authentications.append(token)
+            return token, self.now + lifetime
+        return authenticate
+
+    def test_authenticated_once_per_credentials(self):
+        for _ in range(10):
+            admin = self.cache.get(('admin', 'pass'), self.authenticate())
+            self.assertEqual(admin.get_auth(), 'token-1')
+
+        user = self.cache.get(('user', 'pass'), self.authenticate())
+        self.assertEqual(user.get_auth(), 'token-2')
+        self.assertEqual(len(self.authentications), 2)
+
+    def test_clients_are_made_once(self):
+        session = self.cache.get(('admin', 'pass'), self.authenticate())
+        made = []
+
+        def make_client():
+            made.append(session.get_auth())
+            return object()
+
+        clients = [session.client('compute', make_client) for _ in range(5)]
+
+        self.assertEqual(made, ['token-1'])
+        self.assertTrue(all(client is clients[0] for client in clients))
+
+    def test_refresh_before_expiry(self):
+        session = self.cache.get(('admin', 'pass'), self.authenticate())
+        client = session.client('compute', object)
+
+        self.now = 3000
+        self.assertEqual(session.get_auth(), 'token-1')
+        self.assertIs(session.client('compute', object), client)
+
+        self.now = 3301
+        self.assertEqual(session.get_auth(), 'token-2')
+        self.assertIsNot(session.client('compute', object), client)
+
+    def test_failed_authentication_is_retried(self):
+        def authenticate():
+            self.authentications.append(None)
+            raise IOError('Keystone is unavailable')
+
+        session = self.cache.get(('admin', 'pass'), authenticate)
+
+        for _ in range(2):
+            with self.assertRaises(IOError):
+                session.get_auth()
+        self.assertEqual(len(self.authentications), 2)
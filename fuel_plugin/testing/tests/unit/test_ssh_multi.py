@@ -0,0 +1,73 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import time
+
+import unittest2
+
+from fuel_health.common import ssh_multi
+from fuel_health import exceptions
+
+
+def run_command(target):
+    '''Target is (seconds command takes, exit status).'''
+    seconds, exit_status = target
+    time.sleep(seconds)
+    if exit_status:
+        raise exceptions.SSHExecCommandFailed(
+            command='cmd', exit_status=exit_status, strerror='failed')
+    return 'output'
+
+
+class TestRunOnHosts(unittest2.TestCase):
+
+    def run_on(self, timeout=None, **targets):
+        return ssh_multi.run_on_hosts(
+            run_command,
+            collections.OrderedDict(sorted(targets.items())),
+            timeout)
+
+    def test_hosts_are_run_concurrently(self):
+        started = time.time()
+        results = self.run_on(**dict(('node-{0}'.format(n), (0.1, 0))
+                                     for n in range(5)))
+
+        self.assertLess(time.time() - started, 0.3)
+        self.assertEqual(len(results.succeeded), 5)
+        self.assertEqual(results.outputs().values(), ['output'] * 5)
+
+    def test_results_of_hosts(self):
+        results = self.run_on(ok=(0, 0), failed=(0, 2))
+
+        self.assertEqual(results.keys(), ['failed', 'ok'])
+        self.assertEqual(results['ok'].exit_code, 0)
+        self.assertEqual(results['ok'].output, 'output')
+        self.assertIsNotNone(results['ok'].duration)
+        self.assertEqual(results['failed'].exit_code, 2)
+        self.assertIsNone(results['failed'].output)
+        self.assertIsInstance(results['failed'].error,
+                              exceptions.SSHExecCommandFailed)
+        self.assertEqual([result.host for result in results.failed],
+                         ['failed'])
+
+    def test_timeout_per_host(self):
+        started = time.time()
+        results = self.run_on(timeout=0.1, fast=(0, 0), slow=(5, 0))
+
+        self.assertLess(time.time() - started, 1)
+        self.assertTrue(results['fast'].succeeded)
+        self.assertIsInstance(results['slow'].error,
+                              exceptions.TimeoutException)
+        self.assertIsNone(results['slow'].exit_code)
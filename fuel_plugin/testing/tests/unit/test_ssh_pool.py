@@ -0,0 +1,130 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest2
+
+from fuel_health.common import ssh_pool
+
+
+class FakeTransport(object):
+
+    def __init__(self):
+        self.active = True
+        self.keepalive = None
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, interval):
+        self.keepalive = interval
+
+
+class FakeSSH(object):
+
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+        self.transport.active = False
+
+
+class TestConnectionPool(unittest2.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.pool = ssh_pool.ConnectionPool(max_per_host=2, idle_timeout=60,
+                                            keepalive=15,
+                                            clock=lambda: self.now)
+        self.connected = []
+
+    def connect(self):
+        ssh = FakeSSH()
+        self.connected.append(ssh)
+        return ssh
+
+    def get(self, host='10.0.0.2', user='root', password=None):
+        return self.pool.get((host, user, password), self.connect)
+
+    def test_connection_is_reused(self):
+        ssh = self.get()
+
+        for _ in range(10):
+            self.assertIs(self.get(), ssh)
+        self.assertEqual(len(self.connected), 1)
+        self.assertEqual(ssh.transport.keepalive, 15)
+
+    def test_connections_are_keyed_by_credentials(self):
+        self.assertIsNot(self.get(user='root'), self.get(user='admin'))
+        self.assertIsNot(self.get(password='a'), self.get(password='b'))
+        self.assertIsNot(self.get(host='10.0.0.3'), self.get())
+
+    def test_dead_connection_is_replaced(self):
+        ssh = self.get()
+        ssh.transport.active = False
+
+        self.assertIsNot(self.get(), ssh)
+        self.assertEqual(len(self.connected), 2)
+
+    def test_discarded_connection_is_closed(self):
+        ssh = self.get()
+        self.pool.discard(('10.0.0.2', 'root', None), ssh)
+
+        self.assertTrue(ssh.closed)
+        self.assertIsNot(self.get(), ssh)
+
+    def test_idle_connections_are_closed(self):
+        idle = self.get(host='10.0.0.3')
+        self.now = 30
+        used = self.get()
+        self.now = 70
+
+        self.assertIs(self.get(), used)
+        self.assertTrue(idle.closed)
+        self.assertEqual(len(self.pool), 1)
+
+    def test_connections_per_host_are_capped(self):
+        first = self.get(user='a')
+        self.now = 1
+        second = self.get(user='b')
+        self.now = 2
+        self.get(user='a')
+        self.now = 3
+        self.get(user='c')
+
+        self.assertTrue(second.closed)
+        self.assertFalse(first.closed)
+        self.assertEqual(len(self.pool), 2)
+
+    def test_connections_of_host_are_discarded(self):
+        vm = [self.get(host='10.0.0.5', user=user) for user in ('a', 'b')]
+        other = self.get()
+
+        self.pool.discard_host('10.0.0.5')
+
+        self.assertTrue(all(ssh.closed for ssh in vm))
+        self.assertFalse(other.closed)
+        self.assertIs(self.get(), other)
+
+    def test_close_all(self):
+        connections = [self.get(host=host) for host in ('a', 'b', 'c')]
+
+        self.pool.close_all()
+
+        self.assertTrue(all(ssh.closed for ssh in connections))
+        self.assertEqual(len(self.pool), 0)
@@ -0,0 +1,138 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest2
+
+from fuel_health.common import ssh_stream
+from fuel_health import exceptions
+
+
+class FakeChannel(object):
+    '''Channel with given stdout and stderr, closed after them.'''
+
+    def __init__(self, stdout='', stderr=''):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.reads = []
+
+    @property
+    def closed(self):
+        return not self.stdout and not self.stderr
+
+    def recv_ready(self):
+        return bool(self.stdout) or self.closed
+
+    def recv_stderr_ready(self):
+        return bool(self.stderr)
+
+    def recv(self, size):
+        self.reads.append(size)
+        data, self.stdout = self.stdout[:size], self.stdout[size:]
+        return data
+
+    def recv_stderr(self, size):
+        data, self.stderr = self.stderr[:size], self.stderr[size:]
+        return data
+
+
+def always_ready(rlist, wlist, xlist, timeout):
+    return rlist, [], []
+
+
+class TestHeadTailBuffer(unittest2.TestCase):
+
+    def test_unlimited(self):
+        buf = ssh_stream.HeadTailBuffer()
+        for chunk in ('abc', 'def', 'g'):
+            buf.write(chunk)
+
+        self.assertEqual(buf.getvalue(), 'abcdefg')
+
+    def test_under_limit(self):
+        buf = ssh_stream.HeadTailBuffer(10)
+        buf.write('abcdef')
+        buf.write('ghij')
+
+        self.assertEqual(buf.getvalue(), 'abcdefghij')
+
+    def test_head_and_tail_are_kept(self):
+        buf = ssh_stream.HeadTailBuffer(8)
+        for n in range(100):
+            buf.write(str(n % 10))
+
+        self.assertEqual(buf.getvalue(),
+                         '0123\n... 92 bytes skipped ...\n6789')
+        self.assertLessEqual(len(buf.tail), 4)
+
+
+class TestIterLines(unittest2.TestCase):
+
+    def test_lines_across_chunks(self):
+        lines = list(ssh_stream.iter_lines(['ab', 'c\nd', 'e\n\nf']))
+
+        self.assertEqual(lines, ['abc\n', 'de\n', '\n', 'f'])
+
+    def test_line_end_across_chunks(self):
+        lines = list(ssh_stream.iter_lines(['a\r', '\nb\r', 'c']))
+
+        self.assertEqual(lines, ['a\r\n', 'b\r', 'c'])
+
+    def test_long_line_is_yielded_in_parts(self):
+        lines = list(ssh_stream.iter_lines(['abc', 'defg', 'h\nij'],
+                                           max_line=4))
+
+        self.assertEqual(lines, ['abcd', 'efgh\n', 'ij'])
+
+    def test_output_without_line_ends(self):
+        chunks = ('x' * 7 for _ in range(1000))
+        parts = []
+        for part in ssh_stream.iter_lines(chunks, max_line=64):
+            self.assertLessEqual(len(part), 64)
+            parts.append(part)
+
+        self.assertEqual(''.join(parts), 'x' * 7000)
+
+
+class TestReadChannel(unittest2.TestCase):
+
+    def read(self, channel, **kwargs):
+        return list(ssh_stream.read_channel(channel, 10,
+                                            select=always_ready, **kwargs))
+
+    def test_streams_are_separated(self):
+        result = self.read(FakeChannel('out', 'err'), buf_size=2)
+
+        self.assertEqual(
+            ''.join(data for stream, data in result if stream == 'stdout'),
+            'out')
+        self.assertEqual(
+            ''.join(data for stream, data in result if stream == 'stderr'),
+            'err')
+
+    def test_buffer_grows_on_large_output(self):
+        channel = FakeChannel('x' * 100000)
+
+        self.read(channel, buf_size=1024, max_buf_size=16384)
+
+        self.assertEqual(channel.reads[:6], [1024, 2048, 4096, 8192,
+                                             16384, 16384])
+        self.assertLess(len(channel.reads), 15)
+
+    def test_timeout(self):
+        def nothing_ready(rlist, wlist, xlist, timeout):
+            return [], [], []
+
+        with self.assertRaises(exceptions.TimeoutException):
+            list(ssh_stream.read_channel(FakeChannel('out'), 10,
+                                         select=nothing_ready))
@@ -14,14 +14,18 @@
 
 import unittest
 
+import mock
+
 from fuel_plugin.ostf_adapter import config
 from fuel_plugin.ostf_adapter import mixins
+from fuel_plugin.ostf_adapter.nose_plugin import nose_utils
 
 
 class TestDeplTagsGetter(unittest.TestCase):
 
     def setUp(self):
         config.init_config([])
+        mixins.invalidate_cluster_depl_tags()
 
     def test_get_cluster_depl_tags(self):
         expected = {
@@ -35,3 +39,193 @@ class TestDeplTagsGetter(unittest.TestCase):
         res = mixins._get_cluster_depl_tags(expected['cluster_id'])
 
         self.assertEqual(res, expected['depl_tags'])
+
+
+class TestDeplTagsCache(unittest.TestCase):
+
+    def setUp(self):
+        config.init_config([])
+        mixins.invalidate_cluster_depl_tags()
+
+        self.request_patcher = mock.patch.object(
+            mixins, '_request_cluster_depl_tags',
+            return_value=set(['ha', 'rhel'])
+        )
+        self.request_mock = self.request_patcher.start()
+
+    def tearDown(self):
+        self.request_patcher.stop()
+        mixins.invalidate_cluster_depl_tags()
+
+    def test_tags_are_cached(self):
+        first = mixins._get_cluster_depl_tags(1)
+        second = mixins._get_cluster_depl_tags('1')
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.request_mock.call_count, 1)
+
+    def test_cache_expiration(self):
+        with mock.patch.object(mixins.time, 'time') as time_mock:
+            time_mock.return_value = 100
+            mixins._get_cluster_depl_tags(1)
+
+            time_mock.return_value = 100 + \
+                config.cfg.CONF.adapter.nailgun_cache_ttl
+            mixins._get_cluster_depl_tags(1)
+
+        self.assertEqual(self.request_mock.call_count, 2)
+
+    def test_invalidation(self):
+        mixins._get_cluster_depl_tags(1)
+        mixins.invalidate_cluster_depl_tags(1)
+        mixins._get_cluster_depl_tags(1)
+
+        self.assertEqual(self.request_mock.call_count, 2)
+
+    def test_refresh_on_discovery_check(self):
+        session = mock.MagicMock()
+        cluster_state = session.query.return_value.filter_by.return_value\
+            .first.return_value
+        cluster_state.deployment_tags = ['ha', 'rhel']
+
+        mixins.discovery_check(session, 1)
+        mixins.discovery_check(session, 1)
+        self.assertEqual(self.request_mock.call_count, 1)
+
+        mixins.discovery_check(session, 1, refresh=True)
+        self.assertEqual(self.request_mock.call_count, 2)
+
+
+class TestNailgunConditionalRequests(unittest.TestCase):
+
+    def setUp(self):
+        mixins.NAILGUN_RESPONSES.clear()
+
+        self.session_patcher = mock.patch.object(
+            mixins, '_get_nailgun_session')
+        self.session = self.session_patcher.start().return_value
+
+    def tearDown(self):
+        self.session_patcher.stop()
+        mixins.NAILGUN_RESPONSES.clear()
+
+    def test_not_modified_response(self):
+        url = 'http://nailgun/api/clusters/1'
+
+        response = self.session.get.return_value
+        response.status_code = 200
+        response.headers = {'ETag': '"v1"'}
+        response.json.return_value = {'mode': 'ha'}
+
+        self.assertEqual(mixins._get_nailgun_data(url), {'mode': 'ha'})
+
+        response.status_code = 304
+        response.json.side_effect = ValueError()
+
+        self.assertEqual(mixins._get_nailgun_data(url), {'mode': 'ha'})
+        self.session.get.assert_called_with(
+            url, headers={'If-None-Match': '"v1"'})
+
+
+class TestDeploymentTagsMatching(unittest.TestCase):
+
+    def test_compile(self):
+        compiled = nose_utils.compile_deployment_tags(
+            ['qemu | kvm', 'public_on_all_nodes|nova_network', 'ha'])
+
+        self.assertEqual(compiled, (
+            frozenset(['qemu', 'kvm']),
+            frozenset(['public_on_all_nodes', 'nova_network']),
+            frozenset(['ha'])
+        ))
+
+    def test_match(self):
+        tags = ['qemu | kvm', 'public_on_all_nodes | nova_network']
+
+        self.assertTrue(nose_utils.process_deployment_tags(
+            set(['kvm', 'nova_network', 'ubuntu']), tags))
+        self.assertFalse(nose_utils.process_deployment_tags(
+            set(['kvm', 'neutron', 'ubuntu']), tags))
+
+    def test_empty_tags_match_any_cluster(self):
+        self.assertTrue(nose_utils.process_deployment_tags(set(), []))
+
+    def test_many_alternative_groups(self):
+        tags = ['tag_{0}_a | tag_{0}_b | tag_{0}_c'.format(i)
+                for i in range(30)]
+        cluster_tags = set(['tag_{0}_c'.format(i) for i in range(30)])
+
+        self.assertTrue(
+            nose_utils.process_deployment_tags(cluster_tags, tags))
+
+
+class TestGroupTestsByClass(unittest.TestCase):
+
+    def test_group(self):
+        groups = nose_utils.group_tests_by_class([
+            'tests.test_a:First.test_one',
+            'tests.test_b:Second.test_one',
+            'tests.test_a:First.test_two',
+        ])
+
+        self.assertEqual(groups, [
+            ['tests.test_a:First.test_one', 'tests.test_a:First.test_two'],
+            ['tests.test_b:Second.test_one'],
+        ])
+
+    def test_test_path(self):
+        self.assertIsNone(
+            nose_utils.group_tests_by_class(['fuel_health/tests/sanity']))
+
+
+class TestTestingPatternsIndex(unittest.TestCase):
+
+    def setUp(self):
+        repository = [
+            {
+                'test_set_id': 'ha_tests',
+                'deployment_tags': ['ha'],
+                'tests': [
+                    {'name': 'ha_tests.test_rhel',
+                     'deployment_tags': ['rhel | centos']},
+                    {'name': 'ha_tests.test_ubuntu',
+                     'deployment_tags': ['ubuntu']},
+                ]
+            },
+            {
+                'test_set_id': 'general_tests',
+                'deployment_tags': [],
+                'tests': [
+                    {'name': 'general_tests.test_any',
+                     'deployment_tags': []},
+                ]
+            },
+        ]
+        for test_set in repository:
+            for elem in [test_set] + test_set['tests']:
+                elem['compiled_depl_tags'] = nose_utils\
+                    .compile_deployment_tags(elem['deployment_tags'])
+
+        self.repository_patcher = mock.patch.object(
+            mixins, 'TEST_REPOSITORY', repository)
+        self.repository_patcher.start()
+        mixins.TESTING_PATTERNS_INDEX.clear()
+
+    def tearDown(self):
+        self.repository_patcher.stop()
+        mixins.TESTING_PATTERNS_INDEX.clear()
+
+    def test_patterns(self):
+        patterns = mixins._get_testing_patterns(set(['ha', 'centos']))
+
+        self.assertEqual(patterns, [
+            ('ha_tests', ['ha_tests.test_rhel']),
+            ('general_tests', ['general_tests.test_any'])
+        ])
+
+    def test_patterns_are_shared(self):
+        first = mixins._get_testing_patterns(set(['ha', 'ubuntu']))
+        second = mixins._get_testing_patterns(['ubuntu', 'ha', 'ha'])
+
+        self.assertIs(first, second)
+        self.assertEqual(len(mixins.TESTING_PATTERNS_INDEX), 1)
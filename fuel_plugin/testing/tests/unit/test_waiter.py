@@ -0,0 +1,229 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import random
+
+import unittest2
+
+from fuel_health.common import waiter
+from fuel_health import exceptions
+
+
+class SimulatedClock(object):
+    '''Clock which advances only when somebody sleeps.'''
+
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def fixed_wait(func, timeout, interval, clock):
+    '''Former call_until_true loop with fixed sleep interval.'''
+    deadline = clock.time() + timeout
+    while clock.time() < deadline:
+        if func():
+            return True
+        clock.sleep(interval)
+    return False
+
+
+class FakeManager(object):
+    '''Manager of resources getting to their status at given moments.'''
+
+    def __init__(self, clock, ready_at, status='ready'):
+        self.clock = clock
+        self.ready_at = ready_at
+        self.status = status
+        self.list_calls = 0
+
+    def fetch(self, ids):
+        self.list_calls += 1
+        return dict((resource_id, {'id': resource_id, 'status':
+                                   self.status if self.clock.time() >= moment
+                                   else 'pending'})
+                    for resource_id, moment in self.ready_at.items()
+                    if resource_id in ids)
+
+
+def check_ready(resource):
+    if resource['status'] == 'error':
+        raise exceptions.BuildErrorException(server_id=resource['id'])
+    return resource['status'] == 'ready'
+
+
+class TestWaiter(unittest2.TestCase):
+
+    def setUp(self):
+        self.clock = SimulatedClock()
+
+    def make_waiter(self, **kwargs):
+        kwargs.setdefault('max_interval', 10)
+        return waiter.Waiter(clock=self.clock.time, sleep=self.clock.sleep,
+                             rand=random.Random(42).random, **kwargs)
+
+    def ready_at(self, moment):
+        return lambda: self.clock.time() >= moment
+
+    def test_backoff_intervals(self):
+        intervals = self.make_waiter(jitter=0).intervals()
+
+        self.assertEqual([next(intervals) for _ in range(6)],
+                         [1, 2, 4, 8, 10, 10])
+
+    def test_jitter_bounds(self):
+        intervals = self.make_waiter(first_interval=10, jitter=0.1)\
+            .intervals()
+
+        for _ in range(100):
+            self.assertTrue(9 <= next(intervals) <= 11)
+
+    def test_polls_and_waited_are_recorded(self):
+        result = self.make_waiter(jitter=0).wait(self.ready_at(3), 60)
+
+        self.assertTrue(result)
+        self.assertEqual(result.polls, 3)
+        self.assertEqual(result.waited, 3)
+
+    def test_final_poll_at_deadline(self):
+        result = self.make_waiter(jitter=0).wait(self.ready_at(20), 20)
+
+        self.assertTrue(result)
+        self.assertEqual(self.clock.time(), 20)
+
+    def test_timeout(self):
+        result = self.make_waiter().wait(self.ready_at(100), 30)
+
+        self.assertFalse(result)
+        self.assertEqual(result.waited, 30)
+
+    def test_args_are_passed(self):
+        self.assertTrue(self.make_waiter().wait(lambda x: x == 5, 10, 5))
+
+    def test_less_wall_time_than_fixed_interval(self):
+        '''
+        Resources becoming ready at various moments are detected
+        earlier than with fixed 10 seconds polling interval.
+        '''
+        moments = [0.5, 2, 5, 9, 15, 31, 47, 64, 95, 150]
+
+        fixed_total = 0
+        for moment in moments:
+            clock = SimulatedClock()
+            fixed_wait(lambda: clock.time() >= moment, 300, 10, clock)
+            fixed_total += clock.time()
+
+        adaptive_total = 0
+        for moment in moments:
+            self.clock = SimulatedClock()
+            self.make_waiter().wait(self.ready_at(moment), 300)
+            adaptive_total += self.clock.time()
+
+        self.assertLess(adaptive_total, fixed_total)
+
+
+class TestResourcesWaiter(unittest2.TestCase):
+
+    def setUp(self):
+        self.clock = SimulatedClock()
+        self.waiter = waiter.ResourcesWaiter(
+            waiter.Waiter(jitter=0, clock=self.clock.time,
+                          sleep=self.clock.sleep))
+
+    def add(self, kind, manager):
+        for resource_id in sorted(manager.ready_at):
+            self.waiter.add(kind, resource_id, manager.fetch, check_ready)
+
+    def test_single_fetch_per_kind_and_poll(self):
+        servers = FakeManager(self.clock, {'s1': 3, 's2': 7, 's3': 1})
+        volumes = FakeManager(self.clock, {'v1': 2, 'v2': 14})
+        self.add('servers', servers)
+        self.add('volumes', volumes)
+
+        resources = self.waiter.wait(60)
+
+        self.assertEqual([r['id'] for r in resources],
+                         ['s1', 's2', 's3', 'v1', 'v2'])
+        # polls at 0, 1, 3, 7 and 15 seconds, servers are resolved
+        # after poll at 7 seconds
+        self.assertEqual(servers.list_calls, 4)
+        self.assertEqual(volumes.list_calls, 5)
+        self.assertEqual(self.clock.time(), 15)
+
+    def test_only_failed_resources_are_reported(self):
+        servers = FakeManager(self.clock, {'s1': 1, 's2': 2})
+        broken = FakeManager(self.clock, {'s3': 1}, status='error')
+        slow = FakeManager(self.clock, {'v1': 1000})
+        self.add('servers', servers)
+        self.add('broken', broken)
+        self.add('volumes', slow)
+
+        with self.assertRaises(exceptions.ResourcesWaitError) as ctx:
+            self.waiter.wait(30)
+
+        failures = ctx.exception.failures
+        self.assertEqual([(kind, resource_id) for kind, resource_id, _
+                          in failures], [('broken', 's3'), ('volumes', 'v1')])
+        self.assertIsInstance(failures[1][2], exceptions.TimeoutException)
+        self.assertEqual(broken.list_calls, 2)
+
+    def test_fetch_errors_are_transient(self):
+        manager = FakeManager(self.clock, {'s1': 2})
+        calls = []
+
+        def fetch(ids):
+            calls.append(ids)
+            if len(calls) == 1:
+                raise IOError('Connection reset')
+            return manager.fetch(ids)
+
+        self.waiter.add('servers', 's1', fetch, check_ready)
+
+        self.assertEqual(self.waiter.wait(10), [{'id': 's1',
+                                                'status': 'ready'}])
+
+    def test_known_resources_are_checked_without_fetch(self):
+        manager = FakeManager(self.clock, {})
+        self.waiter.add('servers', 's1', manager.fetch, check_ready,
+                        {'id': 's1', 'status': 'ready'})
+
+        self.waiter.wait(10)
+
+        self.assertEqual(manager.list_calls, 0)
+
+    def test_wall_time_of_slowest_resource(self):
+        '''
+        Waiting for ten resources takes as long as waiting
+        for the slowest of them.
+        '''
+        moments = dict(('r{0}'.format(n), moment) for n, moment in
+                       enumerate([0.5, 2, 5, 9, 15, 31, 47, 64, 95, 150]))
+        self.add('servers', FakeManager(self.clock, moments))
+
+        self.waiter.wait(300)
+        batched = self.clock.time()
+
+        sequential = 0
+        for moment in moments.values():
+            clock = SimulatedClock()
+            waiter.Waiter(jitter=0, clock=clock.time, sleep=clock.sleep)\
+                .wait(lambda: clock.time() >= moment, 300)
+            sequential += clock.time()
+
+        self.assertLess(batched, 160)
+        self.assertLess(batched * 2, sequential)
@@ -0,0 +1,145 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+import time
+
+import unittest2
+
+from fuel_plugin.ostf_adapter.nose_plugin import worker_pool
+
+
+# per-process state left by runs, like configs cached by tests
+CACHE = {}
+
+
+def _record_run(path, interrupt=False):
+    with open(path, 'a') as f:
+        f.write('{0}\n'.format(os.getpid()))
+    return interrupt
+
+
+def _record_cached(path, cluster_id):
+    CACHE.setdefault('cluster_id', cluster_id)
+    with open(path, 'a') as f:
+        f.write('{0} {1}\n'.format(os.getpid(), CACHE['cluster_id']))
+
+
+def _broken_reset():
+    raise IOError('Connection reset by peer')
+
+
+def _wait_idle(pool):
+    deadline = time.time() + 10
+    while pool.busy and time.time() < deadline:
+        time.sleep(0.01)
+        pool._collect()
+
+
+class TestWorkerPool(unittest2.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'runs')
+        self.pool = worker_pool.WorkerPool(
+            _record_run, size=1, max_runs=2,
+            max_memory_growth=1024 * 1024 * 1024)
+        self.pool.start()
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def wait_idle(self):
+        _wait_idle(self.pool)
+        self.assertEqual(self.pool.busy, [])
+
+    def run_pids(self):
+        with open(self.path) as f:
+            return [int(line) for line in f]
+
+    def test_worker_is_reused(self):
+        first_pid = self.pool.submit(self.path)
+        self.wait_idle()
+        second_pid = self.pool.submit(self.path)
+        self.wait_idle()
+
+        self.assertEqual(first_pid, second_pid)
+        self.assertEqual(self.run_pids(), [first_pid, first_pid])
+
+    def test_worker_is_recycled_after_max_runs(self):
+        pids = []
+        for _ in range(3):
+            pids.append(self.pool.submit(self.path))
+            self.wait_idle()
+
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+        self.assertEqual(self.run_pids(), pids)
+
+    def test_worker_is_recycled_after_interrupted_run(self):
+        first_pid = self.pool.submit(self.path, True)
+        self.wait_idle()
+        second_pid = self.pool.submit(self.path)
+        self.wait_idle()
+
+        self.assertNotEqual(first_pid, second_pid)
+
+    def test_no_idle_workers(self):
+        self.assertIsNotNone(self.pool.submit(self.path))
+        self.assertIsNone(self.pool.submit(self.path))
+
+
+class TestWorkerReset(unittest2.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'runs')
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def start(self, reset):
+        self.pool = worker_pool.WorkerPool(
+            _record_cached, size=1, max_runs=10,
+            max_memory_growth=1024 * 1024 * 1024, reset=reset)
+        self.pool.start()
+
+    def run_twice(self):
+        pids = []
+        for cluster_id in (1, 2):
+            pids.append(self.pool.submit(self.path, cluster_id))
+            _wait_idle(self.pool)
+
+        with open(self.path) as f:
+            return pids, [line.split() for line in f]
+
+    def test_state_is_reset_between_runs(self):
+        self.start(CACHE.clear)
+
+        pids, runs = self.run_twice()
+
+        self.assertEqual(pids[0], pids[1])
+        self.assertEqual(runs, [[str(pids[0]), '1'], [str(pids[0]), '2']])
+
+    def test_worker_is_replaced_if_reset_fails(self):
+        self.start(_broken_reset)
+
+        pids, runs = self.run_twice()
+
+        self.assertNotEqual(pids[0], pids[1])
+        self.assertEqual(runs, [[str(pids[0]), '1'], [str(pids[1]), '2']])
@@ -14,6 +14,7 @@
 
 import json
 from mock import patch, Mock
+import webob.exc
 
 from fuel_plugin.ostf_adapter.wsgi import controllers
 from fuel_plugin.ostf_adapter.storage import models
@@ -158,6 +159,139 @@ class TestTestRunsPostController(TestTestRunsController):
         )
 
 
+class TestTestRunsGetAllController(TestTestRunsController):
+
+    def setUp(self):
+        super(TestTestRunsGetAllController, self).setUp()
+        self.test_run = self.controller.post()[0]
+
+        self.response_mock = Mock()
+        self.response_mock.headers = {}
+        self.response_patcher = patch(
+            'fuel_plugin.ostf_adapter.wsgi.controllers.response',
+            self.response_mock
+        )
+        self.response_patcher.start()
+
+    def tearDown(self):
+        super(TestTestRunsGetAllController, self).tearDown()
+
+        self.response_patcher.stop()
+
+    def test_filters(self):
+        res = self.controller.get_all(cluster_id='1',
+                                      test_set_id='ha_deployment_test',
+                                      status='running')
+        self.assertEqual([test_run['id'] for test_run in res],
+                         [self.test_run['id']])
+        self.assertEqual(len(res[0]['tests']), 2)
+
+        self.assertEqual(self.controller.get_all(cluster_id='2'), [])
+        self.assertEqual(
+            self.controller.get_all(started_after='2100-01-01'), [])
+
+    def test_without_tests(self):
+        res = self.controller.get_all(cluster_id='1', include_tests='false')
+
+        self.assertEqual(res[0]['tests'], [])
+
+    def test_pagination(self):
+        res = self.controller.get_all(limit='1')
+
+        self.assertEqual(len(res), 1)
+        marker = self.response_mock.headers['X-Next-Marker']
+        self.assertEqual(marker, str(res[0]['id']))
+
+        res = self.controller.get_all(marker=marker)
+        self.assertNotIn(int(marker),
+                         [test_run['id'] for test_run in res])
+
+    def test_no_pagination_without_limit_and_marker(self):
+        res = self.controller.get_all()
+
+        self.assertEqual(len(res),
+                         self.session.query(models.TestRun).count())
+        self.assertNotIn('X-Next-Marker', self.response_mock.headers)
+
+    def test_not_positive_limit(self):
+        for limit in ('0', '-1'):
+            with self.assertRaises(webob.exc.HTTPBadRequest):
+                self.controller.get_all(limit=limit)
+
+
+class TestTestRunsGetLastController(TestTestRunsController):
+
+    def setUp(self):
+        super(TestTestRunsGetLastController, self).setUp()
+
+        self.request_mock.body = json.dumps([
+            {'testset': 'ha_deployment_test', 'metadata': {'cluster_id': 1}},
+            {'testset': 'general_test', 'metadata': {'cluster_id': 1}},
+        ])
+        self.test_runs = self.controller.post()
+        self.request_mock.if_none_match = []
+
+        self.response_mock = Mock()
+        self.response_patcher = patch(
+            'fuel_plugin.ostf_adapter.wsgi.controllers.response',
+            self.response_mock
+        )
+        self.response_patcher.start()
+
+    def tearDown(self):
+        super(TestTestRunsGetLastController, self).tearDown()
+
+        self.response_patcher.stop()
+
+    def add_result(self, test_run):
+        test_name = test_run['tests'][0]['id']
+        models.Test.add_result(self.session, test_run['id'], test_name,
+                               {'status': 'success'})
+        return test_name
+
+    def test_not_modified(self):
+        res = self.controller.get_last('1')
+        self.assertEqual(sorted(test_run['id'] for test_run in res),
+                         sorted(test_run['id']
+                                for test_run in self.test_runs))
+
+        self.request_mock.if_none_match = [self.response_mock.etag]
+        res = self.controller.get_last('1')
+
+        self.assertEqual(self.response_mock.status, 304)
+        self.assertIs(res, self.response_mock)
+
+    def test_etag_changes_with_results(self):
+        self.controller.get_last('1')
+        etag = self.response_mock.etag
+
+        self.add_result(self.test_runs[0])
+        self.request_mock.if_none_match = [etag]
+        res = self.controller.get_last('1')
+
+        self.assertIsNot(res, self.response_mock)
+        self.assertNotEqual(self.response_mock.etag, etag)
+
+    def test_since(self):
+        since = max(test_run['version']
+                    for test_run in self.controller.get_last('1'))
+
+        self.assertEqual(self.controller.get_last('1', since=str(since)), [])
+
+        test_name = self.add_result(self.test_runs[0])
+        res = self.controller.get_last('1', since=str(since))
+
+        self.assertEqual([test_run['id'] for test_run in res],
+                         [self.test_runs[0]['id']])
+        self.assertEqual([test['id'] for test in res[0]['tests']],
+                         [test_name])
+        self.assertGreater(res[0]['version'], since)
+
+    def test_not_integer_since(self):
+        with self.assertRaises(webob.exc.HTTPBadRequest):
+            self.controller.get_last('1', since='latest')
+
+
 class TestTestRunsPutController(TestTestRunsController):
 
     def setUp(self):
@@ -276,3 +410,54 @@ class TestClusterRedeployment(base.BaseWSGITest):
             self.controller.get(self.expected['cluster']['id'])
 
         self.assertTrue(self.is_background_working)
+
+
+class TestAnalyticsController(base.BaseWSGITest):
+
+    def setUp(self):
+        super(TestAnalyticsController, self).setUp()
+        self.controller = controllers.AnalyticsController()
+
+        self.fast_pass = self.ext_id + 'general_test.Dummy_test.test_fast_pass'
+        self.fast_fail = self.ext_id + 'general_test.Dummy_test.test_fast_fail'
+
+        for cluster_id, status in ((1, 'success'), (2, 'failure')):
+            self.session.merge(models.ClusterState(id=cluster_id,
+                                                   deployment_tags=[]))
+            self.session.merge(models.ClusterTestingPattern(
+                cluster_id=cluster_id, test_set_id='general_test',
+                tests=[self.fast_pass, self.fast_fail]))
+            self.session.flush()
+
+            test_run = models.TestRun.add_test_run(
+                self.session, 'general_test', cluster_id,
+                tests=[self.fast_pass, self.fast_fail])
+            self.session.flush()
+            models.Test.add_result(self.session, test_run.id, self.fast_pass,
+                                   {'status': status, 'time_taken': 2.0})
+            models.TestRun.update_test_run(self.session, test_run.id,
+                                           {'status': 'finished'})
+
+    def test_get_all(self):
+        res = self.controller.get_all()
+
+        self.assertEqual([stats['id'] for stats in res], [self.fast_pass])
+        self.assertIsNone(res[0]['cluster_id'])
+        self.assertEqual((res[0]['runs'], res[0]['passed'],
+                          res[0]['failed']), (2, 1, 1))
+        self.assertEqual(res[0]['pass_rate'], 0.5)
+        self.assertEqual(res[0]['p50'], 2.0)
+
+    def test_get_one(self):
+        res = self.controller.get_one('2')
+
+        self.assertEqual(len(res), 1)
+        self.assertEqual(res[0]['cluster_id'], 2)
+        self.assertEqual(res[0]['last_status'], 'failure')
+        self.assertEqual(res[0]['failure_streak'], 1)
+
+    def test_filter_by_test_set(self):
+        self.assertEqual(self.controller.get_all(test_set_id='stopped_test'),
+                         [])
+        self.assertEqual(
+            len(self.controller.get_all(test_set_id='general_test')), 1)
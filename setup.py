@@ -60,6 +60,7 @@ setuptools.setup(
         ],
         'console_scripts': [
             'ostf-server = fuel_plugin.ostf_adapter.server:main',
+            'ostf-compact = fuel_plugin.ostf_adapter.compact:main',
         ]
     },
 